@@ -1,26 +1,80 @@
-from Code.Coder.ToolBox.SQLTB.instFunctions import getRelevantContext
-from Code.Utilities.apiSupport.allApi import CallLLMApi
+import logging
 
-def generateQuery(userQuery: str, LLMservice: str):
+from Code.Coder.ToolBox.SQLTB.instFunctions import getRelevantContext, getSchemaVersion
+from Code.Utilities.apiSupport.allApi import CallLLMApi, llmStream
+from Code.Utilities.apiSupport.llmTelemetry import get_telemetry
+from Code.Utilities.apiSupport.promptLayout import promptLayout
+from Code.Utilities.apiSupport.tokenBudget import contextAssembler, get_context_budget
+from Code.Utilities.base_utils import get_config_val
+from Code.Utilities.cacheSupport.semanticCache import semanticCache
+
+_query_cache = None
+
+
+def getQueryCache() -> semanticCache:
+    """
+    Semantic cache of generated queries, created on first use.
+    """
+    global _query_cache
+    if _query_cache is None:
+        _query_cache = semanticCache("generateQuery")
+    return _query_cache
+
+
+def generateQuery(userQuery: str, LLMservice: str, stream: bool = False, callback=None, use_cache: bool = True):
     """
 
     :param userQuery:
     :param LLMservice:
+    :param stream: If True, returns an llmStream yielding the query as it is generated (stream.text once consumed)
+    :param callback: Called with every text chunk when streaming
+    :param use_cache: Serve / store the query in the semantic cache (similar questions on an unchanged schema
+                      context reuse the stored query without retrieval or an LLM call)
     :return:
     """
 
-    ContextJson_str = getRelevantContext(userQuery)
+    primaryService = LLMservice[0] if isinstance(LLMservice, (list, tuple)) else LLMservice
+    modelName = get_config_val("model_config", [str(primaryService).upper(), "model_name"])
 
-    prompt = f"""
-    Using the context provided below, write a SQL query.
-    {ContextJson_str}
-    """
+    if use_cache:
+        queryCache = getQueryCache()
+        schemaVersion = getSchemaVersion()
+
+        cachedQuery = queryCache.lookup(userQuery, schemaVersion)
+        if cachedQuery is not None:
+            get_telemetry().record(primaryService, modelName, "QueryWriter", 0, 0, 0.0, cache_hit=True,
+                                   mode="stream" if stream else "sync")
+            return llmStream.from_text(cachedQuery, callback) if stream else cachedQuery
+
+    # Rank and trim tables, columns and join keys to the context budget of the provider
+    assembler = contextAssembler(get_context_budget(primaryService), modelName)
+    Context_str = assembler.assemble(getRelevantContext(userQuery), include_query=False, stable_order=True)
+    logging.debug(f"QueryWriter context budget : {assembler.report}")
+
+    # Instructions and schema context form a stable prefix the provider can cache, the question comes last
+    prompt = promptLayout()
+    prompt.add_static("instructions", "Using the context provided below, write a SQL query.")
+    prompt.add_static("context", Context_str)
+    prompt.add_variable("question", f"Question: {userQuery}")
 
     print(prompt)
 
-    LLMObj = CallLLMApi(LLMservice)
+    LLMObj = CallLLMApi(LLMservice, caller="QueryWriter")
+
+    if stream:
+        queryStream = LLMObj.CallServiceStream(prompt, callback)
+        if use_cache:
+            queryStream.add_done_callback(lambda query: queryCache.store(userQuery, query, schemaVersion))
+        return queryStream
+
+    query = LLMObj.CallService(prompt)
+    if use_cache:
+        queryCache.store(userQuery, query, schemaVersion)
 
-    return LLMObj.CallService(prompt)
+    return query
 
 
-print(generateQuery("Give me product wise split for each territory", "google"))
\ No newline at end of file
+if __name__ == "__main__":
+    for chunk in generateQuery("Give me product wise split for each territory", "google", stream=True):
+        print(chunk, end="", flush=True)
+    print()
\ No newline at end of file
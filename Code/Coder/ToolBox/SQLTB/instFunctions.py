@@ -1,4 +1,5 @@
 from Code.SystemBuilder.SQLReference import SQLBuilderSupport
+from Code.Utilities.Retrieval_Pipeline.schemaVersion import get_schema_version
 
 
 def getRelevantContext(user_query: str):
@@ -12,3 +13,12 @@ def getRelevantContext(user_query: str):
     return queryContext.getBuildComponents(user_query)
 
 
+def getSchemaVersion() -> str:
+    """
+    Version of the schema context used to build queries: the counter bumped whenever the table metadata, the
+    relation graph or the vector index is written (see schemaVersion.py), so answers cached against an older
+    context are not served.
+
+    :return: Schema version
+    """
+    return get_schema_version()
@@ -8,7 +8,7 @@ Class:
 
 
 import json
-from Code.Utilities.base_utils import get_config_val, accessDB
+from Code.Utilities.base_utils import get_config_val, accessDB, log_function
 from Code.Utilities.Retrieval_Pipeline import RAGPipeline, ManageRelations
 
 
@@ -63,6 +63,7 @@ class SQLBuilderSupport:
 
         return filtered_results_dict
 
+    @log_function(reraise=True)
     def __getRelevantTables__(self):
         """
         Retrieve relevant tables based on the user's query.
@@ -87,6 +88,7 @@ class SQLBuilderSupport:
         self.table_list["direct"] = filtered_results
 
 
+    @log_function(reraise=True)
     def __getTableRelations__(self):
         """
         Retrieve relations between tables.
@@ -106,12 +108,13 @@ class SQLBuilderSupport:
             targetTable = tables['target']
 
             if sourceTable not in self.table_list["direct"].keys() and sourceTable not in self.table_list["intermediate"].keys():
-                self.table_list["intermediate"] = {sourceTable : { "description": "", "columns": {} } }
+                self.table_list["intermediate"][sourceTable] = { "description": "", "columns": {} }
 
             if targetTable not in self.table_list["direct"].keys() and targetTable not in self.table_list["intermediate"].keys():
-                self.table_list["intermediate"] = {targetTable : { "description": "", "columns": {} } }
+                self.table_list["intermediate"][targetTable] = { "description": "", "columns": {} }
 
 
+    @log_function(reraise=True)
     def __getInterTablesDesc__(self):
         """
         Get descriptions for intermediate tables.
@@ -136,6 +139,7 @@ class SQLBuilderSupport:
         """
         return tableColDict
 
+    @log_function(reraise=True)
     def __getTablesColList__(self):
         """
         Placeholder method to get the list of columns for each table.
@@ -151,11 +155,12 @@ class SQLBuilderSupport:
         for ttype, table_dict in self.table_list.items():
             for table, tablemd in table_dict.items():
                 # Extracting column metadata for the current table
-                fullColMetadata = self.DBObj.get_data( tableName=self.tmddb_config['tableColName'], lookupDict={'TableName':table}, lookupVal=['ColumnName','DataType','Constraints','Desc'] )
+                fullColMetadata = self.DBObj.get_data( tableName=self.tmddb_config['tableColName'], lookupDict={'TableName':table}, lookupVal=['ColumnName','DataType','Constraints','Desc'], fetchtype="all" )
                 # Updating the 'columns' attribute for the current table after filtering additional columns
                 self.table_list[ttype][table]['columns'] = self.__filterAdditionalColumns__(fullColMetadata)
 
 
+    @log_function(reraise=True)
     def getBuildComponents(self, user_query: str) -> dict:
         """
         Get components necessary for building the SQL query.
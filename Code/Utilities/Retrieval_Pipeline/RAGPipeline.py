@@ -1,25 +1,65 @@
 # --------------------------------------------------------------------------------------------
-from FlagEmbedding import FlagReranker
-from rank_bm25 import BM25Okapi
-from detoxify import Detoxify
-from transformers import AutoTokenizer, TFAutoModelForSequenceClassification
-from transformers import pipeline
-from sentence_transformers import SentenceTransformer
-
+# Heavy dependencies (FlagEmbedding, rank_bm25, sentence_transformers, transformers, detoxify) and
+# the retrieval configs are loaded on first use, so importing this module stays cheap.
 # --------------------------------------------------------------------------------------------
 
 import uuid
+import threading
 
 # --------------------------------------------------------------------------------------------
 
+from Code.Utilities.Retrieval_Pipeline.schemaVersion import bump_schema_version
 from Code.Utilities.Retrieval_Pipeline.vdb import Chroma
 from Code.Utilities.base_utils import get_config_val
 
 # --------------------------------------------------------------------------------------------
-models_repo = get_config_val("retrieval_config",["models_repo"],True)
-indexing_configs = get_config_val("retrieval_config",["indexing"],True)
-scoring_configs = get_config_val("retrieval_config",["scoring"],True)
-vectordb_configs = get_config_val("retrieval_config",["vectordb"],True)
+config_sections = {
+    "models_repo": "models_repo",
+    "indexing_configs": "indexing",
+    "scoring_configs": "scoring",
+    "vectordb_configs": "vectordb"
+}
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def __getattr__(name: str):
+    """
+    Resolve the retrieval config sections (models_repo, indexing_configs, scoring_configs,
+    vectordb_configs) on first access instead of at import time.
+    """
+    if name in config_sections:
+        return get_config_val("retrieval_config",[config_sections[name]],True)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_model(model_type: str, model_path: str):
+    """
+    Load a model once per process and return the shared instance on later calls.
+
+    args:
+        - model_type (str): 'embedding' (SentenceTransformer) or 'reranker' (FlagReranker).
+        - model_path (str): Path of the model files.
+
+    returns:
+        - The loaded model.
+    """
+    model_key = (model_type, model_path)
+
+    with _models_lock:
+        if model_key not in _models:
+            if model_type == "embedding":
+                from sentence_transformers import SentenceTransformer
+                _models[model_key] = SentenceTransformer(model_path)
+            elif model_type == "reranker":
+                from FlagEmbedding import FlagReranker
+                _models[model_key] = FlagReranker(model_path, use_fp16=True)
+            else:
+                raise ValueError(f"Model type incorrect. Possible values accepted : {['embedding','reranker']}")
+
+        return _models[model_key]
 
 # --------------------------------------------------------------------------------------------
 
@@ -38,8 +78,12 @@ class FilterContext:
         """
         Initialize the FilterContext with pre-trained models.
         """
-        self.RerankerModel = FlagReranker(models_repo['path'] + "/" + scoring_configs["crossencoder"],
-                                          use_fp16=True)
+        models_repo = get_config_val("retrieval_config",["models_repo"],True)
+        scoring_configs = get_config_val("retrieval_config",["scoring"],True)
+
+        self.RerankerModel = get_model("reranker", models_repo['path'] + "/" + scoring_configs["crossencoder"])
+        # from detoxify import Detoxify
+        # from transformers import AutoTokenizer, TFAutoModelForSequenceClassification
         # self.ToxicityModel = Detoxify('original')
         # self.BiasModel_tokenizer = AutoTokenizer.from_pretrained(models_repo['path'] + "/" + scoring_configs["bias_detection"])
         # self.BiasModel = TFAutoModelForSequenceClassification.from_pretrained(models_repo['path'] + "/" + scoring_configs["bias_detection"])
@@ -69,6 +113,8 @@ class FilterContext:
         returns:
             - list: Scores generated by the BM25 algorithm.
         """
+        from rank_bm25 import BM25Okapi
+
         tokenized_query = base_query.split(" ")
 
         tokenized_corpus = retrieved_info.split(" ")
@@ -88,6 +134,7 @@ class FilterContext:
     #         - dict: Scores generated for bias.
     #     """
     #     # https://huggingface.co/d4data/bias-detection-model
+    #     from transformers import pipeline
     #     return pipeline('text-classification', model=self.BiasModel, tokenizer=self.BiasModel_tokenizer)
     #
     #
@@ -151,9 +198,14 @@ class ManageInformation:
         Args:
             dbName (str): Name of the database to manage.
         """
-        self.dbName = vectordb_configs["name"]
+        models_repo = get_config_val("retrieval_config",["models_repo"],True)
+        indexing_configs = get_config_val("retrieval_config",["indexing"],True)
+
+        self.vectordb_configs = get_config_val("retrieval_config",["vectordb"],True)
+        self.encode_batch_size = indexing_configs.get("batch_size", 64)
+        self.dbName = self.vectordb_configs["name"]
         self.client = None
-        self.embedding_model = SentenceTransformer(models_repo['path'] + "/" + indexing_configs["model"])
+        self.embedding_model = get_model("embedding", models_repo['path'] + "/" + indexing_configs["model"])
         self.FilterScoreObj = FilterContext()
 
     def initialize_client(self):
@@ -168,7 +220,7 @@ class ManageInformation:
         """
         if self.dbName == 'chroma':
             self.client = Chroma.getclient(sessions_args = {
-                                                                'path':vectordb_configs["path"],
+                                                                'path':self.vectordb_configs["path"],
                                                                 'host':"0.0.0.0",
                                                                 'port':"5432"
                                                             },
@@ -179,8 +231,8 @@ class ManageInformation:
         Add new data to the database.
 
         Args:
-            data: Data to be added.
-            data_metadata: Metadata for the data.
+            data: Data to be added. A list is indexed as one document per element.
+            data_metadata: Metadata for the data, a list of one metadata per element when data is a list.
             vdb_metadata: Metadata specific to the virtual database (vdb).
 
         Returns:
@@ -188,18 +240,49 @@ class ManageInformation:
 
         Notes:
             - Embeddings are generated for the data using the embedding model.
-            - Each data point is represented as a dictionary containing 'chunked_data', 'embedding', 'metadata', and 'id'.
-        """
-        embedding_data = [
-            {
-                'documents': str(data),
-                'embedding': self.embedding_model.encode(str(data)).tolist(),
-                'metadata': data_metadata,
-                'id': str(uuid.uuid3(uuid.NAMESPACE_DNS, str(data)))
-            }
-        ]
+            - Ids are derived from the document text, so re-adding a document updates it.
+        """
+        if isinstance(data, (list, tuple)):
+            return self.add_new_data_batch(data, data_metadata, vdb_metadata)
+
+        return self.add_new_data_batch([data], [data_metadata], vdb_metadata)
+
+    def add_new_data_batch(self, documents: list, metadatas: list, vdb_metadata: dict, ids: list = None,
+                           batch_size: int = None, upsert_batch_size: int = None):
+        """
+        Add many documents to the database, encoding them in batches and upserting them in large chunks.
+
+        Args:
+            documents (list): Documents to be added.
+            metadatas (list): Metadata of each document.
+            vdb_metadata (dict): Metadata specific to the virtual database (vdb).
+            ids (list, optional): Id of each document. Defaults to a UUID3 of the document text.
+            batch_size (int, optional): Documents per encoder batch. Defaults to indexing.batch_size, else 64.
+            upsert_batch_size (int, optional): Records per upsert. Defaults to vectordb.upsert_batch_size,
+                else the maximum batch size of the client.
+
+        Returns:
+            - str: Message indicating the success of the operation.
+
+        Raises:
+            ValueError: If documents and metadatas (or ids) are not of the same length.
+        """
+        documents = [str(document) for document in documents]
+        if ids is None:
+            ids = [str(uuid.uuid3(uuid.NAMESPACE_DNS, document)) for document in documents]
+
+        if not len(documents) == len(metadatas) == len(ids):
+            raise ValueError("documents, metadatas and ids must be of the same length")
+
+        if not documents:
+            return "Success"
+
+        embeddings = self.embedding_model.encode(documents, batch_size=batch_size or self.encode_batch_size,
+                                                 convert_to_numpy=True).tolist()
 
-        Chroma.addData(self.client, embedding_data, vdb_metadata)
+        Chroma.addDataBatch(self.client, documents, embeddings, metadatas, ids, vdb_metadata,
+                            batch_size=upsert_batch_size or self.vectordb_configs.get("upsert_batch_size"))
+        bump_schema_version("vectordb")
 
         return "Success"
 
@@ -7,13 +7,22 @@ This module provides functions to load, add relations, and retrieve relations fr
 import networkx as nx
 import pickle
 import os
-from pyvis.network import Network
 from itertools import combinations
 from iteration_utilities import unique_everseen
 from Code.Utilities.base_utils import get_config_val
+from Code.Utilities.Retrieval_Pipeline.schemaVersion import bump_schema_version
 
-Graphfilename = get_config_val("retrieval_config", ["relationdb", "path"], True)
-GraphViz = get_config_val("retrieval_config", ["relationdb", "viz"], True)
+
+def __getattr__(name: str):
+    """
+    Resolve the relation DB paths (Graphfilename, GraphViz) on first access instead of at import time.
+    """
+    if name == "Graphfilename":
+        return get_config_val("retrieval_config", ["relationdb", "path"], True)
+    if name == "GraphViz":
+        return get_config_val("retrieval_config", ["relationdb", "viz"], True)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --------------------------------------------------------------------------------------------
 
@@ -29,6 +38,8 @@ def getObj():
         - The function returns the loaded graph object if the file exists.
         - If the file doesn't exist, an empty graph is returned.
     """
+    Graphfilename = get_config_val("retrieval_config", ["relationdb", "path"], True)
+
     if os.path.exists(Graphfilename):
         # If the file exists, load the graph from the pickle file
         with open(Graphfilename, "rb") as GObj:
@@ -58,8 +69,9 @@ def addRelations(GObj: nx.Graph, edges: dict):
         GObj.add_edge(edge[0].lower(), edge[1].lower(), JoinKeys=edge[2])
 
     # Save the graph to a pickle file
-    with open(Graphfilename, 'wb') as f:
+    with open(get_config_val("retrieval_config", ["relationdb", "path"], True), 'wb') as f:
         pickle.dump(GObj, f)
+    bump_schema_version("relationdb")
 
 # --------------------------------------------------------------------------------------------
 
@@ -123,6 +135,8 @@ def visualizeRelations(GObj: nx.Graph):
     Returns:
         str: Message indicating that the HTML graph has been exported.
     """
+    from pyvis.network import Network
+
     # Initialize a Network object
     net = Network(height="1000px", width="100%")
 
@@ -130,7 +144,7 @@ def visualizeRelations(GObj: nx.Graph):
     net.from_nx(GObj)
 
     # Save the graph as an HTML file
-    net.save_graph(GraphViz)
+    net.save_graph(get_config_val("retrieval_config", ["relationdb", "viz"], True))
 
     return "Html Graph : Exported"
 
@@ -0,0 +1,111 @@
+"""
+Module: schemaVersion.py
+
+Description:
+    Explicit version of the schema context queries are built on (table metadata, relation graph and vector index).
+
+    The version is a counter kept in the table metadata DB (retrieval_config.tableMDdb, table schema_version) and
+    bumped by the code that writes the schema context: buildMetadata / importData (table metadata), networkxDB
+    (relation graph) and ManageInformation (vector index). Nothing else changes it, so SQLite WAL checkpoints,
+    Chroma compaction or unrelated writes to the metadata DB never invalidate answers cached against the schema
+    (semanticCache).
+
+    Reads are served from memory for version_cache_seconds, so a lookup per query costs no I/O. A bump made by
+    this process is visible at once, one made by another process after at most version_cache_seconds.
+
+Functions:
+    - get_schema_version() -> str: Current schema version.
+    - bump_schema_version(source) -> int: Records a change of the schema context.
+
+Usage Example:
+    >> answer = cache.lookup(question, get_schema_version())
+    >> ...
+    >> DBObj.post_data(tableDescName, [TableDesc], upsert_keys=['tableName'])
+    >> bump_schema_version("tableMDdb")
+"""
+
+import threading
+import time
+
+from Code.Utilities.base_utils import accessDB, get_config_val
+
+
+version_cache_seconds = 2.0
+
+table_schema = {
+    'tableName' : 'schema_version',
+    'columns' : {
+        'name': ['TEXT', 'PRIMARY KEY'],
+        'version': ['INTEGER', 'DEFAULT 0'],
+        'source': ['TEXT', ''],
+        'updated_at': ['REAL', '']
+    }
+}
+
+# {db_path: (version, monotonic read time)}
+_versions = {}
+_tables_ready = set()
+_versions_lock = threading.Lock()
+
+
+def __get_db__() -> accessDB:
+    """
+    Table metadata DB holding the schema version, with the schema_version table created once per process.
+    """
+    tmddb_config = get_config_val("retrieval_config", ["tableMDdb"], True)
+    DBObj = accessDB(tmddb_config['info_type'], tmddb_config['dbName'])
+
+    if DBObj.db_path not in _tables_ready:
+        DBObj.create_table(table_schema)
+        _tables_ready.add(DBObj.db_path)
+
+    return DBObj
+
+
+def get_schema_version() -> str:
+    """
+    Current version of the schema context.
+
+    Returns:
+        str: The version counter as text, "0" if the schema context was never written.
+    """
+    DBObj = __get_db__()
+
+    with _versions_lock:
+        cached = _versions.get(DBObj.db_path)
+        if cached is not None and time.monotonic() - cached[1] < version_cache_seconds:
+            return str(cached[0])
+
+    row = DBObj.get_data(table_schema['tableName'], {"name": "schema"}, ["version"], casefold=False)
+    version = row[0] if row is not None else 0
+
+    with _versions_lock:
+        _versions[DBObj.db_path] = (version, time.monotonic())
+
+    return str(version)
+
+
+def bump_schema_version(source: str = None) -> int:
+    """
+    Records a change of the schema context. Call it after writing table metadata, relations or the vector index.
+
+    Args:
+        source (str, optional): What changed (e.g. "tableMDdb", "relationdb", "vectordb"), kept for diagnostics.
+
+    Returns:
+        int: The new version.
+    """
+    DBObj = __get_db__()
+    tableName = table_schema['tableName']
+
+    with DBObj.connection:
+        DBObj.cursor.execute(f'''
+            INSERT INTO {tableName} (name, version, source, updated_at) VALUES ('schema', 1, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET version = version + 1, source = excluded.source, updated_at = excluded.updated_at
+        ''', (source, time.time()))
+        version = DBObj.cursor.execute(f"SELECT version FROM {tableName} WHERE name = 'schema'").fetchone()[0]
+
+    with _versions_lock:
+        _versions[DBObj.db_path] = (version, time.monotonic())
+
+    return version
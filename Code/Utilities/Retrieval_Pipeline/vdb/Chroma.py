@@ -5,16 +5,54 @@ Module Definition:
 Functions:
     - getclient(session_type='local', **sessions_args): Retrieve a client based on session type.
     - addData(client, data: list): Add data to a collection using the provided client.
+    - addDataBatch(client, documents, embeddings, metadatas, ids, metadata, batch_size=None): Bulk upsert of
+      parallel lists into a collection, in chunks of batch_size.
     - getData(client, query_emb, metadata: dict, **add_filters): Retrieve data from a collection using the provided client.
 
 Classes:
     - FilterContext: A class providing filtering and scoring functionalities for retrieved information.
 """
 
-import chromadb
 import uuid
+import threading
+import weakref
 
 
+# Upsert chunk size when the client does not report its maximum batch size
+default_upsert_batch_size = 5000
+
+# Collection handles per client, {client: {collection name: collection}}. Weak keys, so the cache neither
+# keeps clients alive nor hands out a handle of a dead client whose id() was reused.
+_collections = weakref.WeakKeyDictionary()
+_collections_lock = threading.Lock()
+
+
+# ------------------------------------------------------------------
+def _get_collection(client, metadata: dict):
+    """
+    Collection named in metadata, created if it doesn't exist. Handles are cached per client so repeated
+    writes do not look the collection up again.
+    """
+    with _collections_lock:
+        client_collections = _collections.setdefault(client, {})
+        if metadata['collection_name'] not in client_collections:
+            client_collections[metadata['collection_name']] = client.get_or_create_collection(
+                name=metadata['collection_name'],
+                metadata={"hnsw:space": metadata.get('sim_metric','cosine')} # 'cosine' is the default space type
+            )
+
+        return client_collections[metadata['collection_name']]
+
+
+def _max_batch_size(client) -> int:
+    """
+    Largest number of records the client accepts in one upsert.
+    """
+    try:
+        return client.get_max_batch_size()
+    except AttributeError:
+        return getattr(client, 'max_batch_size', default_upsert_batch_size)
+
 
 # ------------------------------------------------------------------
 def getclient(sessions_args, session_type = 'local'):
@@ -35,6 +73,9 @@ def getclient(sessions_args, session_type = 'local'):
     if session_type not in ['local','hosted']:
         raise ValueError(f"Session type incorrect. Possible values accepted : {['local','hosted']}")
 
+    # Imported here so that modules using Chroma do not pay for chromadb until a client is needed
+    import chromadb
+
     # Handling for local session type
     if session_type == 'local':
         try:
@@ -88,26 +129,55 @@ def addData(client, data: list, metadata: dict):
         - Each datapoint should have 'chunked_data', 'embedding', and 'metadata' keys.
         - The 'ids' for documents are generated using UUID version 3 based on the 'chunked_data'.
     """
-    # Attempt to get the collection specified in metadata, create it if it doesn't exist
-    try:
-        collection = client.get_collection(name=metadata['collection_name'])
-    except:
-        collection = client.create_collection(
-            name=metadata['collection_name'],
-            metadata={"hnsw:space": metadata.get('sim_metric','cosine')} # 'cosine' is the default space type
-        )
+    return addDataBatch(client,
+                        documents=[datapoint['documents'] for datapoint in data],
+                        embeddings=[datapoint['embedding'] for datapoint in data],
+                        metadatas=[datapoint['metadata'] for datapoint in data],
+                        ids=[datapoint['id'] for datapoint in data],
+                        metadata=metadata)
+
+
+# ------------------------------------------------------------------
+def addDataBatch(client, documents: list, embeddings: list, metadatas: list, ids: list, metadata: dict, batch_size: int = None):
+    """
+    Upsert many records into a collection with one request per chunk instead of one per record.
+
+    Args:
+        client: Client object to interact with the database.
+        documents (list): Document texts.
+        embeddings (list): Embedding vector of each document.
+        metadatas (list): Metadata dictionary of each document.
+        ids (list): Id of each document.
+        metadata (dict): Dictionary containing 'collection_name' and optionally 'sim_metric'.
+        batch_size (int, optional): Records per upsert. Defaults to the maximum batch size of the client.
+
+    Returns:
+        str: Message indicating the success of the operation.
+
+    Raises:
+        ValueError: If the lists are not of the same length.
+
+    Notes:
+        - If the collection specified in metadata doesn't exist, it will be created.
+        - A repeated id keeps its last record, as sequential upserts would.
+    """
+    if not len(documents) == len(embeddings) == len(metadatas) == len(ids):
+        raise ValueError("documents, embeddings, metadatas and ids must be of the same length")
+
+    collection = _get_collection(client, metadata)
+
+    # Chroma rejects duplicate ids within one upsert
+    records = list({record[0]: record for record in zip(ids, documents, embeddings, metadatas)}.values())
 
-    # Add each datapoint to the collection
-    for datapoint in data:
-        # print("----------------------------------------------")
-        # print("Data to be : ", datapoint)
-        # print("----------------------------------------------")
+    batch_size = min(batch_size or _max_batch_size(client), _max_batch_size(client))
 
+    for start in range(0, len(records), batch_size):
+        chunk_ids, chunk_documents, chunk_embeddings, chunk_metadatas = zip(*records[start:start + batch_size])
         collection.upsert(
-            embeddings=datapoint['embedding'],
-            metadatas=datapoint['metadata'],
-            documents=datapoint['documents'],
-            ids= datapoint['id']
+            embeddings=list(chunk_embeddings),
+            metadatas=list(chunk_metadatas),
+            documents=list(chunk_documents),
+            ids=list(chunk_ids)
         )
 
     return f"Success : Added into Collection {metadata['collection_name']}"
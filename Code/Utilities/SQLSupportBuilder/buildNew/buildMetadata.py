@@ -63,11 +63,14 @@ print(BuildMetadataObj.indexinfo(vTableDDL, vTableInsert))
 """
 
 # SQL Database to store data
-from Code.Utilities.base_utils import accessDB
+from Code.Utilities.base_utils import accessDB, log_function
 
 # Vector database to index table descriptions
 from Code.Utilities.Retrieval_Pipeline.RAGPipeline import ManageInformation
 
+# Version of the schema context, invalidates answers cached against the previous metadata
+from Code.Utilities.Retrieval_Pipeline.schemaVersion import bump_schema_version
+
 # Heuristic based solutions
 from Code.Utilities.SQLSupportBuilder.buildNew.heuristic.SQLCodeParseHeuristic import SQLCodeParse as SQP
 
@@ -118,6 +121,9 @@ class buildMD:
             'columns' : {
                 'tableName': ['TEXT', 'PRIMARY KEY'],
                 'Desc': ['TEXT', '']
+            },
+            'indexes' : {
+                'idx_tableDesc_tableName': ['lower(tableName)']
             }
         }
         self.DBObj.create_table(tableDescSchema)
@@ -134,6 +140,9 @@ class buildMD:
                 'type_of_logic': ['TEXT', ''],
                 'base_table': ['TEXT', ''],
                 'Desc': ['TEXT', '']
+            },
+            'indexes' : {
+                'idx_tableColMetadata_TableName': ['lower(TableName)', 'lower(ColumnName)']
             }
         }
         self.DBObj.create_table(tableColSchema)
@@ -153,6 +162,7 @@ class buildMD:
         """
         pass
 
+    @log_function(reraise=True)
     def __LLM_based__(self,
                       tableDDL: str,
                       tableInsert: str):
@@ -182,6 +192,7 @@ class buildMD:
 
         return TableDesc, TableGenDD
 
+    @log_function(reraise=True)
     def indexinfo(self, tableDDL: str, tableInsert: str, tableAttr: dict):
         """
         Indexes information and stores metadata in the database.
@@ -197,19 +208,17 @@ class buildMD:
             TableDesc, TableGenDD = self.__Heuristic_based__(tableDDL, tableInsert)
 
 
-        self.DBObj.delete_data(self.tableDescName, {'tableName':TableDesc['TableName']})
-        self.DBObj.delete_data(self.tableColName, {'TableName':TableDesc['TableName']})
-
         # print("Table Desc : ", TableDesc)
         # print("Table Gen DD : ", "\n -> ".join(map(str,TableGenDD)))
         # print("Table Gen DD type :",type(TableGenDD))
         # print("Table Gen DD type :",type(TableGenDD[0]))
 
-        # Inserting data for Table Desc in database
-        self.DBObj.post_data(self.tableDescName, [TableDesc])
+        # Upserting data for Table Desc in database
+        self.DBObj.post_data(self.tableDescName, [TableDesc], upsert_keys=['tableName'])
 
-        # Inserting data for Table Column metadata into database
-        self.DBObj.post_data(self.tableColName, TableGenDD)
+        # Replacing data for Table Column metadata in database
+        self.DBObj.replace_data(self.tableColName, 'TableName', TableGenDD)
+        bump_schema_version("tableMDdb")
 
         # Collate Table Level metadata
         tableMD = {
@@ -223,7 +232,7 @@ class buildMD:
         # Index table description into VectorDB
         vdbObj = ManageInformation()
         vdbObj.initialize_client()
-        vdbObj.add_new_data([TableDesc['Desc']], [tableMD], vdb_metadata)
+        vdbObj.add_new_data_batch([TableDesc['Desc']], [tableMD], vdb_metadata)
 
         return "Process Complete"
 
@@ -19,7 +19,8 @@ Attributes:
 Methods:
     - __init__(self, service): Initializes an instance of DataDictionary class.
     - __retrieve_existing_dd__(self, table_metadata) -> dict: Retrieves existing data dictionary from storage and updates table metadata.
-    - __generate_new_desc__(self, table_metadata_w_d_desc) -> list: Generates descriptions for new columns.
+    - __generate_new_desc__(self, table_metadata_w_d_desc) -> list: Generates descriptions for new columns (concurrently, through the
+      persistent llmJobQueue "DataDictionary", so an interrupted run resumes without regenerating finished columns).
     - __generate_table_desc__(self, tableName, tableMetadata, tableInsertQ="") -> dict: Generates table description using table metadata and column descriptions.
     - Generate(self, tableName, table_metadata, tableInsertQ) -> tuple: Orchestrates the data dictionary generation process.
 
@@ -40,6 +41,9 @@ from Code.Utilities.base_utils import get_config_val
 from Code.Utilities.base_utils import accessDB
 from Code.Utilities.base_utils import cachefunc
 from Code.Utilities.apiSupport.allApi import CallLLMApi
+from Code.Utilities.apiSupport.llmJobQueue import llmJobQueue
+from Code.Utilities.apiSupport.promptLayout import promptLayout
+from Code.Utilities.apiSupport.rateLimiter import get_max_concurrency
 
 
 memoizer = cachefunc()
@@ -59,7 +63,7 @@ class DataDictionary:
 
         self.DBObj = accessDB(self.info_type, self.dbName)
 
-        self.LLMApiService = CallLLMApi(service)
+        self.LLMApiService = CallLLMApi(service, caller="DataDictionary")
 
     def __retrieve_existing_dd__(self, table_metadata):
         """
@@ -114,6 +118,9 @@ class DataDictionary:
         """
 
         newTableMetadata = []
+        derivedInd = []
+        prompts = []
+        prompt_template = None
 
         for ind, colMD in enumerate(table_metadata_w_d_desc):
             newTableMetadata.append(colMD)
@@ -125,15 +132,38 @@ class DataDictionary:
                 print("Column : ",colMD['columnName'])
                 print("Column Desc : Gonna Cost : Invoking LLM")
                 print("----------------------------------------------")
-                # Setting up prompt
-                with open(r"C:\Users\mehul\Documents\Projects - GIT\Agents\Decompose KG from Code\pythonProject\CoderAssistants\Code\Utlities\Configs\apiTemplates\taskGenerateColumnDesc.txt","r") as promptTmplt_fobj:
-                    prompt_template = promptTmplt_fobj.read()
+                # Setting up prompt (read once for all derived columns)
+                if prompt_template is None:
+                    with open(r"C:\Users\mehul\Documents\Projects - GIT\Agents\Decompose KG from Code\pythonProject\CoderAssistants\Code\Utlities\Configs\apiTemplates\taskGenerateColumnDesc.txt","r") as promptTmplt_fobj:
+                        prompt_template = promptTmplt_fobj.read()
 
                 InterColMetadata = {}
                 InterColMetadata[colMD['columnName']] = colMD
-                prompt = prompt_template.replace("<<ColumnMetadata>>",str(InterColMetadata))
-
-                newTableMetadata[ind]["Desc"] = self.LLMApiService.CallService(prompt)
+                derivedInd.append(ind)
+                # Task instructions and example form a prefix shared by every column, cacheable by the provider
+                prompts.append(promptLayout.from_template(prompt_template, {"<<ColumnMetadata>>": str(InterColMetadata)}))
+
+        # Derived columns are described concurrently through the persistent job queue: descriptions generated
+        # before an interruption are kept and only the missing ones are requested again
+        failed = []
+        if prompts:
+            jobQueue = llmJobQueue("DataDictionary", provider=self.service)
+            keys = jobQueue.enqueue_many([{"prompt": prompt} for prompt in prompts])
+            jobQueue.run(workers=get_max_concurrency(get_config_val("model_config", [str(self.service).upper()], True)),
+                         keys=keys)
+
+            results = jobQueue.results(keys)
+            errors = jobQueue.errors(keys)
+            # Descriptions are cached by memoize from here on, the queue only keeps unfinished work
+            jobQueue.purge(keys)
+            for ind, key in zip(derivedInd, keys):
+                if key in results:
+                    newTableMetadata[ind]["Desc"] = results[key]
+                else:
+                    failed.append(f"{newTableMetadata[ind]['columnName']} ({errors.get(key, 'not processed')})")
+
+        if failed:
+            raise ValueError(f"Failed to generate column descriptions : {', '.join(failed)}")
 
         return newTableMetadata
 
@@ -165,8 +195,8 @@ class DataDictionary:
         with open(r"C:\Users\mehul\Documents\Projects - GIT\Agents\Decompose KG from Code\pythonProject\CoderAssistants\Code\Utlities\Configs\apiTemplates\taskGenerateTableSummary.txt","r") as promptTmplt_fobj:
             prompt_template = promptTmplt_fobj.read()
 
-        prompt = prompt_template.replace("<<Table Data Dictionary>>",str(tableMetadata))
-        prompt = prompt.replace("<<Table Insert Query>>",str(tableInsertQ))
+        prompt = promptLayout.from_template(prompt_template, {"<<Table Data Dictionary>>": str(tableMetadata),
+                                                              "<<Table Insert Query>>": str(tableInsertQ)})
 
         table_desc_dict = {
             "TableName" : tableName,
@@ -51,7 +51,7 @@ class CodeParse:
             service (str): The service to be used for text generation (e.g., "open_ai", "anthropic").
         """
         self.service = service
-        self.LLMApiService = CallLLMApi(service)
+        self.LLMApiService = CallLLMApi(service, caller="CodeParse")
 
     def __get_table_name__(self, tableDDL: str):
         """
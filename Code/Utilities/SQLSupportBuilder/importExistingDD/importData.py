@@ -1,8 +1,9 @@
 import os
 import jsonschema
 import json
-from Code.Utilities.base_utils import accessDB
+from Code.Utilities.base_utils import accessDB, log_function
 from Code.Utilities.Retrieval_Pipeline.RAGPipeline import ManageInformation
+from Code.Utilities.Retrieval_Pipeline.schemaVersion import bump_schema_version
 
 vdb_metadata = {
     "collection_name" : "tableScan",
@@ -78,6 +79,9 @@ class importDD:
             'columns' : {
                 'tableName': ['TEXT', 'PRIMARY KEY'],
                 'Desc': ['TEXT', '']
+            },
+            'indexes' : {
+                'idx_tableDesc_tableName': ['lower(tableName)']
             }
         }
         self.DBObj.create_table(tableDescSchema)
@@ -94,6 +98,9 @@ class importDD:
                 'type_of_logic': ['TEXT', ''],
                 'base_table': ['TEXT', ''],
                 'Desc': ['TEXT', '']
+            },
+            'indexes' : {
+                'idx_tableColMetadata_TableName': ['lower(TableName)', 'lower(ColumnName)']
             }
         }
         self.DBObj.create_table(tableColSchema)
@@ -108,46 +115,63 @@ class importDD:
         Args:
             jsonFilePath (str): Path to the JSON file containing data dictionary information.
 
+        """
+        self.importDataBulk([jsonFilePath,])
+
+    @log_function(reraise=True)
+    def importDataBulk(self, jsonFilePathList: list):
+        """
+        Import data dictionary information of several tables into the database.
+
+        Table descriptions are upserted and column metadata of every table is replaced in bulk, so
+        re-importing a data dictionary never duplicates rows and costs one transaction per table type.
+
+        Args:
+            jsonFilePathList (list): Paths to the JSON files containing data dictionary information.
+
         """
         # Create table, if not exists
         self.createTable()
 
-        with open(jsonFilePath,"r") as tableJsonFObj:
-            importedJsonData = json.load(tableJsonFObj)
+        importedJsonDataList = []
+        for jsonFilePath in jsonFilePathList:
+            with open(jsonFilePath,"r") as tableJsonFObj:
+                importedJsonData = json.load(tableJsonFObj)
 
-        try:
-            validate_json(importedJsonData)
-        except:
-            raise ValueError("JSON is not valid.")
+            try:
+                validate_json(importedJsonData)
+            except:
+                raise ValueError(f"JSON is not valid : {jsonFilePath}")
+
+            importedJsonDataList.append(importedJsonData)
 
         tableDesc = [{
             "tableName":importedJsonData['tableName'],
             "Desc":importedJsonData['tableDesc']
-        },]
+        } for importedJsonData in importedJsonDataList]
 
-        tableCol = importedJsonData['records']
-
-        print(tableDesc)
-        print(tableCol)
+        tableCol = [records for importedJsonData in importedJsonDataList for records in importedJsonData['records']]
 
         try:
-            self.DBObj.post_data(self.tableDescName, tableDesc)
-            self.DBObj.post_data(self.tableColName, tableCol)
+            self.DBObj.post_data(self.tableDescName, tableDesc, upsert_keys=['tableName'])
+            self.DBObj.replace_data(self.tableColName, 'TableName', tableCol)
+            bump_schema_version("tableMDdb")
 
+            # Index table description into VectorDB
+            vdbObj = ManageInformation()
+            vdbObj.initialize_client()
 
-            tableMD = {
+            tableMDs = [{
                 "TableName" : importedJsonData['tableName'],
                 "ENV" : "PROD",
                 "DB" : "NORTHWIND",
                 "TType" : "System"
-            }
+            } for importedJsonData in importedJsonDataList]
 
             # tableMD = {**tableMD, **tableAttr}
 
-            # Index table description into VectorDB
-            vdbObj = ManageInformation()
-            vdbObj.initialize_client()
-            print(vdbObj.add_new_data(importedJsonData['tableDesc'], tableMD, vdb_metadata))
+            print(vdbObj.add_new_data_batch([importedJsonData['tableDesc'] for importedJsonData in importedJsonDataList],
+                                            tableMDs, vdb_metadata))
         except Exception as e:
             print(str(e))
 
@@ -161,8 +185,7 @@ importDataObj = importDD()
 
 base_path = r"C:\Users\mehul\Documents\Projects - GIT\Agents\Decompose KG from Code\pythonProject\CoderAssistants\sampleFiles\NorthWinds\DD"
 
-for files in os.listdir(base_path):
-    importDataObj.importData(os.path.join(base_path,files))
+importDataObj.importDataBulk([os.path.join(base_path,files) for files in os.listdir(base_path)])
 
 # vdbObj = ManageInformation()
 # vdbObj.initialize_client()
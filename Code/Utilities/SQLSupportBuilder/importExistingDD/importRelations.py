@@ -1,4 +1,7 @@
 from Code.Utilities.apiSupport.allApi import CallLLMApi
+from Code.Utilities.apiSupport.llmJobQueue import llmJobQueue
+from Code.Utilities.apiSupport.promptLayout import promptLayout
+from Code.Utilities.base_utils import log_function
 from Code.Utilities.Retrieval_Pipeline.ManageRelations import Relations
 import json
 
@@ -8,26 +11,30 @@ class indexRelations:
     def __init__(self, mechanism="llm", service="Google"):
         self.mechanism = mechanism
         self.service = service
-        self.LLMObj = CallLLMApi(service)
+        self.LLMObj = CallLLMApi(service, caller="indexRelations")
         self.RelationObj = Relations()
 
     def __heuristic__(self, query: str):
         pass
 
 
-    def __llm_based__(self, query: str):
+    def __build_prompt__(self, query: str):
 
         with open(r"C:\Users\mehul\Documents\Projects - GIT\Agents\Decompose KG from Code\pythonProject\CoderAssistants\Code\Utilities\Configs\apiTemplates\taskExtractRelations.txt", "r") as promptFObj:
             prompt_str = promptFObj.read()
 
-        prompt_str = prompt_str.replace("<<SQLQuery>>", query)
+        # Task and worked example form a prefix shared by every query, cacheable by the provider
+        return promptLayout.from_template(prompt_str, {"<<SQLQuery>>": query})
+
+    def __llm_based__(self, query: str):
 
-        relation_results_str = self.LLMObj.CallService(prompt_str)
+        relation_results_str = self.LLMObj.CallService(self.__build_prompt__(query))
 
         print("relation_results : ", relation_results_str)
 
         return json.loads(relation_results_str)
 
+    @log_function(reraise=True)
     def extract_relations(self, query: str):
         if self.mechanism == "llm":
             relations_list = self.__llm_based__(query)
@@ -41,9 +48,45 @@ class indexRelations:
 
         return "Added Query relations"
 
+    @log_function(reraise=True)
+    def extract_relations_bulk(self, queries: list, workers: int = 4):
+        """
+        Extracts the relations of many queries through the persistent llmJobQueue "indexRelations".
+
+        Each query is one job. Once the run is over, the relations of all completed jobs are added to the
+        relation graph with a single load / save, then those jobs are purged, so an interrupted run is resumed
+        by calling this again with the same queries. Responses that are not valid relations are marked failed
+        and sent again by retry_failed.
+        """
+        jobQueue = llmJobQueue("indexRelations", provider=self.service)
+        keys = jobQueue.enqueue_many([{"prompt": self.__build_prompt__(query)} for query in queries])
+        progress = jobQueue.run(workers=workers, keys=keys)
+
+        relations_list, stored_keys = [], []
+        for key, relation_results_str in jobQueue.results(keys).items():
+            try:
+                relations_list.extend(json.loads(relation_results_str))
+            except (TypeError, ValueError) as e:
+                # Dropping the response makes a retry ask the provider again
+                jobQueue.__update__(key, status="failed", response=None, error=f"Invalid relations : {e}")
+                continue
+            stored_keys.append(key)
+
+        if relations_list:
+            self.RelationObj.addRelation(relations_list)
+
+        # The relations are in the graph, the queue only keeps unfinished work
+        jobQueue.purge(stored_keys)
+
+        self.RelationObj.visRelations()
+
+        return f"Added relations of {len(stored_keys)} queries, {len(keys) - len(stored_keys)} not added " \
+               f"({progress['failed']} failed calls)"
+
 
-appendRelationsObj = indexRelations()
+if __name__ == "__main__":
+    appendRelationsObj = indexRelations()
 
-with open(r"C:\Users\mehul\Documents\Projects - GIT\Agents\Decompose KG from Code\pythonProject\CoderAssistants\sampleFiles\NorthWinds\DataRelations.SQL", "r") as DRFobj:
-    appendRelationsObj.extract_relations(DRFobj.read())
+    with open(r"C:\Users\mehul\Documents\Projects - GIT\Agents\Decompose KG from Code\pythonProject\CoderAssistants\sampleFiles\NorthWinds\DataRelations.SQL", "r") as DRFobj:
+        appendRelationsObj.extract_relations(DRFobj.read())
 
@@ -5,21 +5,696 @@ Description:
     This module defines the CallLLMApi class, which is used to interact with various Language Model (LLM) APIs such as OpenAI, Anthropic, and Google.
     It provides methods to call the LLM service API with a provided prompt and retrieve the generated text.
 
+    API templates are parsed once per provider into an apiRequestBuilder and requests are sent over a pooled
+    keep-alive requests.Session per provider, so repeated calls skip template parsing and TLS handshakes.
+
+    CallServiceAsync is the non-blocking counterpart of CallService (built on aiohttp). Concurrent async calls
+    are bounded by a per-provider semaphore, so callers can fan out many prompts with asyncio.gather.
+    CallServiceBatch runs a list of prompts through a bounded thread pool or the async client and reports
+    per-prompt results in input order.
+
+    Every call goes through the shared rateLimiter of its provider (rateLimiter.py): requests/min and tokens/min
+    buckets, an adaptive concurrency limit and jittered exponential retries of 429 / 5xx responses honouring
+    Retry-After. Failures raise LLMApiError, a ValueError carrying the status code.
+
+    CallServiceStream sends the same request in the provider's streaming mode, parses the server-sent events and
+    returns an llmStream yielding text chunks as they arrive (optionally also passed to a callback), with the
+    aggregated text available once consumed.
+
+    CallLLMApi also accepts an ordered provider list, e.g. CallLLMApi(["OPEN_AI", "GROQ"]). Calls then go to the
+    primary provider; if it has not answered within its latency budget a hedged request is sent to the next
+    provider, the first successful answer wins and the slower request is cancelled. A failed call (5xx, 429,
+    connection error) fails over to the next provider immediately instead of retrying. The latency budget of a
+    provider is the observed p95 latency of its successful calls (metrics_registry "llm.<provider>") once
+    enough were seen, else its latency_budget config. Hedges, wins and failovers are counted in metrics_registry. Synchronous
+    hedged calls run on one persistent background event loop, so its aiohttp sessions and their keep-alive
+    connections are reused across calls.
+
+    Every call is recorded in the LLM telemetry store (llmTelemetry.py) with its provider, model, caller,
+    token counts, latency and status. Pass caller (the pipeline stage, e.g. "QueryWriter") to CallLLMApi.
+
+    Prompts may be given as a promptLayout (promptLayout.py): a byte-stable static prefix followed by the per-request
+    part. Anthropic Messages API templates then get a cache_control breakpoint at the end of the prefix; the cached
+    prompt tokens reported by every provider are recorded in the telemetry.
+
+    With LLM_API_MODE=record every successful request / response pair is stored, and with LLM_API_MODE=replay
+    calls are served from those recordings without reaching the network (llmCassette.py). mockServer.py is a
+    local stand-in of the providers for runs without any recordings.
+
 Classes:
+    - apiRequestBuilder: Parsed API template of a provider, builds request payloads and parses responses.
+    - llmStream: Iterator over the text chunks of a streamed response.
     - CallLLMApi: Class to call Language Model (LLM) APIs.
 
+Functions:
+    - get_request_builder(llmService) -> apiRequestBuilder: Cached request builder of a provider.
+    - get_session(llmService, model_config) -> requests.Session: Pooled keep-alive session of a provider.
+    - get_async_session(llmService, model_config) -> tuple: aiohttp session and semaphore of a provider for the running loop.
+    - close_async_sessions(): Closes the aiohttp sessions of the running loop.
+    - get_background_loop() -> asyncio.AbstractEventLoop: Process-wide event loop serving synchronous hedged calls.
+
 Attributes:
     - llmService (str): The LLM service to be used (e.g., "OpenAI", "Anthropic").
     - api_temp_dict (dict): The API dictionary containing endpoint, headers, and payload.
 
+Model config keys (model_config.<PROVIDER>):
+    - api_key, model_name, api_template: Required.
+    - endpoint (optional): Overrides the endpoint of the API template.
+    - pool_size (optional): Maximum keep-alive connections to the provider. Defaults to 10.
+    - connect_timeout / read_timeout (optional): Request timeouts in seconds. Default to 10 and 120.
+    - max_concurrency (optional): Maximum in-flight calls to the provider. Defaults to parallel_slots, else 8.
+    - rpm / tpm, max_retries, backoff_base / backoff_max (optional): Rate limits and retry policy, see rateLimiter.py.
+    - latency_budget (optional): Seconds before a call is hedged to the next provider, used until enough
+      latencies were observed for the p95. Defaults to 10.
+    - api_mode, replay_latency (optional): Record / replay of the calls, see llmCassette.py.
+
+Local provider (model_config.LOCAL, api_template LOCAL.json):
+    An OpenAI-compatible server on the local machine (llama.cpp server, Ollama at
+    http://127.0.0.1:11434/v1/chat/completions, ...), called like the hosted providers. api_key is optional.
+    - context_length (optional): Context window of the loaded model. Prompts that do not fit raise LLMApiError
+      before any request is sent, max_tokens is capped to the room left, and the default context token budget
+      of the query writer is derived from it (tokenBudget.get_context_budget).
+    - parallel_slots (optional): Requests the server decodes at once (llama.cpp -np, OLLAMA_NUM_PARALLEL). Used as
+      max_concurrency, so further calls wait on the client instead of queueing on the server.
+    - keep_alive (optional): How long the server keeps the model loaded after a request (Ollama keep_alive,
+      e.g. "30m", -1 for ever), avoiding model reloads between the calls of a bulk run.
+
 Methods:
-    - __init__(self, llmService="OpenAI"): Initializes an instance of CallLLMApi class.
-    - __set_apidict__(self, llmService): Set up the API dictionary based on the specified LLM service.
+    - __init__(self, llmService="OpenAI", latency_budgets=None, caller=None): Initializes an instance of CallLLMApi class.
+    - __set_apidict__(self, llmService): Get the request builder of the specified LLM service.
     - CallService(self, prompt: str) -> str: Call the LLM service API with the provided prompt and return the generated text.
+    - CallServiceAsync(self, prompt: str) -> str: Coroutine counterpart of CallService.
+    - CallServiceStream(self, prompt: str, callback=None) -> llmStream: Streams the generated text chunk by chunk.
+    - CallServiceHedged(self, prompt: str) -> str: Calls the provider list with hedging and failover.
+    - CallServiceHedgedAsync(self, prompt: str) -> str: Coroutine counterpart of CallServiceHedged.
+    - CallServiceBatch(self, prompts, max_workers=None, mode="thread") -> list: Calls the API for many prompts concurrently.
+    - CallServiceBatchAsync(self, prompts, max_workers=None) -> list: Coroutine counterpart of CallServiceBatch (async mode).
 """
 
+import ast
+import asyncio
+import atexit
+import contextlib
+import copy
+import json
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
+
 from Code.Utilities.base_utils import get_config_val
+from Code.Utilities.base_utils import metrics_registry
+from Code.Utilities.apiSupport.llmCassette import get_cassette
+from Code.Utilities.apiSupport.llmTelemetry import get_telemetry
+from Code.Utilities.apiSupport.rateLimiter import LLMApiError, get_max_concurrency, get_rate_limiter, parse_retry_after
+from Code.Utilities.apiSupport.tokenBudget import count_tokens
+
+
+default_pool_size = 10
+default_connect_timeout = 10
+default_read_timeout = 120
+default_latency_budget = 10
+# Seconds between checks of an API template file for edits
+template_check_interval = 1.0
+
+# Providers speaking the OpenAI chat completions format
+openai_compatible_providers = ("open_ai", "groq", "local")
+min_latency_samples = 20
+
+_request_builders = {}
+_sessions = {}
+_api_lock = threading.Lock()
+
+# aiohttp sessions and semaphores are bound to an event loop, {loop: {provider: (session, semaphore)}}
+_async_sessions = weakref.WeakKeyDictionary()
+
+_background_loop = None
+
+
+class apiRequestBuilder:
+    """
+    Parsed API template of one LLM provider.
+
+    The template file is read, the api key and model are substituted and the result is parsed once.
+    build() only deep copies the payload and places the prompt in it.
+
+    Attributes:
+        provider (str): Lower-cased provider name (e.g., "open_ai", "anthropic").
+        model_config (dict): Model configuration the builder was created from.
+        template (dict): Parsed API template containing endpoint, headers, and payload.
+    """
+    def __init__(self, llmService: str, model_config: dict):
+        """
+        Initializes an instance of apiRequestBuilder class.
+
+        Args:
+            llmService (str): The LLM service.
+            model_config (dict): Shared model configuration of the service (get_config_val(..., shared=True)).
+        """
+        self.provider = str(llmService).lower()
+        self.config_source = model_config
+        self.model_config = model_config = copy.deepcopy(model_config)
+        self.template_path = model_config["api_template"]
+        self.template_mtime = os.path.getmtime(self.template_path)
+        self.template_checked = time.monotonic()
+
+        # Load API calling template
+        with open(self.template_path, "r") as api_temp_fobj:
+            api_temp_str = api_temp_fobj.read()
+            api_temp_str = api_temp_str.replace("<<api_key>>", model_config.get("api_key", ""))
+            api_temp_str = api_temp_str.replace("<<model>>", model_config["model_name"])
+
+        # Convert API template string to dictionary (templates are python literals, trailing commas allowed)
+        self.template = ast.literal_eval(api_temp_str)
+
+        self.endpoint = model_config.get("endpoint", self.template["endpoint"])
+        self.headers = self.template["headers"]
+        self.timeout = (model_config.get("connect_timeout", default_connect_timeout),
+                        model_config.get("read_timeout", default_read_timeout))
+
+    def is_current(self, model_config: dict) -> bool:
+        """
+        Returns True if the builder still matches the model configuration and template file on disk.
+
+        The shared config is the same object until its file is re-parsed, so the usual check is an identity
+        test. The template file is stat-ed at most every template_check_interval seconds.
+        """
+        if model_config is not self.config_source:
+            if model_config != self.model_config:
+                return False
+            self.config_source = model_config
+
+        now = time.monotonic()
+        if now - self.template_checked < template_check_interval:
+            return True
+        if os.path.getmtime(self.template_path) != self.template_mtime:
+            return False
+        self.template_checked = now
+        return True
+
+    def build(self, prompt) -> dict:
+        """
+        Builds the payload of a request.
+
+        Args:
+            prompt (str | promptLayout): The prompt text, or a layout with a cacheable prefix.
+
+        Returns:
+            dict: Request payload.
+        """
+        payload = copy.deepcopy(self.template["payload"])
+
+        prefix = getattr(prompt, "prefix", "")
+        prompt = str(prompt)
+
+        if self.provider in openai_compatible_providers:
+            # Update the payload with the prompt for OpenAI API
+            payload["messages"][0]["content"] = prompt
+
+        if self.provider == "local":
+            self.__fit_local__(payload, prompt)
+
+        if self.provider == "anthropic" and "messages" in payload:
+            # Messages API: the prefix of a prompt layout ends with a cache breakpoint
+            if prefix:
+                content = [{"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}}]
+                suffix = prompt[len(prefix):]
+                # The API rejects blank text blocks, a prompt that is all prefix is sent as one block
+                if suffix.strip():
+                    content.append({"type": "text", "text": suffix})
+                payload["messages"][0]["content"] = content
+            else:
+                payload["messages"][0]["content"] = prompt
+
+        elif self.provider == "anthropic":
+            # Update the payload with the prompt for Anthropic AI API (Text Completions templates)
+            payload["prompt"] = payload["prompt"].replace("<<input_text>>", prompt)
+
+        if self.provider == "google":
+            # Update the payload with the prompt for Google API
+            payload["contents"][0]["parts"][0]["text"] = prompt
+
+        return payload
+
+    def __fit_local__(self, payload: dict, prompt: str):
+        """
+        Applies the context length and keep alive of a local server to a payload.
+        """
+        if "keep_alive" in self.model_config:
+            payload["keep_alive"] = self.model_config["keep_alive"]
+
+        context_length = self.model_config.get("context_length")
+        if not context_length:
+            return
+
+        # Chat template tokens come on top of the prompt
+        prompt_tokens = count_tokens(prompt) + 16
+        if prompt_tokens >= context_length:
+            raise LLMApiError(f"Prompt of about {prompt_tokens} tokens does not fit the context length "
+                              f"{context_length} of the local model.", 413)
+
+        payload["max_tokens"] = min(payload.get("max_tokens", context_length), context_length - prompt_tokens)
+
+    def parse(self, data: dict) -> str:
+        """
+        Extracts the generated text from a response body.
+
+        Args:
+            data (dict): Parsed JSON response.
+
+        Returns:
+            str: Generated text.
+        """
+        if self.provider in openai_compatible_providers:
+            return data['choices'][0]['message']['content']
+        if self.provider == "anthropic":
+            if 'content' in data:
+                return "".join(block.get('text', "") for block in data['content'])
+            return data['completion']
+        if self.provider == "google":
+            return data['candidates'][0]['content']['parts'][0]['text']
+
+    def estimate_tokens(self, payload: dict) -> int:
+        """
+        Rough token estimate of a request (about 4 characters per token plus the completion limit),
+        used to reserve tokens/min before the call.
+        """
+        completion_tokens = payload.get("max_tokens", payload.get("max_tokens_to_sample",
+                                        payload.get("generationConfig", {}).get("maxOutputTokens", 0)))
+        return len(json.dumps(payload)) // 4 + int(completion_tokens or 0)
+
+    def usage_detail(self, data: dict) -> tuple:
+        """
+        (prompt tokens, completion tokens) billed for a response, None if the provider does not report them.
+        Prompt tokens include the cached ones. Streamed events may report only one of the two (the other is None).
+        """
+        if self.provider in openai_compatible_providers:
+            usage = data.get('usage') or {}
+            keys = ('prompt_tokens', 'completion_tokens')
+        elif self.provider == "anthropic":
+            # Messages API streams report the usage in message_start (prompt) and message_delta (completion)
+            usage = data.get('usage') or (data.get('message') or {}).get('usage') or {}
+            if 'input_tokens' not in usage and 'output_tokens' not in usage:
+                return None
+
+            prompt_tokens = None
+            if 'input_tokens' in usage:
+                prompt_tokens = (usage['input_tokens'] + (usage.get('cache_creation_input_tokens') or 0)
+                                 + (usage.get('cache_read_input_tokens') or 0))
+            return prompt_tokens, usage.get('output_tokens')
+        elif self.provider == "google":
+            usage = data.get('usageMetadata') or {}
+            keys = ('promptTokenCount', 'candidatesTokenCount')
+        else:
+            return None
+
+        if keys[0] not in usage:
+            return None
+        return usage[keys[0]], usage.get(keys[1], 0)
+
+    def usage(self, data: dict) -> int:
+        """
+        Total tokens billed for a response, None if the provider does not report it.
+        """
+        usage_detail = self.usage_detail(data)
+        return sum(tokens or 0 for tokens in usage_detail) if usage_detail is not None else None
+
+    def cached_tokens(self, data: dict) -> int:
+        """
+        Prompt tokens served from the provider's prompt cache, None if the provider does not report them.
+        """
+        if self.provider in openai_compatible_providers:
+            return ((data.get('usage') or {}).get('prompt_tokens_details') or {}).get('cached_tokens')
+        if self.provider == "anthropic":
+            usage = data.get('usage') or (data.get('message') or {}).get('usage') or {}
+            return usage.get('cache_read_input_tokens')
+        if self.provider == "google":
+            return (data.get('usageMetadata') or {}).get('cachedContentTokenCount')
+
+    def build_stream(self, prompt) -> tuple:
+        """
+        Builds the endpoint and payload of a streaming (server-sent events) request.
+
+        Args:
+            prompt (str | promptLayout): The prompt text, or a layout with a cacheable prefix.
+
+        Returns:
+            tuple: (endpoint, payload)
+        """
+        endpoint = self.endpoint
+        payload = self.build(prompt)
+
+        if self.provider in openai_compatible_providers + ("anthropic",):
+            payload["stream"] = True
+
+        if self.provider in ("open_ai", "local"):
+            # Final chunk carries the token usage
+            payload["stream_options"] = {"include_usage": True}
+
+        if self.provider == "google":
+            endpoint = endpoint.replace(":generateContent", ":streamGenerateContent")
+            endpoint = endpoint + ("&" if "?" in endpoint else "?") + "alt=sse"
+
+        return endpoint, payload
+
+    def parse_stream_event(self, data: dict) -> str:
+        """
+        Extracts the text delta of one streamed event.
+
+        Args:
+            data (dict): Parsed JSON data of the event.
+
+        Returns:
+            str: Text delta, empty if the event carries no text.
+        """
+        if self.provider in openai_compatible_providers:
+            choices = data.get('choices') or [{}]
+            return choices[0].get('delta', {}).get('content') or ""
+        if self.provider == "anthropic":
+            if data.get('type') == "content_block_delta":
+                return (data.get('delta') or {}).get('text') or ""
+            return data.get('completion') or ""
+        if self.provider == "google":
+            candidates = data.get('candidates') or [{}]
+            return "".join(part.get('text', "") for part in candidates[0].get('content', {}).get('parts', []))
+
+
+def get_request_builder(llmService: str) -> apiRequestBuilder:
+    """
+    Returns the request builder of a provider, building it on first use or when its configuration changed.
+
+    Args:
+        llmService (str): The LLM service.
+
+    Returns:
+        apiRequestBuilder: The request builder.
+    """
+    # Shared (not copied) model configuration, the builder only copies it when it is rebuilt
+    model_config = get_config_val("model_config", [str(llmService).upper()], True, shared=True)
+    provider = str(llmService).lower()
+
+    builder = _request_builders.get(provider)
+    if builder is None or not builder.is_current(model_config):
+        with _api_lock:
+            builder = _request_builders.get(provider)
+            if builder is None or not builder.is_current(model_config):
+                builder = _request_builders[provider] = apiRequestBuilder(llmService, model_config)
+
+    return builder
+
+
+def get_session(llmService: str, model_config: dict) -> requests.Session:
+    """
+    Returns the keep-alive session of a provider, creating it on first use.
+
+    Args:
+        llmService (str): The LLM service.
+        model_config (dict): Model configuration of the service (reads pool_size).
+
+    Returns:
+        requests.Session: Session with a connection pool sized for the provider.
+    """
+    provider = str(llmService).lower()
+
+    session = _sessions.get(provider)
+    if session is None:
+        with _api_lock:
+            session = _sessions.get(provider)
+            if session is None:
+                pool_size = model_config.get("pool_size", default_pool_size)
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+
+                _sessions[provider] = session
+
+    return session
+
+
+def get_async_session(llmService: str, model_config: dict) -> tuple:
+    """
+    Returns the aiohttp session and concurrency semaphore of a provider for the running event loop.
+
+    Args:
+        llmService (str): The LLM service.
+        model_config (dict): Model configuration of the service (reads pool_size and max_concurrency).
+
+    Returns:
+        tuple: (aiohttp.ClientSession, asyncio.Semaphore)
+    """
+    # aiohttp is only needed by async callers
+    import aiohttp
+
+    loop = asyncio.get_running_loop()
+    provider = str(llmService).lower()
+
+    loop_sessions = _async_sessions.setdefault(loop, {})
+    if provider not in loop_sessions or loop_sessions[provider][0].closed:
+        max_concurrency = get_max_concurrency(model_config)
+        connector = aiohttp.TCPConnector(limit=max(model_config.get("pool_size", default_pool_size), max_concurrency))
+        timeout = aiohttp.ClientTimeout(sock_connect=model_config.get("connect_timeout", default_connect_timeout),
+                                        sock_read=model_config.get("read_timeout", default_read_timeout))
+
+        loop_sessions[provider] = (aiohttp.ClientSession(connector=connector, timeout=timeout),
+                                   asyncio.Semaphore(max_concurrency))
+
+    return loop_sessions[provider]
+
+
+async def close_async_sessions():
+    """
+    Closes the aiohttp sessions opened on the running event loop. Call before the loop shuts down.
+    """
+    loop_sessions = _async_sessions.pop(asyncio.get_running_loop(), {})
+    for session, _ in loop_sessions.values():
+        await session.close()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """
+    Returns the process-wide event loop of the synchronous hedged calls, started in a daemon thread on first use.
+
+    The loop lives as long as the process, so the aiohttp sessions opened on it keep their pooled keep-alive
+    connections between calls. They are closed at interpreter exit.
+    """
+    global _background_loop
+
+    if _background_loop is None:
+        with _api_lock:
+            if _background_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-background-loop", daemon=True).start()
+                atexit.register(__stop_background_loop__, loop)
+                _background_loop = loop
+
+    return _background_loop
+
+
+def __stop_background_loop__(loop: asyncio.AbstractEventLoop):
+    """
+    Closes the aiohttp sessions of the background loop and stops it.
+    """
+    try:
+        asyncio.run_coroutine_threadsafe(close_async_sessions(), loop).result(timeout=5)
+    except Exception:
+        pass
+    loop.call_soon_threadsafe(loop.stop)
+
+
+class llmStream:
+    """
+    Iterator over the text chunks of a streamed LLM response.
+
+    The response is read lazily while iterating; the connection and the rate limiter slot are released
+    exactly once, when the stream is exhausted, closed, left through its context manager or garbage
+    collected, also if it was never iterated. llmStream.from_text wraps an already known answer (e.g. a cache
+    hit) so callers handle it like a live stream.
+
+    Attributes:
+        chunks (list): Text chunks received so far.
+        usage (int): Total tokens reported by the provider, None if not reported.
+        usage_detail (tuple): (prompt tokens, completion tokens) reported by the provider, None if not reported.
+        cached_tokens (int): Prompt tokens served from the provider's prompt cache, None if not reported.
+        done (bool): True once the stream has been fully consumed.
+    """
+    def __init__(self, builder: apiRequestBuilder, response, callback=None, on_close=None, text: str = None):
+        """
+        Initializes an instance of llmStream class.
+
+        Args:
+            builder (apiRequestBuilder): Request builder of the provider.
+            response (requests.Response): Response opened with stream=True.
+            callback (callable, optional): Called with every text chunk.
+            on_close (callable, optional): Called with the stream once it is closed (exactly once).
+            text (str, optional): Complete text to replay as a single chunk instead of reading a response.
+        """
+        self.builder = builder
+        self.response = response
+        self.callback = callback
+        self.on_close = on_close
+        self.cached_text = text
+        self.chunks = []
+        self.usage = None
+        self.usage_detail = None
+        self.cached_tokens = None
+        self.done = False
+        self.done_callbacks = []
+        self.released = False
+        # Created on first next(), so a stream that is never iterated holds no generator referencing it
+        self._events = None
+
+    @classmethod
+    def from_text(cls, text: str, callback=None):
+        """
+        Stream replaying an already known text as a single chunk.
+        """
+        return cls(None, None, callback, text=text)
+
+    def add_done_callback(self, fn):
+        """
+        Registers fn(text), called once the stream has been fully consumed.
+        """
+        self.done_callbacks.append(fn)
+
+    @property
+    def text(self) -> str:
+        """
+        Text aggregated from the chunks received so far.
+        """
+        return "".join(self.chunks)
+
+    def __events__(self):
+        """
+        Yields the parsed JSON data of every server-sent event.
+        """
+        # The event-stream format is always UTF-8
+        self.response.encoding = "utf-8"
+
+        data_lines = []
+        event_type = None
+        for line in self.response.iter_lines(decode_unicode=True):
+            if line:
+                field, _, value = line.partition(":")
+                value = value[1:] if value.startswith(" ") else value
+                if field == "data":
+                    data_lines.append(value)
+                elif field == "event":
+                    event_type = value
+                continue
+
+            # Blank line dispatches the event
+            if data_lines:
+                data = "\n".join(data_lines)
+                if data == "[DONE]":
+                    return
+                if event_type == "error":
+                    raise LLMApiError(f"Stream failed : {data}")
+                yield json.loads(data)
+
+            data_lines = []
+            event_type = None
+
+        if data_lines and data_lines != ["[DONE]"]:
+            yield json.loads("\n".join(data_lines))
+
+    def __chunks__(self):
+        """
+        Yields the text delta of every event (or the replayed text).
+        """
+        if self.cached_text is not None:
+            yield self.cached_text
+            return
+
+        for data in self.__events__():
+            usage_detail = self.builder.usage_detail(data)
+            if usage_detail is not None:
+                # Providers may report prompt and completion tokens in different events
+                previous = self.usage_detail or (None, None)
+                self.usage_detail = tuple(new if new is not None else old for new, old in zip(usage_detail, previous))
+                self.usage = sum(tokens or 0 for tokens in self.usage_detail)
+            self.cached_tokens = self.builder.cached_tokens(data) or self.cached_tokens
+            yield self.builder.parse_stream_event(data)
+
+    def __read__(self):
+        try:
+            for chunk in self.__chunks__():
+                if chunk:
+                    self.chunks.append(chunk)
+                    if self.callback is not None:
+                        self.callback(chunk)
+                    yield chunk
+
+            self.done = True
+            for fn in self.done_callbacks:
+                fn(self.text)
+        finally:
+            self.__release__()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if self._events is None:
+            if self.released:
+                raise StopIteration
+            self._events = self.__read__()
+        return next(self._events)
+
+    def read(self) -> str:
+        """
+        Consumes the rest of the stream.
+
+        Returns:
+            str: The aggregated text.
+        """
+        for _ in self:
+            pass
+        return self.text
+
+    def __release__(self):
+        """
+        Closes the response and runs on_close (releasing the rate limiter slot) the first time it is called.
+        """
+        if self.released:
+            return
+        self.released = True
+
+        if self.response is not None:
+            self.response.close()
+            self.response = None
+        if self.on_close is not None:
+            self.on_close(self)
+
+    def close(self):
+        """
+        Closes the stream, whether or not it was iterated. Safe to call more than once.
+        """
+        if self._events is not None:
+            try:
+                self._events.close()
+            except ValueError:
+                # Called from a callback while the stream is being read, the generator releases on exit
+                return
+        self.__release__()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        # A stream dropped without being consumed or closed must still give its slot back
+        try:
+            self.close()
+        except Exception:
+            pass
 
 
 class CallLLMApi:
@@ -27,85 +702,521 @@ class CallLLMApi:
     Class to call Language Model (LLM) APIs.
 
     Attributes:
-        llmService (str): The LLM service to be used (e.g., "OpenAI", "Anthropic").
+        llmService (str): The LLM service to be used (e.g., "OpenAI", "Anthropic"), the primary one of a provider list.
+        providers (list): Ordered providers, hedged / failed over in this order.
+        latency_budgets (dict): Explicit latency budgets in seconds by provider, override p95 and config.
+        caller (str): Pipeline stage issuing the calls, recorded in the telemetry.
         api_temp_dict (dict): The API dictionary containing endpoint, headers, and payload.
     """
-    def __init__(self, llmService = "OpenAI"):
+    def __init__(self, llmService = "OpenAI", latency_budgets: dict = None, caller: str = None):
         """
         Initializes an instance of CallLLMApi class.
 
         Args:
-            llmService (str, optional): The LLM service to be used. Defaults to "OpenAI".
+            llmService (str | list, optional): The LLM service to be used, or an ordered list of services to
+                                               hedge and fail over across. Defaults to "OpenAI".
+            latency_budgets (dict, optional): Latency budget in seconds by provider. Defaults to None.
+            caller (str, optional): Pipeline stage issuing the calls (e.g. "QueryWriter"). Defaults to None.
         """
-        self.llmService = llmService
-        self.api_temp_dict = self.__set_apidict__(llmService)
+        self.providers = list(llmService) if isinstance(llmService, (list, tuple)) else [llmService]
+        if not self.providers:
+            raise ValueError("At least one LLM service is required")
+
+        self.llmService = self.providers[0]
+        self.caller = caller
+        self.latency_budgets = {str(provider).lower(): budget for provider, budget in (latency_budgets or {}).items()}
+        self.api_temp_dict = self.__set_apidict__(self.llmService).template
 
     def __set_apidict__(self, llmService):
         """
-        Set up the API dictionary based on the specified LLM service.
+        Get the request builder of the specified LLM service.
 
         Args:
             llmService (str): The LLM service.
 
         Returns:
-            dict: The API dictionary.
+            apiRequestBuilder: The request builder, parsed once per provider.
         """
-        # Get model configuration from the config file
-        model_config = get_config_val("model_config",[str(llmService).upper()],True)
+        return get_request_builder(llmService)
 
-        # Load API calling template
-        with open(model_config["api_template"],"r") as api_temp_fobj:
-            api_temp_str = api_temp_fobj.read()
-            api_temp_str = api_temp_str.replace("<<api_key>>",model_config["api_key"])
-            api_temp_str = api_temp_str.replace("<<model>>",model_config["model_name"])
+    def CallService(self, prompt: str) -> str:
+        """
+        Call the LLM service API with the provided prompt.
 
-        # Convert API template string to dictionary
-        self.api_temp_dict = eval(api_temp_str)
+        Args:
+            prompt (str | promptLayout): The prompt text, or a layout with a cacheable prefix.
 
+        Returns:
+            str: Generated text.
 
-    def CallService(self, prompt: str) -> str:
+        Raises:
+            LLMApiError: If the API call fails after the retries allowed by the rate limiter (a ValueError).
         """
-        Call the LLM service API with the provided prompt.
+        if len(self.providers) > 1:
+            return self.CallServiceHedged(prompt)
+
+        builder = self.__set_apidict__(self.llmService)
+
+        start = time.perf_counter()
+        try:
+            data = self.__post__(builder, builder.build(prompt))
+        except LLMApiError as e:
+            self.__record__(builder, prompt, start, "sync", error=e)
+            raise
+
+        text = builder.parse(data)
+        self.__record__(builder, prompt, start, "sync", usage_detail=builder.usage_detail(data), text=text,
+                        cached_tokens=builder.cached_tokens(data))
+        return text
+
+    def __post__(self, builder: apiRequestBuilder, payload: dict) -> dict:
+        """
+        Posts a request through the rate limiter of the provider, retrying retryable failures.
+
+        Returns:
+            dict: Parsed JSON response.
+        """
+        cassette = get_cassette(builder.model_config)
+        if cassette is not None and cassette.mode == "replay":
+            data, latency = cassette.lookup(builder.provider, payload)
+            time.sleep(latency)
+            return data
+
+        session = get_session(self.llmService, builder.model_config)
+        limiter = get_rate_limiter(self.llmService, builder.model_config)
+        tokens = builder.estimate_tokens(payload)
+
+        attempt = 0
+        while True:
+            with limiter.slot(tokens):
+                start = time.perf_counter()
+                try:
+                    # Make the API call
+                    response = session.post(builder.endpoint,
+                                            headers=builder.headers,
+                                            json=payload,
+                                            timeout=builder.timeout)
+
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = LLMApiError(f"Failed to create message. {type(e).__name__}: {e}")
+
+                else:
+                    if response.status_code == 200:
+                        # Process the response
+                        data = response.json()
+                        metrics_registry.observe(f"llm.{builder.provider}", time.perf_counter() - start)
+                        limiter.on_success(tokens, builder.usage(data))
+                        if cassette is not None:
+                            cassette.record(builder.provider, payload, data, time.perf_counter() - start)
+                        return data
+
+                    error = LLMApiError(f"Failed to create message. Status code: {response.status_code}",
+                                        response.status_code,
+                                        parse_retry_after(response.headers.get("Retry-After")))
+
+                metrics_registry.observe(f"llm.{builder.provider}", time.perf_counter() - start, error=True)
+
+            delay = limiter.retry_delay(error, attempt)
+            if delay is None:
+                raise error
+
+            time.sleep(delay)
+            attempt += 1
+
+    async def CallServiceAsync(self, prompt: str, max_retries: int = None) -> str:
+        """
+        Call the LLM service API with the provided prompt without blocking the event loop.
+
+        At most max_concurrency calls per provider are in flight at once on a loop; further calls wait
+        for a slot. Fan out with asyncio.gather(*[obj.CallServiceAsync(p) for p in prompts]).
 
         Args:
             prompt (str): The prompt text.
+            max_retries (int, optional): Overrides the max_retries of the provider. Defaults to None.
 
         Returns:
             str: Generated text.
 
         Raises:
-            ValueError: If the API call fails.
+            LLMApiError: If the API call fails after the retries allowed by the rate limiter (a ValueError).
         """
-        self.__set_apidict__(self.llmService)
+        if len(self.providers) > 1:
+            return await self.CallServiceHedgedAsync(prompt)
 
-        if self.llmService.lower() in ("open_ai","groq"):
-            # Update the payload with the prompt for OpenAI API
-            self.api_temp_dict["payload"]["messages"][0]["content"] = prompt
+        builder = self.__set_apidict__(self.llmService)
 
-        if self.llmService.lower() == "anthropic":
-            # Update the payload with the prompt for Anthropic AI API
-            self.api_temp_dict["payload"]["prompt"] = self.api_temp_dict["payload"]["prompt"].replace("<<input_text>>",prompt)
+        start = time.perf_counter()
+        try:
+            data = await self.__post_async__(builder, builder.build(prompt), max_retries)
+        except LLMApiError as e:
+            self.__record__(builder, prompt, start, "async", error=e)
+            raise
+        except asyncio.CancelledError:
+            self.__record__(builder, prompt, start, "async", status="cancelled")
+            raise
 
-        if self.llmService.lower() == "google":
-            # Update the payload with the prompt for Google API
-            self.api_temp_dict["payload"]["contents"][0]["parts"][0]["text"] = prompt
+        text = builder.parse(data)
+        self.__record__(builder, prompt, start, "async", usage_detail=builder.usage_detail(data), text=text,
+                        cached_tokens=builder.cached_tokens(data))
+        return text
+
+    async def __post_async__(self, builder: apiRequestBuilder, payload: dict, max_retries: int = None) -> dict:
+        """
+        Coroutine counterpart of __post__.
+
+        Returns:
+            dict: Parsed JSON response.
+        """
+        cassette = get_cassette(builder.model_config)
+        if cassette is not None and cassette.mode == "replay":
+            data, latency = cassette.lookup(builder.provider, payload)
+            await asyncio.sleep(latency)
+            return data
 
+        # aiohttp is only needed by async callers
+        import aiohttp
 
-        # Make the API call
-        response = requests.post(self.api_temp_dict["endpoint"],
-                                 headers=self.api_temp_dict["headers"],
-                                 json=self.api_temp_dict["payload"])
-        # Process the response
-        data = response.json()
+        session, semaphore = get_async_session(self.llmService, builder.model_config)
+        limiter = get_rate_limiter(self.llmService, builder.model_config)
+        tokens = builder.estimate_tokens(payload)
 
-        if response.status_code == 200:
-            if self.llmService.lower() in ("open_ai", "groq"):
-                return data['choices'][0]['message']['content']
-            if self.llmService.lower() == "anthropic":
-                return data['completion']
-            if self.llmService.lower() == "google":
-                return data['candidates'][0]['content']['parts'][0]['text']
+        attempt = 0
+        while True:
+            async with semaphore, limiter.slot_async(tokens):
+                start = time.perf_counter()
+                try:
+                    # Make the API call
+                    async with session.post(builder.endpoint,
+                                            headers=builder.headers,
+                                            json=payload) as response:
 
-        else:
-            raise  ValueError(f"Failed to create message. Status code: {response.status_code}")
+                        if response.status == 200:
+                            # Process the response
+                            data = await response.json(content_type=None)
+                            metrics_registry.observe(f"llm.{builder.provider}", time.perf_counter() - start)
+                            limiter.on_success(tokens, builder.usage(data))
+                            if cassette is not None:
+                                cassette.record(builder.provider, payload, data, time.perf_counter() - start)
+                            return data
+
+                        error = LLMApiError(f"Failed to create message. Status code: {response.status}",
+                                            response.status,
+                                            parse_retry_after(response.headers.get("Retry-After")))
+
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    error = LLMApiError(f"Failed to create message. {type(e).__name__}: {e}")
+
+                metrics_registry.observe(f"llm.{builder.provider}", time.perf_counter() - start, error=True)
+
+            delay = limiter.retry_delay(error, attempt, max_retries)
+            if delay is None:
+                raise error
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def CallServiceStream(self, prompt: str, callback=None) -> llmStream:
+        """
+        Call the LLM service API in streaming mode.
+
+        The call is retried like CallService until the provider accepts it; the returned stream then yields
+        text chunks as they arrive. The rate limiter slot is held until the stream is consumed or closed.
+
+        Args:
+            prompt (str): The prompt text.
+            callback (callable, optional): Called with every text chunk while the stream is consumed.
+
+        Returns:
+            llmStream: Iterator over the text chunks, stream.text holds the aggregated text.
+
+        Raises:
+            LLMApiError: If the API call fails after the retries allowed by the rate limiter (a ValueError).
+
+        Usage Example:
+            >> for chunk in CallLLMApi("OPEN_AI").CallServiceStream(prompt):
+            >>     print(chunk, end="", flush=True)
+        """
+        builder = self.__set_apidict__(self.llmService)
+        session = get_session(self.llmService, builder.model_config)
+        limiter = get_rate_limiter(self.llmService, builder.model_config)
+
+        endpoint, payload = builder.build_stream(prompt)
+        tokens = builder.estimate_tokens(payload)
+        start = time.perf_counter()
+
+        cassette = get_cassette(builder.model_config)
+        if cassette is not None and cassette.mode == "replay":
+            try:
+                recorded, latency = cassette.lookup(builder.provider, payload)
+            except LLMApiError as e:
+                self.__record__(builder, prompt, start, "stream", error=e)
+                raise
+
+            time.sleep(latency)
+            stream = llmStream.from_text(recorded["text"], callback)
+            stream.usage_detail = tuple(recorded["usage_detail"]) if recorded["usage_detail"] else None
+            stream.cached_tokens = recorded.get("cached_tokens")
+            self.__record__(builder, prompt, start, "stream", usage_detail=stream.usage_detail, text=recorded["text"],
+                            cached_tokens=stream.cached_tokens)
+            return stream
+
+        attempt = 0
+        while True:
+            slot = contextlib.ExitStack()
+            slot.enter_context(limiter.slot(tokens))
+            try:
+                # Make the API call, the body is read while iterating
+                response = session.post(endpoint,
+                                        headers=builder.headers,
+                                        json=payload,
+                                        timeout=builder.timeout,
+                                        stream=True)
+
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = LLMApiError(f"Failed to create message. {type(e).__name__}: {e}")
+
+            except BaseException:
+                slot.close()
+                raise
+
+            else:
+                if response.status_code == 200:
+                    # Receives the stream as an argument: a closure over it would keep it alive in a cycle
+                    def on_close(stream):
+                        slot.close()
+                        limiter.on_success(tokens, stream.usage if stream.done else None)
+                        self.__record__(builder, prompt, start, "stream",
+                                        usage_detail=stream.usage_detail, text=stream.text,
+                                        cached_tokens=stream.cached_tokens,
+                                        status="ok" if stream.done else "cancelled")
+                        if cassette is not None and stream.done:
+                            cassette.record(builder.provider, payload,
+                                            {"text": stream.text, "usage_detail": stream.usage_detail,
+                                             "cached_tokens": stream.cached_tokens},
+                                            time.perf_counter() - start)
+
+                    stream = llmStream(builder, response, callback, on_close)
+                    return stream
+
+                error = LLMApiError(f"Failed to create message. Status code: {response.status_code}",
+                                    response.status_code,
+                                    parse_retry_after(response.headers.get("Retry-After")))
+                response.close()
+
+            slot.close()
+
+            delay = limiter.retry_delay(error, attempt)
+            if delay is None:
+                self.__record__(builder, prompt, start, "stream", error=error)
+                raise error
+
+            time.sleep(delay)
+            attempt += 1
+
+    def __record__(self, builder: apiRequestBuilder, prompt: str, start: float, mode: str,
+                   usage_detail: tuple = None, text: str = None, error: LLMApiError = None, status: str = None,
+                   cached_tokens: int = None):
+        """
+        Records a call in the telemetry store. Token counts are estimated when the provider did not report them.
+        """
+        estimated = usage_detail is None or None in usage_detail
+        if estimated:
+            usage_detail = usage_detail or (None, None)
+            usage_detail = (count_tokens(prompt) if usage_detail[0] is None else usage_detail[0],
+                            (count_tokens(text) if text else 0) if usage_detail[1] is None else usage_detail[1])
+
+        get_telemetry().record(builder.provider, builder.model_config.get("model_name"), self.caller,
+                               usage_detail[0], usage_detail[1], time.perf_counter() - start,
+                               status=status or ("error" if error is not None else "ok"),
+                               status_code=getattr(error, "status_code", None) if error is not None else 200,
+                               estimated=estimated, mode=mode, error=str(error) if error is not None else None,
+                               cached_tokens=cached_tokens)
+
+    def __latency_budget__(self, llmService: str) -> float:
+        """
+        Seconds to wait for a provider before hedging to the next one: explicit budget, else the p95 latency of
+        its successful calls once min_latency_samples of them were seen, else the latency_budget config.
+        """
+        builder = self.__set_apidict__(llmService)
+        if builder.provider in self.latency_budgets:
+            return self.latency_budgets[builder.provider]
+
+        # Fast failures would pull the budget down, only successful calls count
+        name = f"llm.{builder.provider}"
+        if metrics_registry.count(name, include_errors=False) >= min_latency_samples:
+            return metrics_registry.percentile(name, 95, include_errors=False)
+
+        return builder.model_config.get("latency_budget", default_latency_budget)
+
+    async def CallServiceHedgedAsync(self, prompt: str) -> str:
+        """
+        Calls the providers in order with hedging and failover.
+
+        The primary provider is called first. When it has not answered within its latency budget the next
+        provider is called as well; the first successful answer wins and the other requests are cancelled.
+        A failed call fails over to the next provider at once (only the last provider retries).
+
+        Args:
+            prompt (str): The prompt text.
+
+        Returns:
+            str: Generated text.
+
+        Raises:
+            LLMApiError: If every provider failed (the last failure, a ValueError).
+        """
+        primary = str(self.providers[0]).lower()
+        remaining = list(self.providers)
+        running = {}
+        error = None
+
+        def launch():
+            provider = remaining.pop(0)
+            client = CallLLMApi(provider, caller=self.caller)
+            task = asyncio.ensure_future(client.CallServiceAsync(prompt, max_retries=None if not remaining else 0))
+            running[task] = str(provider).lower()
+            return provider
+
+        metrics_registry.increment("llm.hedge.calls")
+        waiting_on = launch()
+        try:
+            while running:
+                budget = self.__latency_budget__(waiting_on) if remaining else None
+                done, _ = await asyncio.wait(running, timeout=budget, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Budget exceeded, hedge to the next provider
+                    metrics_registry.increment("llm.hedge.fired")
+                    waiting_on = launch()
+                    continue
+
+                for task in done:
+                    provider = running.pop(task)
+                    if task.exception() is None:
+                        metrics_registry.increment(f"llm.hedge.won.{provider}")
+                        if provider != primary:
+                            metrics_registry.increment("llm.hedge.won_by_fallback")
+                        return task.result()
+
+                    error = task.exception()
+                    metrics_registry.increment(f"llm.failover.{provider}")
+
+                # Fail over at once when nothing is left in flight
+                if not running and remaining:
+                    waiting_on = launch()
+
+            raise error
+
+        finally:
+            # Cancel the losers and let them release their slots
+            for task in running:
+                task.cancel()
+            if running:
+                metrics_registry.increment("llm.hedge.cancelled", len(running))
+                await asyncio.gather(*running, return_exceptions=True)
+
+    def CallServiceHedged(self, prompt: str) -> str:
+        """
+        Calls the providers in order with hedging and failover, see CallServiceHedgedAsync.
+
+        Args:
+            prompt (str): The prompt text.
+
+        Returns:
+            str: Generated text.
+
+        Raises:
+            LLMApiError: If every provider failed (the last failure, a ValueError).
+        """
+        loop = get_background_loop()
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is loop:
+            raise ValueError("CallServiceHedged can not block the background loop, await CallServiceHedgedAsync instead")
+
+        # Runs on the persistent background loop, reusing its sessions (also when called from another running loop)
+        return asyncio.run_coroutine_threadsafe(self.CallServiceHedgedAsync(prompt), loop).result()
+
+    @staticmethod
+    def __batch_result__(response=None, error=None) -> dict:
+        """
+        Per-prompt result of a batch call.
+        """
+        if error is None:
+            return {"status": "ok", "response": response, "error": None}
+        return {"status": "error", "response": None, "error": f"{type(error).__name__}: {error}"}
+
+    def __call_safe__(self, prompt: str) -> dict:
+        """
+        Calls CallService and captures the failure instead of raising.
+        """
+        try:
+            return self.__batch_result__(response=self.CallService(prompt))
+        except Exception as e:
+            return self.__batch_result__(error=e)
+
+    async def CallServiceBatchAsync(self, prompts: list, max_workers: int = None) -> list:
+        """
+        Calls the LLM service API for every prompt on the running event loop.
+
+        Args:
+            prompts (list): List of prompt texts.
+            max_workers (int, optional): Maximum in-flight calls. Defaults to max_concurrency of the provider.
+
+        Returns:
+            list: One dict per prompt, in input order, with keys status ("ok" / "error"), response and error.
+        """
+        builder = self.__set_apidict__(self.llmService)
+        limiter = asyncio.Semaphore(max_workers or get_max_concurrency(builder.model_config))
+
+        async def call_safe(prompt):
+            async with limiter:
+                try:
+                    return self.__batch_result__(response=await self.CallServiceAsync(prompt))
+                except Exception as e:
+                    return self.__batch_result__(error=e)
+
+        return await asyncio.gather(*[call_safe(prompt) for prompt in prompts])
+
+    def CallServiceBatch(self, prompts: list, max_workers: int = None, mode: str = "thread") -> list:
+        """
+        Calls the LLM service API for every prompt concurrently.
+
+        A failed call does not stop the batch, its error is reported in the result of that prompt.
+
+        Args:
+            prompts (list): List of prompt texts.
+            max_workers (int, optional): Maximum in-flight calls. Defaults to max_concurrency of the provider.
+            mode (str, optional): "thread" (bounded thread pool over CallService) or "async"
+                                  (CallServiceAsync on a private event loop). Defaults to "thread".
+
+        Returns:
+            list: One dict per prompt, in input order, with keys status ("ok" / "error"), response and error.
+
+        Raises:
+            ValueError: If the mode is not supported.
+        """
+        prompts = list(prompts)
+        if not prompts:
+            return []
+
+        if mode == "async":
+            async def run_batch():
+                try:
+                    return await self.CallServiceBatchAsync(prompts, max_workers)
+                finally:
+                    await close_async_sessions()
+
+            return asyncio.run(run_batch())
+
+        if mode != "thread":
+            raise ValueError(f"Unsupported batch mode : {mode}")
+
+        builder = self.__set_apidict__(self.llmService)
+        max_workers = max_workers or get_max_concurrency(builder.model_config)
 
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(prompts))) as executor:
+            return list(executor.map(self.__call_safe__, prompts))
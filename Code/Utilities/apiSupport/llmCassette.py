@@ -0,0 +1,168 @@
+"""
+Module: llmCassette.py
+
+Description:
+    Record / replay store of LLM API calls, so the LLM-driven stages (QueryWriter, buildMD.indexinfo,
+    generate_team) can be run and benchmarked offline, deterministically and without provider costs.
+
+    Modes (LLM_API_MODE environment variable, else the api_mode key of the provider's model_config):
+        - live: calls go to the provider (default).
+        - record: calls go to the provider and every successful request / response pair is stored.
+        - replay: calls are served from the store and never reach the network. A request that was not
+          recorded raises LLMApiError.
+
+    Pairs live in SQLite (DBinst/cassettes/llmCassettes.db, table llm_cassettes), keyed by the provider and
+    the request payload (headers, and so the api key, are not stored). The recorded latency is kept, and
+    replay sleeps for it unless a synthetic latency is configured.
+
+Classes:
+    - llmCassette: Store of recorded request / response pairs.
+
+Functions:
+    - get_api_mode(model_config) -> str: API mode of a provider.
+    - get_cassette(model_config) -> llmCassette: Cassette store of a provider, None in live mode.
+
+Model config keys (model_config.<PROVIDER>):
+    - api_mode (optional): live, record or replay. Overridden by LLM_API_MODE. Defaults to live.
+    - replay_latency (optional): Seconds each replayed call takes, "recorded" for the recorded latency.
+      Overridden by LLM_REPLAY_LATENCY. Defaults to "recorded".
+
+Usage Example:
+    LLM_API_MODE=record python -m Code.Coder.QueryWriter
+    LLM_API_MODE=replay LLM_REPLAY_LATENCY=0 python -m Code.Coder.QueryWriter
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from Code.Utilities.apiSupport.rateLimiter import LLMApiError
+from Code.Utilities.base_utils import accessDB
+
+
+valid_api_modes = ("live", "record", "replay")
+
+_cassettes = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_api_mode(model_config: dict) -> str:
+    """
+    API mode of a provider: LLM_API_MODE environment variable, else its api_mode config, else live.
+    """
+    api_mode = str(os.environ.get("LLM_API_MODE") or model_config.get("api_mode", "live")).lower()
+    if api_mode not in valid_api_modes:
+        raise ValueError(f"Invalid parameter value : api_mode. Acceptable values : {valid_api_modes}")
+    return api_mode
+
+
+class llmCassette:
+    """
+    Store of recorded LLM request / response pairs.
+
+    Attributes:
+        mode (str): record or replay.
+        replay_latency (float): Seconds each replayed call takes, None for the recorded latency.
+    """
+    def __init__(self, mode: str = "replay", replay_latency: float = None):
+        """
+        Initializes an instance of llmCassette class.
+
+        Args:
+            mode (str, optional): record or replay. Defaults to replay.
+            replay_latency (float, optional): Seconds each replayed call takes. Defaults to the recorded latency.
+        """
+        self.mode = mode
+        self.replay_latency = replay_latency
+
+        self.info_type = "cassettes"
+        self.dbName = "llmCassettes"
+        self.DBObj = accessDB(self.info_type, self.dbName)
+        self.table_schema = {
+            'tableName' : 'llm_cassettes',
+            'columns' : {
+                'key': ['TEXT', 'PRIMARY KEY'],
+                'provider': ['TEXT', ''],
+                'request': ['TEXT', ''],
+                'response': ['TEXT', ''],
+                'latency': ['REAL', ''],
+                'recorded_at': ['REAL', '']
+            }
+        }
+        self.tableName = self.table_schema['tableName']
+        self.DBObj.create_table(self.table_schema)
+
+    @staticmethod
+    def key(provider: str, payload: dict) -> str:
+        """
+        Key of a request: hash of the provider and the canonical JSON of the payload.
+        """
+        return hashlib.sha256(json.dumps([str(provider).lower(), payload], sort_keys=True).encode()).hexdigest()
+
+    def record(self, provider: str, payload: dict, response, latency: float):
+        """
+        Stores the response of a request, replacing an earlier recording.
+
+        Args:
+            provider (str): Provider of the request.
+            payload (dict): Request payload.
+            response: JSON serializable response (parsed body, or the aggregated text of a stream).
+            latency (float): Seconds the provider took to answer.
+        """
+        with self.DBObj.connection:
+            self.DBObj.cursor.execute(f"INSERT OR REPLACE INTO {self.tableName} "
+                                      f"(key, provider, request, response, latency, recorded_at) VALUES (?, ?, ?, ?, ?, ?)",
+                                      (self.key(provider, payload), str(provider).lower(), json.dumps(payload),
+                                       json.dumps(response), latency, time.time()))
+
+    def lookup(self, provider: str, payload: dict) -> tuple:
+        """
+        Recorded response of a request.
+
+        Args:
+            provider (str): Provider of the request.
+            payload (dict): Request payload.
+
+        Returns:
+            tuple: (response, seconds the replayed call should take)
+
+        Raises:
+            LLMApiError: If the request was not recorded.
+        """
+        self.DBObj.cursor.execute(f"SELECT response, latency FROM {self.tableName} WHERE key = ?",
+                                  (self.key(provider, payload),))
+        row = self.DBObj.cursor.fetchone()
+        if row is None:
+            raise LLMApiError(f"No recorded response for this {provider} request (replay mode). "
+                              f"Record it first with LLM_API_MODE=record.")
+
+        return json.loads(row[0]), row[1] if self.replay_latency is None else self.replay_latency
+
+
+def get_cassette(model_config: dict) -> llmCassette:
+    """
+    Cassette store of a provider, shared by all threads of the process.
+
+    Args:
+        model_config (dict): Model configuration of the provider.
+
+    Returns:
+        llmCassette: The store, None in live mode.
+    """
+    api_mode = get_api_mode(model_config)
+    if api_mode == "live":
+        return None
+
+    replay_latency = os.environ.get("LLM_REPLAY_LATENCY", model_config.get("replay_latency", "recorded"))
+    replay_latency = None if str(replay_latency).lower() == "recorded" else float(replay_latency)
+
+    cassette = _cassettes.get((api_mode, replay_latency))
+    if cassette is None:
+        with _cassettes_lock:
+            cassette = _cassettes.get((api_mode, replay_latency))
+            if cassette is None:
+                cassette = _cassettes[(api_mode, replay_latency)] = llmCassette(api_mode, replay_latency)
+
+    return cassette
@@ -0,0 +1,592 @@
+"""
+Module: llmJobQueue.py
+
+Description:
+    Persistent, resumable queue of LLM jobs for long bulk runs (data dictionary generation over a whole
+    warehouse, relation extraction over many queries).
+
+    Jobs live in SQLite (DBinst/jobs/llmJobQueue.db, table llm_jobs) and are keyed by an idempotency key
+    (by default a hash of the queue, provider and prompt), so enqueueing the same work again is a no-op and
+    a job that is already done is never sent twice. Worker threads claim jobs with a lease, call the
+    provider through CallLLMApi, store the response and pass it to the job's result handler, which writes it
+    where it belongs (metadata DB, ...).
+
+    Failed calls are retried with exponential backoff up to max_attempts, then marked failed. Responses are
+    stored before the handler runs, so a job whose handler failed is retried without calling the provider
+    again. Several processes can drain the same queue: claims are a single atomic UPDATE, and jobs of a dead
+    process are reclaimed once their lease expires. Library callers run only their own job keys
+    (run(keys=...)) and never reset leases, so concurrent callers neither process nor re-send each other's
+    jobs. The resume CLI (run without --shared) resets the leases of an interrupted run straight away.
+
+    Prompts may be promptLayouts (promptLayout.py); the length of their cacheable prefix is stored with the
+    job so the provider cache hints survive the queue.
+
+    Result handlers are stored as "package.module:function" paths so any process can resolve them. They are
+    called as handler(response, context) one at a time.
+
+    The queue is not a response cache: done jobs are kept only until their results are read (callers purge
+    them), and at most done_ttl seconds, so a stale response is never served for work enqueued again later.
+
+Classes:
+    - llmJobQueue: Persistent queue of LLM jobs.
+
+Usage Example:
+    >> queue = llmJobQueue("DataDictionary", provider="OPEN_AI")
+    >> keys = queue.enqueue_many([{"prompt": prompt, "context": {"column": name}} for name, prompt in prompts])
+    >> queue.run(workers=8, keys=keys)
+    >> responses = queue.results(keys)
+    >> queue.purge(keys)
+
+    python -m Code.Utilities.apiSupport.llmJobQueue status --queue DataDictionary
+    python -m Code.Utilities.apiSupport.llmJobQueue run --queue DataDictionary --workers 8
+    python -m Code.Utilities.apiSupport.llmJobQueue retry-failed --queue DataDictionary
+    python -m Code.Utilities.apiSupport.llmJobQueue purge --queue DataDictionary --older-than 86400
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+
+from Code.Utilities.apiSupport.promptLayout import promptLayout
+from Code.Utilities.base_utils import accessDB, metrics_registry
+
+
+default_max_attempts = 3
+default_lease_seconds = 900
+default_backoff_base = 5
+default_backoff_max = 300
+default_done_ttl = 7 * 24 * 3600
+
+# Bound parameters per "IN (...)" query, below SQLite's SQLITE_MAX_VARIABLE_NUMBER on every build
+key_chunk_size = 500
+
+job_statuses = ("pending", "running", "done", "failed")
+
+_handlers = {}
+_handler_lock = threading.Lock()
+
+
+def __resolve_handler__(path: str):
+    """
+    Imports a "package.module:function" result handler once.
+    """
+    with _handler_lock:
+        if path not in _handlers:
+            module_name, _, function_name = path.partition(":")
+            if not function_name:
+                raise ValueError(f"Invalid result handler : {path}. Expected 'package.module:function'")
+            _handlers[path] = getattr(importlib.import_module(module_name), function_name)
+        return _handlers[path]
+
+
+class llmJobQueue:
+    """
+    Persistent queue of LLM jobs.
+
+    Attributes:
+        queue_name (str): Name of the queue, jobs of different queues never mix.
+        provider (str): Default provider of the enqueued jobs.
+        caller (str): Caller recorded in the LLM telemetry. Defaults to the queue name.
+        max_attempts (int): Attempts of a job before it is marked failed.
+        lease_seconds (float): Seconds a claimed job is reserved for its worker.
+        done_ttl (float): Seconds a done job is kept, None to keep done jobs until they are purged.
+    """
+    def __init__(self, queue_name: str = "default", provider: str = None, caller: str = None,
+                 max_attempts: int = default_max_attempts, lease_seconds: float = default_lease_seconds,
+                 done_ttl: float = default_done_ttl):
+        """
+        Initializes an instance of llmJobQueue class.
+
+        Args:
+            queue_name (str, optional): Name of the queue. Defaults to "default".
+            provider (str, optional): Default provider of the enqueued jobs. Defaults to None.
+            caller (str, optional): Caller recorded in the LLM telemetry. Defaults to the queue name.
+            max_attempts (int, optional): Attempts of a job before it is marked failed. Defaults to 3.
+            lease_seconds (float, optional): Seconds a claimed job is reserved for its worker. Defaults to 900.
+            done_ttl (float, optional): Seconds a done job is kept. Defaults to 7 days.
+        """
+        self.queue_name = queue_name
+        self.provider = provider
+        self.caller = caller or queue_name
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.done_ttl = done_ttl
+
+        self.info_type = "jobs"
+        self.dbName = "llmJobQueue"
+        self.DBObj = accessDB(self.info_type, self.dbName)
+        self.table_schema = {
+            'tableName' : 'llm_jobs',
+            'columns' : {
+                'job_key': ['TEXT', 'PRIMARY KEY'],
+                'queue': ['TEXT', ''],
+                'provider': ['TEXT', ''],
+                'prompt': ['TEXT', ''],
+                'prefix_length': ['INTEGER', 'DEFAULT 0'],
+                'handler': ['TEXT', ''],
+                'context': ['TEXT', ''],
+                'status': ['TEXT', "DEFAULT 'pending'"],
+                'attempts': ['INTEGER', 'DEFAULT 0'],
+                'response': ['TEXT', ''],
+                'error': ['TEXT', ''],
+                'worker': ['TEXT', ''],
+                'claim_id': ['TEXT', ''],
+                'lease_until': ['REAL', ''],
+                'available_at': ['REAL', 'DEFAULT 0'],
+                'created_at': ['REAL', ''],
+                'finished_at': ['REAL', '']
+            },
+            'indexes' : {
+                'idx_llm_jobs_queue_status': ['queue', 'status', 'available_at'],
+                'idx_llm_jobs_queue_finished': ['queue', 'status', 'finished_at']
+            }
+        }
+        self.tableName = self.table_schema['tableName']
+        self.DBObj.create_table(self.table_schema)
+
+        self._handler_lock = threading.Lock()
+        self._clients = {}
+
+    # ------------------------------------------------------------------------------------------
+    # Enqueue
+    # ------------------------------------------------------------------------------------------
+
+    def make_key(self, prompt, provider: str = None) -> str:
+        """
+        Default idempotency key of a job: hash of the queue, provider and prompt.
+        """
+        return hashlib.sha256(json.dumps([self.queue_name, str(provider or self.provider).upper(), str(prompt)]).encode()).hexdigest()
+
+    def enqueue_many(self, jobs: list[dict]) -> list[str]:
+        """
+        Adds jobs to the queue. Jobs whose key is already queued (in any status) are left as they are; done jobs
+        older than done_ttl are purged first, so their work is requested again.
+
+        Args:
+            jobs (list): Dictionaries with prompt (str or promptLayout) and optionally provider, key, handler
+                         ("package.module:function") and context (JSON serializable, passed to the handler).
+
+        Returns:
+            list: Idempotency keys of the jobs, in input order.
+
+        Raises:
+            ValueError: If a job has no provider and the queue has no default provider.
+        """
+        now = time.time()
+        keys, rows = [], []
+        for job in jobs:
+            provider = job.get("provider") or self.provider
+            if provider is None:
+                raise ValueError("Job provider not provided and the queue has no default provider")
+
+            key = job.get("key") or self.make_key(job["prompt"], provider)
+            keys.append(key)
+            rows.append((key, self.queue_name, str(provider).upper(), str(job["prompt"]),
+                         len(getattr(job["prompt"], "prefix", "")), job.get("handler"), json.dumps(job.get("context")), now))
+
+        if self.done_ttl is not None:
+            self.purge(older_than=self.done_ttl)
+
+        with self.DBObj.connection:
+            self.DBObj.cursor.executemany(f"INSERT OR IGNORE INTO {self.tableName} "
+                                          f"(job_key, queue, provider, prompt, prefix_length, handler, context, created_at) "
+                                          f"VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return keys
+
+    def enqueue(self, prompt, provider: str = None, key: str = None, handler: str = None, context=None) -> str:
+        """
+        Adds one job to the queue, see enqueue_many.
+
+        Returns:
+            str: Idempotency key of the job.
+        """
+        return self.enqueue_many([{"prompt": prompt, "provider": provider, "key": key,
+                                   "handler": handler, "context": context}])[0]
+
+    # ------------------------------------------------------------------------------------------
+    # Claim / complete
+    # ------------------------------------------------------------------------------------------
+
+    def reset_leases(self, expired_only: bool = False) -> int:
+        """
+        Puts running jobs back to pending, e.g. those of a run that died.
+
+        Args:
+            expired_only (bool, optional): Only jobs whose lease expired (safe while other processes drain
+                                           the queue). Defaults to False.
+
+        Returns:
+            int: Number of jobs reset.
+        """
+        condition = "AND lease_until < ?" if expired_only else ""
+        params = (self.queue_name, time.time()) if expired_only else (self.queue_name,)
+
+        with self.DBObj.connection:
+            self.DBObj.cursor.execute(f"UPDATE {self.tableName} SET status = 'pending', worker = NULL, claim_id = NULL "
+                                      f"WHERE queue = ? AND status = 'running' {condition}", params)
+            return self.DBObj.cursor.rowcount
+
+    def claim(self, worker: str, n: int = 1, keys: list = None) -> list[dict]:
+        """
+        Claims up to n available jobs (pending, or running with an expired lease) for a worker, only among
+        keys (at most key_chunk_size of them) when provided.
+
+        Returns:
+            list: Claimed jobs as dictionaries.
+        """
+        now = time.time()
+        claim_id = uuid.uuid4().hex
+        key_filter = f"AND job_key IN ({', '.join('?' * len(keys))})" if keys is not None else ""
+
+        # One UPDATE statement, so concurrent workers and processes never claim the same job
+        with self.DBObj.connection:
+            self.DBObj.cursor.execute(f'''
+                UPDATE {self.tableName}
+                SET status = 'running', worker = ?, claim_id = ?, lease_until = ?, attempts = attempts + 1
+                WHERE job_key IN (
+                    SELECT job_key FROM {self.tableName}
+                    WHERE queue = ? AND available_at <= ?
+                      AND (status = 'pending' OR (status = 'running' AND lease_until < ?)) {key_filter}
+                    ORDER BY created_at
+                    LIMIT ?)''', (worker, claim_id, now + self.lease_seconds, self.queue_name, now, now, *(keys or ()), n))
+
+        self.DBObj.cursor.execute(f"SELECT job_key, provider, prompt, prefix_length, handler, context, attempts, response "
+                                  f"FROM {self.tableName} WHERE claim_id = ?", (claim_id,))
+        columns = ("job_key", "provider", "prompt", "prefix_length", "handler", "context", "attempts", "response")
+        return [dict(zip(columns, row)) for row in self.DBObj.cursor.fetchall()]
+
+    def __update__(self, job_key: str, **values):
+        with self.DBObj.connection:
+            self.DBObj.cursor.execute(f"UPDATE {self.tableName} SET {', '.join(f'{col} = ?' for col in values)} "
+                                      f"WHERE job_key = ?", (*values.values(), job_key))
+
+    def __fail__(self, job: dict, error: Exception, retryable: bool):
+        """
+        Schedules a retry of a failed job with exponential backoff, or marks it failed.
+        """
+        if retryable and job["attempts"] < self.max_attempts:
+            delay = min(default_backoff_max, default_backoff_base * 2 ** (job["attempts"] - 1))
+            self.__update__(job["job_key"], status="pending", error=str(error), worker=None, claim_id=None,
+                            available_at=time.time() + delay)
+            metrics_registry.increment(f"llm_jobs.{self.queue_name}.retried")
+        else:
+            self.__update__(job["job_key"], status="failed", error=str(error), finished_at=time.time())
+            metrics_registry.increment(f"llm_jobs.{self.queue_name}.failed")
+
+    def __client__(self, provider: str):
+        if provider not in self._clients:
+            from Code.Utilities.apiSupport.allApi import CallLLMApi
+
+            self._clients[provider] = CallLLMApi(provider, caller=self.caller)
+        return self._clients[provider]
+
+    def process(self, job: dict):
+        """
+        Runs one claimed job: calls the provider (unless a response was stored by an earlier attempt),
+        stores the response, then runs the result handler.
+        """
+        response = job["response"]
+        if response is None:
+            prompt = promptLayout.from_text(job["prompt"], job["prefix_length"]) if job["prefix_length"] else job["prompt"]
+            try:
+                response = self.__client__(job["provider"]).CallService(prompt)
+            except Exception as e:
+                # Only LLMApiErrors flagged retryable (429, 5xx, connection errors) are worth another attempt
+                self.__fail__(job, e, getattr(e, "retryable", False))
+                return
+            self.__update__(job["job_key"], response=response)
+
+        if job["handler"]:
+            try:
+                with self._handler_lock:
+                    __resolve_handler__(job["handler"])(response, json.loads(job["context"]))
+            except Exception as e:
+                self.__fail__(job, ValueError(f"Result handler failed : {type(e).__name__}: {e}"), True)
+                return
+
+        self.__update__(job["job_key"], status="done", error=None, finished_at=time.time())
+        metrics_registry.increment(f"llm_jobs.{self.queue_name}.done")
+
+    # ------------------------------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------------------------------
+
+    def __next_available__(self) -> float:
+        """
+        Seconds until the next pending job becomes available, None if no job is pending.
+        """
+        self.DBObj.cursor.execute(f"SELECT MIN(available_at) FROM {self.tableName} WHERE queue = ? AND status = 'pending'",
+                                  (self.queue_name,))
+        next_at = self.DBObj.cursor.fetchone()[0]
+        return None if next_at is None else max(0.0, next_at - time.time())
+
+    def __open_keys__(self, keys: list) -> list:
+        """
+        Keys among the given ones whose job is still pending or running.
+        """
+        open_keys = []
+        for start in range(0, len(keys), key_chunk_size):
+            chunk = keys[start:start + key_chunk_size]
+            self.DBObj.cursor.execute(f"SELECT job_key FROM {self.tableName} WHERE queue = ? AND status IN ('pending', 'running') "
+                                      f"AND job_key IN ({', '.join('?' * len(chunk))})", (self.queue_name, *chunk))
+            open_keys.extend(row[0] for row in self.DBObj.cursor.fetchall())
+        return open_keys
+
+    def __claim_among__(self, worker: str, keys: list) -> list[dict]:
+        for start in range(0, len(keys), key_chunk_size):
+            jobs = self.claim(worker, keys=keys[start:start + key_chunk_size])
+            if jobs:
+                return jobs
+        return []
+
+    def __worker__(self, worker: str, stop: threading.Event, keys: list = None):
+        open_keys = None if keys is None else self.__open_keys__(keys)
+
+        while not stop.is_set():
+            jobs = self.claim(worker) if keys is None else self.__claim_among__(worker, open_keys)
+            if jobs:
+                self.process(jobs[0])
+                continue
+
+            if keys is None:
+                # Nothing claimable: wait for jobs in backoff, stop when none is left
+                wait = self.__next_available__()
+                if wait is None:
+                    break
+                stop.wait(min(wait, 1.0))
+            else:
+                # Own jobs in backoff, or leased by another worker or process: wait until they finish
+                open_keys = self.__open_keys__(open_keys)
+                if not open_keys:
+                    break
+                stop.wait(1.0)
+
+        self.DBObj.close()
+
+    def run(self, workers: int = 4, reset_leases: bool = False, progress_interval: float = 10.0, keys: list = None) -> dict:
+        """
+        Drains the queue with worker threads, printing progress every progress_interval seconds.
+
+        Args:
+            workers (int, optional): Number of worker threads. Defaults to 4.
+            reset_leases (bool, optional): Resume the running jobs of an interrupted run straight away instead of
+                                           once their lease expires. Only safe when no other process drains the
+                                           queue, so reserved for the resume CLI. Defaults to False.
+            progress_interval (float, optional): Seconds between progress lines, 0 to disable. Defaults to 10.
+            keys (list, optional): Only process these jobs, and return once none of them is pending or running
+                                   (jobs leased by other workers are waited on, not re-sent). Defaults to every
+                                   job of the queue.
+
+        Returns:
+            dict: Final progress, see progress().
+        """
+        if reset_leases:
+            resumed = self.reset_leases()
+            if resumed:
+                print(f"[{self.queue_name}] Resuming {resumed} interrupted jobs")
+
+        start = time.time()
+        done_before = self.progress(keys=keys)["done"]
+
+        stop = threading.Event()
+        worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        threads = [threading.Thread(target=self.__worker__, args=(f"{worker_prefix}:{ind}", stop, keys), daemon=True)
+                   for ind in range(workers)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            alive = threads
+            while alive:
+                alive[0].join(timeout=progress_interval or None)
+                alive = [thread for thread in threads if thread.is_alive()]
+                if progress_interval and alive:
+                    self.print_progress(start, done_before, keys=keys)
+        except KeyboardInterrupt:
+            # Jobs in flight finish, the rest stays pending for the next run
+            stop.set()
+            for thread in threads:
+                thread.join()
+            raise
+
+        progress = self.progress(start, done_before, keys)
+        self.print_progress(start, done_before, progress)
+        return progress
+
+    # ------------------------------------------------------------------------------------------
+    # Progress / results
+    # ------------------------------------------------------------------------------------------
+
+    def progress(self, since: float = None, done_before: int = 0, keys: list = None) -> dict:
+        """
+        Job counts of the queue and, given the start of a run, its throughput and ETA.
+
+        Args:
+            since (float, optional): Epoch start of the run.
+            done_before (int, optional): Jobs already done when the run started.
+            keys (list, optional): Only count these jobs. Defaults to every job of the queue.
+
+        Returns:
+            dict: pending, running, done, failed and total counts; with since, also elapsed,
+                  jobs_per_sec and eta (seconds, None while nothing completed).
+        """
+        progress = {status: 0 for status in job_statuses}
+        query = f"SELECT status, COUNT(*) FROM {self.tableName} WHERE queue = ?"
+        if keys is None:
+            self.DBObj.cursor.execute(query + " GROUP BY status", (self.queue_name,))
+            progress.update(dict(self.DBObj.cursor.fetchall()))
+        else:
+            for start in range(0, len(keys), key_chunk_size):
+                chunk = keys[start:start + key_chunk_size]
+                self.DBObj.cursor.execute(query + f" AND job_key IN ({', '.join('?' * len(chunk))}) GROUP BY status",
+                                          (self.queue_name, *chunk))
+                for status, count in self.DBObj.cursor.fetchall():
+                    progress[status] += count
+        progress["total"] = sum(progress[status] for status in job_statuses)
+
+        if since is not None:
+            elapsed = max(time.time() - since, 1e-9)
+            completed = progress["done"] - done_before
+            remaining = progress["pending"] + progress["running"]
+
+            progress["elapsed"] = elapsed
+            progress["jobs_per_sec"] = completed / elapsed
+            progress["eta"] = remaining / progress["jobs_per_sec"] if completed else None
+
+        return progress
+
+    def print_progress(self, since: float, done_before: int = 0, progress: dict = None, keys: list = None):
+        progress = progress or self.progress(since, done_before, keys)
+        eta = f"{progress['eta']:.0f} s" if progress["eta"] is not None else "-"
+        print(f"[{self.queue_name}] {progress['done']}/{progress['total']} done | {progress['failed']} failed | "
+              f"{progress['running']} running | {progress['jobs_per_sec']:.2f} jobs/s | ETA {eta}")
+
+    def __select_by_status__(self, column: str, status: str, keys: list = None) -> dict:
+        """
+        {job key: column} of the jobs of the queue in a status, only the given keys when provided.
+        """
+        query = f"SELECT job_key, {column} FROM {self.tableName} WHERE queue = ? AND status = ?"
+        if keys is None:
+            self.DBObj.cursor.execute(query, (self.queue_name, status))
+            return dict(self.DBObj.cursor.fetchall())
+
+        selected = {}
+        for start in range(0, len(keys), key_chunk_size):
+            chunk = keys[start:start + key_chunk_size]
+            self.DBObj.cursor.execute(query + f" AND job_key IN ({', '.join('?' * len(chunk))})",
+                                      (self.queue_name, status, *chunk))
+            selected.update(self.DBObj.cursor.fetchall())
+        return selected
+
+    def results(self, keys: list = None) -> dict:
+        """
+        Responses of the done jobs.
+
+        Args:
+            keys (list, optional): Only these jobs. Defaults to every done job of the queue.
+
+        Returns:
+            dict: {job key: response}
+        """
+        return self.__select_by_status__("response", "done", keys)
+
+    def errors(self, keys: list = None) -> dict:
+        """
+        Last errors of the failed jobs, {job key: error}, optionally only for the given keys.
+        """
+        return self.__select_by_status__("error", "failed", keys)
+
+    def purge(self, keys: list = None, older_than: float = None) -> int:
+        """
+        Deletes done jobs of the queue, once their results are consumed.
+
+        Args:
+            keys (list, optional): Only these jobs. Defaults to every done job of the queue.
+            older_than (float, optional): Only jobs finished more than this many seconds ago.
+
+        Returns:
+            int: Number of jobs deleted.
+        """
+        query = f"DELETE FROM {self.tableName} WHERE queue = ? AND status = 'done'"
+        params = (self.queue_name,)
+        if older_than is not None:
+            query += " AND finished_at < ?"
+            params += (time.time() - older_than,)
+
+        with self.DBObj.connection:
+            if keys is None:
+                self.DBObj.cursor.execute(query, params)
+                return self.DBObj.cursor.rowcount
+
+            purged = 0
+            for start in range(0, len(keys), key_chunk_size):
+                chunk = keys[start:start + key_chunk_size]
+                self.DBObj.cursor.execute(query + f" AND job_key IN ({', '.join('?' * len(chunk))})", (*params, *chunk))
+                purged += self.DBObj.cursor.rowcount
+            return purged
+
+    def retry_failed(self) -> int:
+        """
+        Puts the failed jobs back to pending with a fresh attempt count.
+
+        Returns:
+            int: Number of jobs requeued.
+        """
+        with self.DBObj.connection:
+            self.DBObj.cursor.execute(f"UPDATE {self.tableName} SET status = 'pending', attempts = 0, available_at = 0 "
+                                      f"WHERE queue = ? AND status = 'failed'", (self.queue_name,))
+            return self.DBObj.cursor.rowcount
+
+    def clear(self, status: str = None):
+        """
+        Deletes the jobs of the queue, or only those in the given status.
+        """
+        if status is not None and status not in job_statuses:
+            raise ValueError(f"Invalid parameter value : status. Acceptable values : {job_statuses}")
+
+        with self.DBObj.connection:
+            self.DBObj.cursor.execute(f"DELETE FROM {self.tableName} WHERE queue = ?" + (" AND status = ?" if status else ""),
+                                      (self.queue_name, status) if status else (self.queue_name,))
+
+
+def main(argv: list = None):
+    """
+    Command line interface of the job queue.
+    """
+    parser = argparse.ArgumentParser(description="Persistent LLM job queue.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Drain a queue (resumes an interrupted run).")
+    run_parser.add_argument("--queue", required=True)
+    run_parser.add_argument("--workers", type=int, default=4)
+    run_parser.add_argument("--shared", action="store_true",
+                            help="Other processes drain the same queue, only reclaim expired leases.")
+
+    for command, help_text in (("status", "Job counts of a queue."), ("retry-failed", "Requeue the failed jobs.")):
+        subparsers.add_parser(command, help=help_text).add_argument("--queue", required=True)
+
+    purge_parser = subparsers.add_parser("purge", help="Delete the done jobs of a queue.")
+    purge_parser.add_argument("--queue", required=True)
+    purge_parser.add_argument("--older-than", type=float, default=None, help="Only jobs finished this many seconds ago.")
+
+    args = parser.parse_args(argv)
+    queue = llmJobQueue(args.queue)
+
+    if args.command == "run":
+        queue.run(args.workers, reset_leases=not args.shared)
+    elif args.command == "retry-failed":
+        print(f"[{args.queue}] Requeued {queue.retry_failed()} failed jobs")
+    elif args.command == "purge":
+        print(f"[{args.queue}] Purged {queue.purge(older_than=args.older_than)} done jobs")
+    else:
+        print(queue.progress())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Module: llmTelemetry.py
+
+Description:
+    Local SQLite telemetry of LLM API calls (DBinst/telemetry/llmTelemetry.db, table llm_calls).
+
+    CallLLMApi records one row per call: provider, model, caller (pipeline stage such as CodeParse,
+    DataDictionary, indexRelations or QueryWriter), prompt / completion tokens, latency, status and a
+    cache-hit flag. Token counts come from the usage reported by the provider, or are estimated with
+    tokenBudget.count_tokens (estimated = 1) when the provider does not report them.
+
+    Rows are buffered in memory and written in bulk by a background writer thread (every flush_interval
+    seconds, as soon as batch_size rows are buffered, and at exit), so recording adds no database round trip
+    to a call and never blocks an event loop on disk I/O.
+
+    report() aggregates calls, errors, cache hits, tokens, latency, throughput and cost per caller (or
+    per provider / model). Costs use the per-provider prices of model_config. cached_tokens are the prompt
+    tokens the provider served from its prompt cache (see promptLayout.py); cached_ratio is their share of
+    the prompt tokens.
+
+Classes:
+    - llmTelemetry: Buffered telemetry store and report API.
+
+Functions:
+    - get_telemetry() -> llmTelemetry: Process-wide telemetry store, created on first use.
+
+Model config keys (model_config.<PROVIDER>):
+    - cost_per_1k_prompt_tokens / cost_per_1k_completion_tokens (optional): Prices used by report(). Default to 0.
+    - cost_per_1k_cached_tokens (optional): Price of cached prompt tokens. Defaults to the prompt token price.
+
+Usage Example:
+    python -m Code.Utilities.apiSupport.llmTelemetry report --since-hours 24
+    python -m Code.Utilities.apiSupport.llmTelemetry report --group-by provider model
+"""
+
+import argparse
+import atexit
+import threading
+import time
+
+from Code.Utilities.base_utils import accessDB, get_config_val
+
+
+valid_group_by = ("caller", "provider", "model")
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+class llmTelemetry:
+    """
+    Buffered telemetry store of LLM API calls.
+
+    Attributes:
+        tableName (str): Name of the telemetry table.
+        flush_interval (float): Maximum seconds a recorded row waits in memory.
+        batch_size (int): Number of buffered rows that triggers a write.
+    """
+    def __init__(self, flush_interval: float = 2.0, batch_size: int = 200):
+        """
+        Initializes an instance of llmTelemetry class.
+
+        Args:
+            flush_interval (float, optional): Maximum seconds a recorded row waits in memory. Defaults to 2.
+            batch_size (int, optional): Number of buffered rows that triggers a write. Defaults to 200.
+        """
+        self.info_type = "telemetry"
+        self.dbName = "llmTelemetry"
+        self.DBObj = accessDB(self.info_type, self.dbName)
+        self.table_schema = {
+            'tableName' : 'llm_calls',
+            'columns' : {
+                'call_id': ['INTEGER', 'PRIMARY KEY'],
+                'ts': ['REAL', ''],
+                'provider': ['TEXT', ''],
+                'model': ['TEXT', ''],
+                'caller': ['TEXT', ''],
+                'mode': ['TEXT', ''],
+                'prompt_tokens': ['INTEGER', 'DEFAULT 0'],
+                'completion_tokens': ['INTEGER', 'DEFAULT 0'],
+                'cached_tokens': ['INTEGER', 'DEFAULT 0'],
+                'estimated': ['INTEGER', 'DEFAULT 0'],
+                'latency': ['REAL', ''],
+                'status': ['TEXT', ''],
+                'status_code': ['INTEGER', ''],
+                'cache_hit': ['INTEGER', 'DEFAULT 0'],
+                'error': ['TEXT', '']
+            },
+            'indexes' : {
+                'idx_llm_calls_ts': ['ts'],
+                'idx_llm_calls_caller': ['caller', 'ts']
+            }
+        }
+        self.tableName = self.table_schema['tableName']
+        self.DBObj.create_table(self.table_schema)
+
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._writer = None
+        atexit.register(self.flush)
+
+    def __start_writer__(self):
+        """
+        Starts the background writer thread on first use.
+        """
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self.__write_loop__, name="llm-telemetry-writer", daemon=True)
+                self._writer.start()
+
+    def __write_loop__(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # A failed write must not stop the writer, the rows of that batch are lost
+                pass
+
+    def record(self, provider: str, model: str, caller: str, prompt_tokens: int, completion_tokens: int,
+               latency: float, status: str = "ok", status_code: int = None, cache_hit: bool = False,
+               estimated: bool = False, mode: str = "sync", error: str = None, cached_tokens: int = None):
+        """
+        Records one LLM call.
+
+        Args:
+            provider (str): Provider (e.g. "open_ai").
+            model (str): Model name.
+            caller (str): Pipeline stage that issued the call.
+            prompt_tokens (int): Prompt tokens.
+            completion_tokens (int): Completion tokens.
+            latency (float): Seconds from the call to the answer, including retries.
+            status (str, optional): "ok", "error" or "cancelled". Defaults to "ok".
+            status_code (int, optional): HTTP status code of the last attempt.
+            cache_hit (bool, optional): True if the answer was served from a cache without calling the provider.
+            estimated (bool, optional): True if the token counts are estimates.
+            mode (str, optional): "sync", "async" or "stream". Defaults to "sync".
+            error (str, optional): Error message of a failed call.
+            cached_tokens (int, optional): Prompt tokens served from the provider's prompt cache.
+        """
+        row = {
+            "ts": time.time(),
+            "provider": str(provider).lower(),
+            "model": model,
+            "caller": caller or "unknown",
+            "mode": mode,
+            "prompt_tokens": int(prompt_tokens or 0),
+            "completion_tokens": int(completion_tokens or 0),
+            "cached_tokens": int(cached_tokens or 0),
+            "estimated": int(bool(estimated)),
+            "latency": latency,
+            "status": status,
+            "status_code": status_code,
+            "cache_hit": int(bool(cache_hit)),
+            "error": error
+        }
+
+        if self._writer is None:
+            self.__start_writer__()
+
+        with self._lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.batch_size
+
+        # The write happens on the writer thread, never on the caller's (possibly an event loop's)
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """
+        Writes the buffered rows now, on the calling thread.
+        """
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+
+        if not rows:
+            return
+
+        # Plain executemany rather than post_data, which would store None as the text 'None'
+        columns = list(rows[0].keys())
+        with self.DBObj.connection:
+            self.DBObj.cursor.executemany(f"INSERT INTO {self.tableName} ({', '.join(columns)}) "
+                                          f"VALUES ({', '.join(['?'] * len(columns))})",
+                                          [tuple(row[col] for col in columns) for row in rows])
+
+    @staticmethod
+    def __prices__(provider: str) -> tuple:
+        """
+        (prompt, completion, cached prompt) price per 1k tokens of a provider, 0 when not configured.
+        """
+        try:
+            model_config = get_config_val("model_config", [str(provider).upper()], True)
+        except (KeyError, AttributeError):
+            return 0.0, 0.0, 0.0
+
+        prompt_price = float(model_config.get("cost_per_1k_prompt_tokens", 0))
+        return (prompt_price,
+                float(model_config.get("cost_per_1k_completion_tokens", 0)),
+                float(model_config.get("cost_per_1k_cached_tokens", prompt_price)))
+
+    def report(self, since: float = None, until: float = None, group_by: tuple = ("caller",)) -> list[dict]:
+        """
+        Aggregates the recorded calls.
+
+        Args:
+            since (float, optional): Only calls at or after this epoch time.
+            until (float, optional): Only calls before this epoch time.
+            group_by (tuple, optional): Columns to group by, from caller, provider and model. Defaults to ("caller",).
+
+        Returns:
+            list: One dictionary per group with calls, errors, cache_hits, prompt / completion / cached tokens,
+                cached_ratio, mean / max latency, calls_per_min and tokens_per_sec over the group's active window, and cost.
+                Sorted by cost, then total latency, highest first.
+        """
+        group_by = tuple(group_by)
+        if not group_by or any(col not in valid_group_by for col in group_by):
+            raise ValueError(f"Invalid parameter value : group_by. Acceptable values : {valid_group_by}")
+
+        self.flush()
+
+        conditions, params = [], []
+        if since is not None:
+            conditions.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("ts < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        # Grouped with the provider as well, so that each row is priced with its provider's rates
+        keys = list(dict.fromkeys(group_by + ("provider",)))
+        self.DBObj.cursor.execute(f'''
+            SELECT {", ".join(keys)},
+                   COUNT(*),
+                   SUM(status = 'error'),
+                   SUM(cache_hit),
+                   SUM(prompt_tokens),
+                   SUM(completion_tokens),
+                   SUM(cached_tokens),
+                   SUM(latency),
+                   MAX(latency),
+                   MIN(ts),
+                   MAX(ts)
+            FROM {self.tableName} {where}
+            GROUP BY {", ".join(keys)}''', params)
+
+        groups = {}
+        for row in self.DBObj.cursor.fetchall():
+            keyvals = dict(zip(keys, row[:len(keys)]))
+            calls, errors, cache_hits, prompt_tokens, completion_tokens, cached_tokens, total_latency, max_latency, first_ts, last_ts = row[len(keys):]
+            prompt_tokens, completion_tokens, cached_tokens = prompt_tokens or 0, completion_tokens or 0, cached_tokens or 0
+
+            prompt_price, completion_price, cached_price = self.__prices__(keyvals["provider"])
+            cost = ((prompt_tokens - cached_tokens) / 1000 * prompt_price + cached_tokens / 1000 * cached_price
+                    + completion_tokens / 1000 * completion_price)
+
+            group_key = tuple(keyvals[col] for col in group_by)
+            group = groups.setdefault(group_key, {**{col: keyvals[col] for col in group_by},
+                                                  "calls": 0, "errors": 0, "cache_hits": 0,
+                                                  "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0,
+                                                  "total_latency": 0.0, "max_latency": 0.0, "cost": 0.0,
+                                                  "first_ts": first_ts, "last_ts": last_ts})
+            group["calls"] += calls
+            group["errors"] += errors or 0
+            group["cache_hits"] += cache_hits or 0
+            group["prompt_tokens"] += prompt_tokens
+            group["completion_tokens"] += completion_tokens
+            group["cached_tokens"] += cached_tokens
+            group["total_latency"] += total_latency or 0.0
+            group["max_latency"] = max(group["max_latency"], max_latency or 0.0)
+            group["cost"] += cost
+            group["first_ts"] = min(group["first_ts"], first_ts)
+            group["last_ts"] = max(group["last_ts"], last_ts)
+
+        results = []
+        for group in groups.values():
+            window = max(group.pop("last_ts") - group.pop("first_ts"), 1.0)
+            group["mean_latency"] = group["total_latency"] / group["calls"]
+            group["cached_ratio"] = group["cached_tokens"] / group["prompt_tokens"] if group["prompt_tokens"] else 0.0
+            group["calls_per_min"] = group["calls"] / window * 60
+            group["tokens_per_sec"] = (group["prompt_tokens"] + group["completion_tokens"]) / window
+            results.append(group)
+
+        return sorted(results, key=lambda group: (group["cost"], group["total_latency"]), reverse=True)
+
+
+def get_telemetry() -> llmTelemetry:
+    """
+    Returns the process-wide telemetry store, creating it on first use.
+    """
+    global _telemetry
+    if _telemetry is None:
+        with _telemetry_lock:
+            if _telemetry is None:
+                _telemetry = llmTelemetry()
+    return _telemetry
+
+
+def main(argv: list = None):
+    """
+    Command line interface of the telemetry report.
+    """
+    parser = argparse.ArgumentParser(description="Report on the LLM call telemetry.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    report_parser = subparsers.add_parser("report", help="Calls, tokens, latency and cost per caller.")
+    report_parser.add_argument("--since-hours", type=float, default=None, help="Only calls of the last N hours.")
+    report_parser.add_argument("--group-by", nargs="+", default=["caller"], choices=valid_group_by)
+
+    args = parser.parse_args(argv)
+
+    since = time.time() - args.since_hours * 3600 if args.since_hours is not None else None
+    rows = get_telemetry().report(since=since, group_by=tuple(args.group_by))
+
+    header = args.group_by + ["calls", "errors", "cache_hits", "prompt_tokens", "completion_tokens", "cached_ratio",
+                              "mean_latency", "max_latency", "calls_per_min", "tokens_per_sec", "cost"]
+    print(" | ".join(header))
+    for row in rows:
+        print(" | ".join(f"{row[col]:.3f}" if isinstance(row[col], float) else str(row[col]) for col in header))
+
+
+if __name__ == "__main__":
+    main()
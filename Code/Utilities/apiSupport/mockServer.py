@@ -0,0 +1,344 @@
+"""
+Module: mockServer.py
+
+Description:
+    Local HTTP stand-in of the LLM providers, speaking the request / response shapes used by allApi:
+        - OpenAI and Groq chat completions (POST .../chat/completions),
+        - Anthropic messages (POST .../messages) and text completions (POST .../complete),
+        - Google generateContent and streamGenerateContent (POST ...:generateContent, ...:streamGenerateContent).
+    Streaming requests ("stream": true, or streamGenerateContent) are answered with server-sent events in
+    the provider's format. Responses are deterministic (by default the prompt echoed back) and carry token
+    usage where the provider reports it, so runs against the mock are reproducible and free. Anthropic
+    cache_control breakpoints are honoured: a prefix seen before is reported as cache_read_input_tokens.
+    A responder raising mockHTTPError makes the request fail with that status (and Retry-After header),
+    to exercise throttling and retries.
+
+    Point a provider at the mock with the endpoint key of its model_config, e.g.
+        OPEN_AI:
+          endpoint: http://127.0.0.1:8799/v1/chat/completions
+
+Classes:
+    - mockHTTPError: Raised by a responder to answer with an HTTP error.
+    - mockRequestHandler: Request handler answering in the provider formats.
+    - mockLLMServer: Threading HTTP server holding the response settings.
+
+Functions:
+    - start_mock_server(host="127.0.0.1", port=0, latency=0.0, chunk_delay=0.0, responder=None) -> mockLLMServer:
+      Starts a mock server in a background thread.
+
+Usage Example:
+    python -m Code.Utilities.apiSupport.mockServer --port 8799 --latency 0.5 --response "SELECT 1"
+
+    >> with start_mock_server(latency=0.2) as server:
+    >>     print(server.endpoints()["OPEN_AI"])
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Code.Utilities.apiSupport.tokenBudget import count_tokens
+
+
+stream_chunk_chars = 16
+
+
+def echo_responder(prompt: str) -> str:
+    """
+    Default responder: the prompt echoed back, trimmed to 200 characters.
+    """
+    return "mock: " + " ".join(str(prompt).split())[:200]
+
+
+class mockHTTPError(Exception):
+    """
+    Raised by a responder to answer a request with an HTTP error instead of a completion.
+
+    Attributes:
+        status_code (int): HTTP status code of the response, e.g. 429 or 503.
+        retry_after (float): Value of the Retry-After header, None to omit it.
+    """
+    def __init__(self, status_code: int, retry_after: float = None):
+        super().__init__(f"Mock HTTP error {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class mockRequestHandler(BaseHTTPRequestHandler):
+    """
+    Answers chat / completion requests in the format of the provider the path belongs to.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def __provider__(self) -> str:
+        path = self.path.split("?")[0]
+        if path.endswith("/chat/completions"):
+            return "open_ai"
+        if path.endswith("/messages"):
+            return "anthropic_messages"
+        if path.endswith("/complete"):
+            return "anthropic"
+        if path.endswith(":generateContent") or path.endswith(":streamGenerateContent"):
+            return "google"
+        return None
+
+    @staticmethod
+    def __prompt__(provider: str, body: dict) -> str:
+        if provider == "open_ai":
+            return body["messages"][-1]["content"]
+        if provider == "anthropic_messages":
+            content = body["messages"][-1]["content"]
+            return content if isinstance(content, str) else "".join(block["text"] for block in content)
+        if provider == "anthropic":
+            return body["prompt"]
+        return body["contents"][-1]["parts"][0]["text"]
+
+    def __send__(self, status: int, body: bytes, content_type: str = "application/json", headers: dict = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        provider = self.__provider__()
+        if provider is None:
+            self.__send__(404, json.dumps({"error": f"Unknown endpoint {self.path}"}).encode())
+            return
+
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            prompt = self.__prompt__(provider, body)
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            self.__send__(400, json.dumps({"error": f"Invalid request : {e}"}).encode())
+            return
+
+        try:
+            text = self.server.responder(prompt)
+        except mockHTTPError as e:
+            headers = {"Retry-After": str(e.retry_after)} if e.retry_after is not None else None
+            self.__send__(e.status_code, json.dumps({"error": str(e)}).encode(), headers=headers)
+            return
+
+        usage = (count_tokens(prompt), count_tokens(text), self.__cache_lookup__(provider, body))
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if body.get("stream") or ":streamGenerateContent" in self.path:
+            self.__stream__(provider, body, text, usage)
+        else:
+            self.__send__(200, json.dumps(self.__response__(provider, body, text, usage)).encode())
+
+    def __cache_lookup__(self, provider: str, body: dict) -> tuple:
+        """
+        (cache write, cache read) prompt tokens of the Anthropic cache_control blocks of a request.
+        """
+        if provider != "anthropic_messages" or isinstance(body["messages"][-1]["content"], str):
+            return 0, 0
+
+        written = read = 0
+        for block in body["messages"][-1]["content"]:
+            if "cache_control" not in block:
+                continue
+            key = hashlib.sha1(block["text"].encode()).hexdigest()
+            with self.server.lock:
+                if key in self.server.prompt_cache:
+                    read += count_tokens(block["text"])
+                else:
+                    self.server.prompt_cache.add(key)
+                    written += count_tokens(block["text"])
+        return written, read
+
+    @staticmethod
+    def __anthropic_usage__(usage: tuple) -> dict:
+        written, read = usage[2]
+        return {"input_tokens": usage[0] - written - read, "output_tokens": usage[1],
+                "cache_creation_input_tokens": written, "cache_read_input_tokens": read}
+
+    @classmethod
+    def __response__(cls, provider: str, body: dict, text: str, usage: tuple) -> dict:
+        if provider == "open_ai":
+            return {"object": "chat.completion",
+                    "model": body.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": usage[0], "completion_tokens": usage[1], "total_tokens": usage[0] + usage[1]}}
+        if provider == "anthropic_messages":
+            return {"type": "message", "role": "assistant", "model": body.get("model"),
+                    "content": [{"type": "text", "text": text}], "stop_reason": "end_turn",
+                    "usage": cls.__anthropic_usage__(usage)}
+        if provider == "anthropic":
+            return {"type": "completion", "model": body.get("model"), "completion": text, "stop_reason": "stop_sequence"}
+        return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+                "usageMetadata": {"promptTokenCount": usage[0], "candidatesTokenCount": usage[1], "totalTokenCount": usage[0] + usage[1]}}
+
+    def __stream__(self, provider: str, body: dict, text: str, usage: tuple):
+        """
+        Sends the text as server-sent events, stream_chunk_chars characters per event.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send_event(data: dict, event: str = None):
+            self.wfile.write(((f"event: {event}\n" if event else "") + f"data: {json.dumps(data)}\n\n").encode())
+            self.wfile.flush()
+            if self.server.chunk_delay:
+                time.sleep(self.server.chunk_delay)
+
+        if provider == "anthropic_messages":
+            message_usage = {**self.__anthropic_usage__(usage), "output_tokens": 1}
+            send_event({"type": "message_start", "message": {"role": "assistant", "content": [], "usage": message_usage}},
+                       event="message_start")
+
+        chunks = [text[ind:ind + stream_chunk_chars] for ind in range(0, len(text), stream_chunk_chars)]
+        for ind, chunk in enumerate(chunks):
+            if provider == "anthropic_messages":
+                send_event({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": chunk}},
+                           event="content_block_delta")
+            elif provider == "open_ai":
+                send_event({"object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"content": chunk}}]})
+            elif provider == "anthropic":
+                send_event({"type": "completion", "completion": chunk}, event="completion")
+            else:
+                data = {"candidates": [{"content": {"role": "model", "parts": [{"text": chunk}]}}]}
+                if ind == len(chunks) - 1:
+                    data["usageMetadata"] = {"promptTokenCount": usage[0], "candidatesTokenCount": usage[1],
+                                             "totalTokenCount": usage[0] + usage[1]}
+                send_event(data)
+
+        if provider == "anthropic_messages":
+            send_event({"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": usage[1]}},
+                       event="message_delta")
+            send_event({"type": "message_stop"}, event="message_stop")
+
+        if provider == "open_ai":
+            if (body.get("stream_options") or {}).get("include_usage"):
+                send_event({"object": "chat.completion.chunk", "choices": [],
+                            "usage": {"prompt_tokens": usage[0], "completion_tokens": usage[1], "total_tokens": usage[0] + usage[1]}})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+
+class mockLLMServer(ThreadingHTTPServer):
+    """
+    Threading HTTP server of the mock providers.
+
+    Attributes:
+        latency (float): Seconds each request waits before it is answered.
+        chunk_delay (float): Seconds between two streamed events.
+        responder (callable): Maps a prompt to the response text.
+    """
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, chunk_delay: float = 0.0,
+                 responder=None):
+        """
+        Initializes an instance of mockLLMServer class.
+
+        Args:
+            host (str, optional): Interface to listen on. Defaults to 127.0.0.1.
+            port (int, optional): Port, 0 for a free one. Defaults to 0.
+            latency (float, optional): Seconds each request waits before it is answered. Defaults to 0.
+            chunk_delay (float, optional): Seconds between two streamed events. Defaults to 0.
+            responder (callable, optional): Maps a prompt to the response text, may raise mockHTTPError.
+                                            Defaults to echo_responder.
+        """
+        super().__init__((host, port), mockRequestHandler)
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.responder = responder or echo_responder
+        self.prompt_cache = set()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def endpoints(self) -> dict:
+        """
+        Endpoint of each provider on this server, for the endpoint key of model_config.
+        """
+        return {"OPEN_AI": f"{self.url}/v1/chat/completions",
+                "GROQ": f"{self.url}/openai/v1/chat/completions",
+                "ANTHROPIC": f"{self.url}/v1/messages",
+                "GOOGLE": f"{self.url}/v1/models/gemini-pro:generateContent"}
+
+    def start(self):
+        """
+        Serves in a background daemon thread.
+        """
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops serving and closes the socket.
+        """
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, chunk_delay: float = 0.0,
+                      responder=None) -> mockLLMServer:
+    """
+    Starts a mock LLM server in a background thread.
+
+    Args:
+        host (str, optional): Interface to listen on. Defaults to 127.0.0.1.
+        port (int, optional): Port, 0 for a free one. Defaults to 0.
+        latency (float, optional): Seconds each request waits before it is answered. Defaults to 0.
+        chunk_delay (float, optional): Seconds between two streamed events. Defaults to 0.
+        responder (callable, optional): Maps a prompt to the response text, may raise mockHTTPError.
+                                        Defaults to echo_responder.
+
+    Returns:
+        mockLLMServer: The running server, stop() it when done.
+    """
+    return mockLLMServer(host, port, latency, chunk_delay, responder).start()
+
+
+def main(argv: list = None):
+    """
+    Command line interface of the mock server.
+    """
+    parser = argparse.ArgumentParser(description="Local stand-in of the OpenAI, Anthropic and Google LLM APIs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before each response.")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between streamed events.")
+    parser.add_argument("--response", default=None, help="Fixed response text (default: echo the prompt).")
+    args = parser.parse_args(argv)
+
+    responder = (lambda prompt: args.response) if args.response is not None else None
+    server = mockLLMServer(args.host, args.port, args.latency, args.chunk_delay, responder)
+
+    for provider, endpoint in server.endpoints().items():
+        print(f"{provider}: {endpoint}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Module: promptLayout.py
+
+Description:
+    Prompt assembly with a cache-friendly layout: the static, reusable parts of a prompt (instructions, examples,
+    schema context) form a byte-stable prefix and the per-request parts (the question, the column at hand) come
+    last. Providers cache prompt prefixes (OpenAI and Gemini automatically, Anthropic through cache_control
+    breakpoints), so prompts that share the prefix are served faster and billed less for the cached tokens.
+
+    Sections are normalised (line endings, trailing whitespace) so the same content always renders to the same
+    bytes. CallLLMApi accepts a promptLayout wherever it accepts a prompt string; for Anthropic Messages API
+    templates it marks the end of the prefix with a cache_control breakpoint, other providers receive the
+    rendered text. The cached tokens reported back are recorded in the LLM telemetry (cached_tokens, and the
+    cached_ratio of llmTelemetry.report).
+
+Classes:
+    - promptLayout: Ordered static and variable prompt sections.
+
+Usage Example:
+    >> layout = promptLayout()
+    >> layout.add_static("instructions", "Using the context provided below, write a SQL query.")
+    >> layout.add_static("schema", context_str)
+    >> layout.add_variable("question", f"Question: {user_query}")
+    >> CallLLMApi("ANTHROPIC").CallService(layout)
+
+    >> layout = promptLayout.from_template(template, {"<<ColumnMetadata>>": column_md})
+"""
+
+import hashlib
+
+
+class promptLayout:
+    """
+    Ordered static and variable prompt sections.
+
+    The rendered text is prefix + suffix: the static sections, each followed by the separator, then the
+    variable sections joined by the separator.
+
+    Attributes:
+        separator (str): Text between two sections.
+        sections (list): (name, text, static) tuples, static sections first in insertion order.
+    """
+    def __init__(self, separator: str = "\n\n"):
+        """
+        Initializes an instance of promptLayout class.
+
+        Args:
+            separator (str, optional): Text between two sections. Defaults to a blank line.
+        """
+        self.separator = separator
+        self.sections = []
+
+    @staticmethod
+    def __normalize__(text: str) -> str:
+        """
+        Byte-stable form of a section: unix line endings, no trailing whitespace on lines or at the ends.
+        """
+        lines = str(text).replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+    def add_static(self, name: str, text: str):
+        """
+        Adds a section shared by many requests to the cacheable prefix. Returns the layout.
+        """
+        # Static sections always precede the variable ones
+        position = sum(1 for section in self.sections if section[2])
+        self.sections.insert(position, (name, self.__normalize__(text), True))
+        return self
+
+    def add_variable(self, name: str, text: str):
+        """
+        Adds a per-request section after the prefix. Returns the layout.
+        """
+        self.sections.append((name, self.__normalize__(text), False))
+        return self
+
+    @property
+    def prefix(self) -> str:
+        """
+        Cacheable prefix: the static sections, each followed by the separator.
+        """
+        return "".join(text + self.separator for _, text, static in self.sections if static and text)
+
+    @property
+    def suffix(self) -> str:
+        """
+        Per-request part: the variable sections joined by the separator.
+        """
+        return self.separator.join(text for _, text, static in self.sections if not static and text)
+
+    @property
+    def text(self) -> str:
+        return self.prefix + self.suffix
+
+    @property
+    def prefix_hash(self) -> str:
+        """
+        Short hash of the prefix, equal across requests that can share a provider cache entry.
+        """
+        return hashlib.sha1(self.prefix.encode()).hexdigest()[:12]
+
+    def __str__(self) -> str:
+        return self.text
+
+    @classmethod
+    def from_text(cls, text: str, prefix_length: int = 0):
+        """
+        Layout of an already rendered prompt whose first prefix_length characters are the static prefix.
+        """
+        layout = cls(separator="")
+        layout.sections = [("prefix", text[:prefix_length], True), ("suffix", text[prefix_length:], False)]
+        return layout
+
+    @classmethod
+    def from_template(cls, template: str, values: dict, separator: str = "\n\n"):
+        """
+        Layout of a task template: the text before the first placeholder is the static prefix, the rest
+        (with every placeholder replaced) is the variable part.
+
+        Args:
+            template (str): Prompt template with placeholders such as <<ColumnMetadata>>.
+            values (dict): Placeholder to value mapping.
+            separator (str, optional): Text between two sections. Defaults to a blank line.
+
+        Returns:
+            promptLayout: The layout.
+        """
+        positions = [template.find(placeholder) for placeholder in values if placeholder in template]
+        split = min(positions) if positions else len(template)
+
+        # Cut at the start of the placeholder's line
+        split = template.rfind("\n", 0, split) + 1
+
+        variable = template[split:]
+        for placeholder, value in values.items():
+            variable = variable.replace(placeholder, str(value))
+
+        return cls(separator).add_static("template", template[:split]).add_variable("values", variable)
@@ -0,0 +1,418 @@
+"""
+Module: rateLimiter.py
+
+Description:
+    Client-side rate limiting and retry policy of the LLM providers, shared by every thread (and event loop)
+    of the process.
+
+    Each provider gets one rateLimiter holding:
+        - a requests/min and a tokens/min token bucket (model_config keys rpm and tpm),
+        - an adaptive concurrency limit (AIMD): halved when the provider throttles (429 / 529),
+          increased by one after a full window of successful calls, up to max_concurrency,
+        - a provider-wide pause honouring the Retry-After header, so all workers back off together.
+
+    Callers waiting for a slot are woken when one is released (threads through a Condition, coroutines through a
+    future resolved on their own event loop), callers waiting for the buckets sleep exactly until the reserved
+    tokens are refilled. get_rate_limiter() applies changes of the model_config rate keys to the shared limiter.
+
+    Retryable failures (429, 5xx and connection errors) are retried with full-jitter exponential backoff,
+    other failures raise LLMApiError straight away.
+
+Classes:
+    - LLMApiError: ValueError raised for failed LLM API calls, carries the HTTP status code.
+    - tokenBucket: Thread-safe token bucket refilled continuously at a per-minute rate.
+    - rateLimiter: Rate limits, adaptive concurrency and retry policy of one provider.
+
+Functions:
+    - get_rate_limiter(llmService, model_config) -> rateLimiter: Shared rate limiter of a provider.
+    - get_max_concurrency(model_config) -> int: Maximum in-flight calls of a provider.
+    - parse_retry_after(value) -> float: Seconds to wait from a Retry-After header value.
+
+Model config keys (model_config.<PROVIDER>):
+    - rpm / tpm (optional): Requests and tokens per minute allowed by the provider. Unlimited if missing.
+    - max_concurrency (optional): Upper bound of the adaptive concurrency limit. Defaults to parallel_slots
+      (the slots of a local inference server, see allApi.py) if set, else 8.
+    - max_retries (optional): Retries of a retryable failure. Defaults to 5.
+    - backoff_base / backoff_max (optional): Backoff bounds in seconds. Default to 1 and 60.
+
+Usage Example:
+    >> limiter = get_rate_limiter("OPEN_AI", model_config)
+    >> with limiter.slot(tokens=1200):
+    >>     response = session.post(...)
+"""
+
+import asyncio
+import collections
+import contextlib
+import email.utils
+import random
+import threading
+import time
+
+from Code.Utilities.base_utils import metrics_registry
+
+
+default_max_concurrency = 8
+default_max_retries = 5
+default_backoff_base = 1
+default_backoff_max = 60
+
+retryable_status_codes = {408, 409, 429, 500, 502, 503, 504, 529}
+throttle_status_codes = {429, 529}
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+class LLMApiError(ValueError):
+    """
+    Failed LLM API call.
+
+    Attributes:
+        status_code (int): HTTP status code, None for connection errors and timeouts.
+        retry_after (float): Seconds the provider asked to wait, None if not given.
+    """
+    def __init__(self, message: str, status_code: int = None, retry_after: float = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code is None or self.status_code in retryable_status_codes
+
+
+def parse_retry_after(value) -> float:
+    """
+    Seconds to wait from a Retry-After header value (delay in seconds or HTTP date).
+
+    Args:
+        value (str): Header value, may be None.
+
+    Returns:
+        float: Seconds to wait, None if the header is missing or invalid.
+    """
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class tokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at rate_per_min, holding at most one minute of tokens.
+
+    Reservations may drive the bucket negative; the caller then waits for the returned delay.
+    """
+    def __init__(self, rate_per_min: float):
+        self.rate = rate_per_min / 60
+        self.capacity = float(rate_per_min)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def __refill__(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Takes amount tokens from the bucket.
+
+        Returns:
+            float: Seconds to wait before the reserved tokens are available.
+        """
+        with self.lock:
+            self.__refill__()
+            self.tokens -= min(amount, self.capacity)
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def adjust(self, amount: float):
+        """
+        Takes (or returns, if negative) amount tokens without waiting, e.g. to correct an estimate.
+        """
+        with self.lock:
+            self.__refill__()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class rateLimiter:
+    """
+    Rate limits, adaptive concurrency and retry policy of one provider.
+
+    Attributes:
+        limit (int): Current concurrency limit, between 1 and max_concurrency.
+        in_flight (int): Calls currently holding a slot.
+    """
+    def __init__(self, name: str, rpm: float = None, tpm: float = None,
+                 max_concurrency: int = default_max_concurrency, max_retries: int = default_max_retries,
+                 backoff_base: float = default_backoff_base, backoff_max: float = default_backoff_max):
+        self.name = name
+        self.request_bucket = tokenBucket(rpm) if rpm else None
+        self.token_bucket = tokenBucket(tpm) if tpm else None
+
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.settings = dict(rpm=rpm, tpm=tpm, max_concurrency=max_concurrency, max_retries=max_retries,
+                             backoff_base=backoff_base, backoff_max=backoff_max)
+
+        self.limit = max_concurrency
+        self.in_flight = 0
+        self.successes = 0
+        self.last_decrease = 0.0
+        self.blocked_until = 0.0
+        self.condition = threading.Condition()
+        # (event loop, future) of the coroutines waiting in slot_async(), oldest first
+        self._async_waiters = collections.deque()
+
+    @staticmethod
+    def config_settings(model_config: dict) -> dict:
+        """
+        Constructor arguments of a limiter from the model configuration of its provider.
+        """
+        return dict(rpm=model_config.get("rpm"),
+                    tpm=model_config.get("tpm"),
+                    max_concurrency=get_max_concurrency(model_config),
+                    max_retries=model_config.get("max_retries", default_max_retries),
+                    backoff_base=model_config.get("backoff_base", default_backoff_base),
+                    backoff_max=model_config.get("backoff_max", default_backoff_max))
+
+    @classmethod
+    def from_config(cls, llmService: str, model_config: dict):
+        return cls(str(llmService).lower(), **cls.config_settings(model_config))
+
+    def reconfigure(self, rpm: float = None, tpm: float = None,
+                    max_concurrency: int = default_max_concurrency, max_retries: int = default_max_retries,
+                    backoff_base: float = default_backoff_base, backoff_max: float = default_backoff_max):
+        """
+        Applies new settings while calls are in flight. Takes the arguments of the constructor.
+
+        A changed rpm / tpm starts a new (full) bucket. The concurrency limit keeps its AIMD state: it follows
+        max_concurrency if it was at the old maximum, else it is only capped by the new one.
+        """
+        with self.condition:
+            if rpm != self.settings["rpm"]:
+                self.request_bucket = tokenBucket(rpm) if rpm else None
+            if tpm != self.settings["tpm"]:
+                self.token_bucket = tokenBucket(tpm) if tpm else None
+
+            self.limit = max_concurrency if self.limit >= self.max_concurrency else min(self.limit, max_concurrency)
+            self.max_concurrency = max_concurrency
+            self.max_retries = max_retries
+            self.backoff_base = backoff_base
+            self.backoff_max = backoff_max
+            self.settings = dict(rpm=rpm, tpm=tpm, max_concurrency=max_concurrency, max_retries=max_retries,
+                                 backoff_base=backoff_base, backoff_max=backoff_max)
+
+            self.condition.notify_all()
+            self.__wake_async__()
+
+    # ------------------------------------------------------------------------------------------
+    # Slots
+    # ------------------------------------------------------------------------------------------
+
+    def __wake_async__(self):
+        """
+        Wakes as many coroutines waiting in slot_async() as there are free slots. Call with self.condition held.
+        """
+        free = self.limit - self.in_flight
+        while free > 0 and self._async_waiters:
+            loop, waiter = self._async_waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(__resolve_waiter__, waiter)
+            except RuntimeError:
+                # The event loop of the waiter is closed
+                continue
+            free -= 1
+
+    def __release_slot__(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+            self.__wake_async__()
+
+    def __reserve__(self, tokens: float) -> float:
+        """
+        Reserves one request and tokens from the buckets. Returns the seconds to wait before sending.
+        """
+        delay = self.blocked_until - time.monotonic()
+        if self.request_bucket is not None:
+            delay = max(delay, self.request_bucket.reserve(1))
+        if self.token_bucket is not None and tokens:
+            delay = max(delay, self.token_bucket.reserve(tokens))
+        return max(0.0, delay)
+
+    @contextlib.contextmanager
+    def slot(self, tokens: float = 0):
+        """
+        Blocks until a concurrency slot is free and the rate limits allow the call.
+
+        Args:
+            tokens (float, optional): Estimated tokens of the call (prompt plus completion).
+        """
+        with self.condition:
+            while self.in_flight >= self.limit:
+                self.condition.wait()
+            self.in_flight += 1
+
+        try:
+            delay = self.__reserve__(tokens)
+            if delay:
+                time.sleep(delay)
+            yield
+        finally:
+            self.__release_slot__()
+
+    @contextlib.asynccontextmanager
+    async def slot_async(self, tokens: float = 0):
+        """
+        Coroutine counterpart of slot(), waits without blocking the event loop.
+
+        Args:
+            tokens (float, optional): Estimated tokens of the call (prompt plus completion).
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self.condition:
+                if self.in_flight < self.limit:
+                    self.in_flight += 1
+                    break
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self.condition:
+                    try:
+                        self._async_waiters.remove((loop, waiter))
+                    except ValueError:
+                        # Woken already: pass the free slot on to the next waiter
+                        self.__wake_async__()
+                raise
+
+        try:
+            delay = self.__reserve__(tokens)
+            if delay:
+                await asyncio.sleep(delay)
+            yield
+        finally:
+            self.__release_slot__()
+
+    # ------------------------------------------------------------------------------------------
+    # Feedback
+    # ------------------------------------------------------------------------------------------
+
+    def on_success(self, estimated_tokens: float = 0, used_tokens: float = None):
+        """
+        Records a successful call: corrects the token estimate and grows the concurrency limit by one
+        after a full window (limit) of successes.
+        """
+        if self.token_bucket is not None and used_tokens is not None:
+            self.token_bucket.adjust(used_tokens - estimated_tokens)
+
+        with self.condition:
+            self.successes += 1
+            if self.successes >= self.limit and self.limit < self.max_concurrency:
+                self.limit += 1
+                self.successes = 0
+                self.condition.notify_all()
+                self.__wake_async__()
+
+    def on_throttle(self, retry_after: float = None):
+        """
+        Records a throttled call: halves the concurrency limit (at most once per second, so a burst of
+        429s counts once) and pauses the provider for retry_after seconds.
+        """
+        now = time.monotonic()
+        with self.condition:
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+            if now - self.last_decrease >= 1:
+                self.limit = max(1, self.limit // 2)
+                self.successes = 0
+                self.last_decrease = now
+
+        metrics_registry.increment(f"llm.{self.name}.throttled")
+
+    def retry_delay(self, error: LLMApiError, attempt: int, max_retries: int = None) -> float:
+        """
+        Seconds to wait before retrying a failed call.
+
+        Args:
+            error (LLMApiError): The failure.
+            attempt (int): Zero-based number of the failed attempt.
+            max_retries (int, optional): Overrides the configured max_retries (e.g. 0 to fail over at once).
+
+        Returns:
+            float: Delay in seconds, None if the call must not be retried.
+        """
+        if error.status_code in throttle_status_codes:
+            self.on_throttle(error.retry_after)
+
+        if not error.retryable or attempt >= (self.max_retries if max_retries is None else max_retries):
+            return None
+
+        metrics_registry.increment(f"llm.{self.name}.retries")
+
+        # Full jitter, never shorter than what the provider asked for
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(delay, error.retry_after or 0.0)
+
+
+def __resolve_waiter__(waiter: asyncio.Future):
+    """
+    Wakes a coroutine waiting in rateLimiter.slot_async(), runs on the event loop of the waiter.
+    """
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def get_max_concurrency(model_config: dict) -> int:
+    """
+    Maximum in-flight calls of a provider: max_concurrency, else parallel_slots, else 8.
+
+    A local inference server only decodes parallel_slots requests at once and queues the rest, so
+    sending more only adds queueing to the measured latency.
+    """
+    return model_config.get("max_concurrency", model_config.get("parallel_slots", default_max_concurrency))
+
+
+def get_rate_limiter(llmService: str, model_config: dict) -> rateLimiter:
+    """
+    Returns the rate limiter of a provider, shared by all threads of the process.
+
+    The limiter is reconfigured in place when the rate keys of model_config change (the config registry
+    reloads edited files), so new limits apply without losing the calls in flight.
+
+    Args:
+        llmService (str): The LLM service.
+        model_config (dict): Model configuration of the service.
+
+    Returns:
+        rateLimiter: The rate limiter.
+    """
+    provider = str(llmService).lower()
+    settings = rateLimiter.config_settings(model_config)
+
+    limiter = _rate_limiters.get(provider)
+    if limiter is None or limiter.settings != settings:
+        with _rate_limiters_lock:
+            limiter = _rate_limiters.get(provider)
+            if limiter is None:
+                limiter = _rate_limiters[provider] = rateLimiter(provider, **settings)
+            elif limiter.settings != settings:
+                limiter.reconfigure(**settings)
+
+    return limiter
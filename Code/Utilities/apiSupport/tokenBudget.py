@@ -0,0 +1,303 @@
+"""
+Module: tokenBudget.py
+
+Description:
+    Token counting and a budgeted assembler of the SQL building context sent to the LLM.
+
+    count_tokens uses tiktoken when it is installed (optional dependency) and falls back to a
+    characters / 4 estimate otherwise.
+
+    contextAssembler turns the components of SQLBuilderSupport.getBuildComponents (user query, direct and
+    intermediate tables with their columns, join paths) into a compact text that fits a token budget.
+    Items are added by priority until the budget is spent:
+        1. the user query and the join keys (source -> target : keys),
+        2. one header line per table (direct tables in retrieval order, then intermediate tables),
+           descriptions trimmed to max_desc_tokens and left out if the table would not fit otherwise,
+        3. key columns (constraints or columns used in joins),
+        4. the remaining columns, ranked by word overlap of their name and description with the user query.
+    The result is rendered per table in the original order (or sorted by name with stable_order, so the same
+    tables always render to the same text whatever their rank), and what was dropped is reported. With
+    include_query=False the question is budgeted but left out of the text, for prompt layouts that put it
+    after the cacheable context (promptLayout.py).
+
+Classes:
+    - contextAssembler: Builds the budgeted context text.
+
+Functions:
+    - count_tokens(text, model_name=None) -> int: Number of tokens of a text.
+    - get_context_budget(llmService) -> int: Context token budget of a provider.
+
+Model config keys (model_config.<PROVIDER>):
+    - context_token_budget (optional): Maximum tokens of the assembled context. Defaults to 3000, or half the
+      context_length of a local model if smaller.
+
+Usage Example:
+    >> assembler = contextAssembler(get_context_budget("OPEN_AI"), "gpt-4")
+    >> context_str = assembler.assemble(SQLBuilderSupport().getBuildComponents(user_query))
+    >> print(assembler.report)
+"""
+
+import math
+import re
+import threading
+
+from Code.Utilities.base_utils import get_config_val
+
+
+default_context_token_budget = 3000
+default_max_desc_tokens = 120
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def __get_encoder__(model_name: str = None):
+    """
+    Returns the tiktoken encoder of a model (cl100k_base for unknown models), or None without tiktoken.
+    """
+    with _encoders_lock:
+        if model_name not in _encoders:
+            try:
+                import tiktoken
+            except ImportError:
+                _encoders[model_name] = None
+            else:
+                try:
+                    _encoders[model_name] = tiktoken.encoding_for_model(model_name) if model_name else tiktoken.get_encoding("cl100k_base")
+                except KeyError:
+                    _encoders[model_name] = tiktoken.get_encoding("cl100k_base")
+
+        return _encoders[model_name]
+
+
+def count_tokens(text: str, model_name: str = None) -> int:
+    """
+    Number of tokens of a text.
+
+    Args:
+        text (str): The text.
+        model_name (str, optional): Model whose tokenizer is used, when tiktoken is installed.
+
+    Returns:
+        int: Token count (exact with tiktoken, about one token per 4 characters otherwise).
+    """
+    text = str(text)
+    encoder = __get_encoder__(model_name)
+
+    if encoder is None:
+        return math.ceil(len(text) / 4)
+
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def get_context_budget(llmService: str) -> int:
+    """
+    Context token budget of a provider: model_config context_token_budget, else 3000 capped to half the
+    context_length of a local model, leaving room for the instructions and the answer.
+    """
+    model_config = get_config_val("model_config", [str(llmService).upper()], True)
+    if "context_token_budget" in model_config:
+        return model_config["context_token_budget"]
+
+    context_length = model_config.get("context_length")
+    return min(default_context_token_budget, context_length // 2) if context_length else default_context_token_budget
+
+
+class contextAssembler:
+    """
+    Builds the SQL building context text within a token budget.
+
+    Attributes:
+        token_budget (int): Maximum tokens of the assembled context.
+        model_name (str): Model whose tokenizer is used for counting.
+        max_desc_tokens (int): Maximum tokens of a table description.
+        report (dict): Tokens used and included / dropped tables, columns and joins of the last assemble call.
+    """
+    def __init__(self, token_budget: int = default_context_token_budget, model_name: str = None,
+                 max_desc_tokens: int = default_max_desc_tokens):
+        """
+        Initializes an instance of contextAssembler class.
+
+        Args:
+            token_budget (int, optional): Maximum tokens of the assembled context. Defaults to 3000.
+            model_name (str, optional): Model whose tokenizer is used for counting. Defaults to None.
+            max_desc_tokens (int, optional): Maximum tokens of a table description. Defaults to 120.
+        """
+        self.token_budget = token_budget
+        self.model_name = model_name
+        self.max_desc_tokens = max_desc_tokens
+        self.report = {}
+
+    @staticmethod
+    def __words__(text: str) -> set:
+        """
+        Lower-cased words of a text, identifiers split on underscores and camel case.
+        """
+        text = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(text))
+        return {word for word in re.split(r"[^a-z0-9]+", text.lower()) if len(word) > 2}
+
+    @staticmethod
+    def __join_columns__(keys) -> set:
+        """
+        Lower-cased column names of a JoinKeys value, e.g. {'customerid'} for
+        "orders.CustomerID = customers.CustomerID AND orders.Region = customers.Region" (also 'region').
+        """
+        if isinstance(keys, (list, tuple, set)):
+            keys = " , ".join(str(key) for key in keys)
+
+        columns = set()
+        for operand in re.split(r"=|,|\bAND\b", str(keys), flags=re.IGNORECASE):
+            column = operand.strip().split(".")[-1].strip().strip("`\"[]'").lower()
+            if column:
+                columns.add(column)
+        return columns
+
+    @staticmethod
+    def __text__(value) -> str:
+        """
+        Plain text of a description (DB rows come back as 1-tuples, missing ones as None).
+        """
+        if isinstance(value, (list, tuple)):
+            value = value[0] if value else ""
+        return "" if value is None else str(value).strip()
+
+    @staticmethod
+    def __column__(column) -> dict:
+        """
+        Column metadata as a dict from a (ColumnName, DataType, Constraints, Desc) row or a dict.
+        """
+        if isinstance(column, dict):
+            return {"name": str(column.get("ColumnName", column.get("name", ""))),
+                    "dtype": str(column.get("DataType", column.get("dtype", "")) or ""),
+                    "constraints": str(column.get("Constraints", column.get("constraints", "")) or ""),
+                    "desc": str(column.get("Desc", column.get("desc", "")) or "")}
+
+        column = list(column) + [""] * (4 - len(column))
+        return {"name": str(column[0]), "dtype": str(column[1] or ""),
+                "constraints": str(column[2] or ""), "desc": str(column[3] or "")}
+
+    def __trim__(self, text: str, max_tokens: int) -> str:
+        """
+        Trims a text to about max_tokens tokens, on a word boundary.
+        """
+        if count_tokens(text, self.model_name) <= max_tokens:
+            return text
+
+        words = text.split()
+        low, high = 0, len(words)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if count_tokens(" ".join(words[:mid]), self.model_name) <= max_tokens:
+                low = mid
+            else:
+                high = mid - 1
+
+        return " ".join(words[:low]) + " ..."
+
+    def assemble(self, components: dict, include_query: bool = True, stable_order: bool = False) -> str:
+        """
+        Builds the context text of the build components within the token budget.
+
+        Args:
+            components (dict): Output of SQLBuilderSupport.getBuildComponents (user_query, table_list, join_keys).
+            include_query (bool, optional): Start the text with the question. Defaults to True.
+            stable_order (bool, optional): Render tables and joins sorted by name instead of by rank. Defaults to False.
+
+        Returns:
+            str: The context text.
+        """
+        user_query = str(components.get("user_query", ""))
+        table_list = components.get("table_list", {})
+        join_keys = components.get("join_keys") or []
+        query_words = self.__words__(user_query)
+
+        # Tables in rank order: direct tables (retrieval order) then intermediate ones
+        tables = []
+        for ttype in ("direct", "intermediate"):
+            for table, tablemd in table_list.get(ttype, {}).items():
+                tables.append({"name": table, "type": ttype,
+                               "desc": self.__text__(tablemd.get("description")),
+                               "columns": [self.__column__(column) for column in tablemd.get("columns") or []]})
+
+        # Join lines and the columns they use
+        join_lines = []
+        join_columns = set()
+        for relation in join_keys:
+            keys = (relation.get("edge_attributes") or {}).get("JoinKeys", "")
+            join_lines.append(f"- {relation.get('source')} -> {relation.get('target')} : {keys}")
+            join_columns |= self.__join_columns__(keys)
+
+        # Candidate items as (priority, rank, kind, key, lines), lines in order of preference
+        candidates = [(0, 0, "query", None, [f"Question: {user_query}"])]
+        candidates += [(0, ind + 1, "join", ind, [line]) for ind, line in enumerate(join_lines)]
+
+        for table_rank, table in enumerate(tables):
+            header = f"Table {table['name']} ({table['type']})"
+            desc = self.__trim__(table["desc"], self.max_desc_tokens) if table["desc"] else ""
+            candidates.append((1, table_rank, "table", table_rank, [f"{header} : {desc}", header] if desc else [header]))
+
+            for col_ind, column in enumerate(table["columns"]):
+                line = f"    {column['name']} {column['dtype']}".rstrip()
+                if column["constraints"]:
+                    line += f" [{column['constraints']}]"
+                if column["desc"]:
+                    line += f" : {column['desc']}"
+
+                is_key = bool(column["constraints"]) or column["name"].lower() in join_columns
+                overlap = len(query_words & self.__words__(column["name"] + " " + column["desc"]))
+
+                priority = 2 if is_key else 3
+                # Better query overlap first, then table rank, then original column order
+                candidates.append((priority, (-overlap, table_rank, col_ind), "column", (table_rank, col_ind), [line]))
+
+        candidates.sort(key=lambda item: (item[0], item[1]))
+
+        used = count_tokens("Tables:\nJoins:", self.model_name)
+        included = {}
+        for priority, _, kind, key, options in candidates:
+            # Columns are only useful under their table header
+            if kind == "column" and ("table", key[0]) not in included:
+                continue
+
+            for line in options:
+                cost = count_tokens(line, self.model_name) + 1
+                if used + cost <= self.token_budget or kind == "query":
+                    used += cost
+                    included[(kind, key)] = line
+                    break
+
+        # Render in the original structure
+        render_order = list(enumerate(tables))
+        if stable_order:
+            render_order.sort(key=lambda item: (item[1]["type"], item[1]["name"].lower()))
+
+        lines = [included[("query", None)]] if include_query else []
+        lines.append("Tables:")
+        for table_rank, table in render_order:
+            if ("table", table_rank) not in included:
+                continue
+            lines.append(included[("table", table_rank)])
+            lines += [included[("column", (table_rank, col_ind))] for col_ind in range(len(table["columns"]))
+                      if ("column", (table_rank, col_ind)) in included]
+
+        included_joins = [line for ind, line in enumerate(join_lines) if ("join", ind) in included]
+        if stable_order:
+            included_joins.sort()
+        if included_joins:
+            lines.append("Joins:")
+            lines += included_joins
+
+        n_columns = sum(len(table["columns"]) for table in tables)
+        n_included_columns = sum(1 for kind, _ in included if kind == "column")
+        self.report = {
+            "token_budget": self.token_budget,
+            "tokens_used": used,
+            "tables": len(tables),
+            "tables_dropped": [table["name"] for table_rank, table in enumerate(tables) if ("table", table_rank) not in included],
+            "columns": n_columns,
+            "columns_dropped": n_columns - n_included_columns,
+            "joins": len(join_lines),
+            "joins_dropped": len(join_lines) - len(included_joins)
+        }
+
+        return "\n".join(lines)
@@ -9,15 +9,150 @@ import sqlite3
 import time
 import inspect
 import hashlib
+import threading
+import copy
+import collections
+import json
+import io
+import pickle
+import ast
+import uuid
+import asyncio
+import atexit
+import math
+import re
+import types
+import weakref
 
 # --------------------------------------------------------------------
-def get_config_val(config_type: str, key_list: list, get_all=False) -> str:
+config_paths_file = r"C:\Users\mehul\Documents\Projects - GIT\Agents\Decompose KG from Code\pythonProject\CoderAssistants\Code\Utilities\Configs\config_paths.yaml"
+
+class configRegistry:
+    """
+    Process-wide registry of parsed YAML configuration files.
+
+    Each file is parsed once and kept in memory together with its modification time. Every access
+    stats the file and re-parses it only if the mtime (or size) changed, so edits to the configs are
+    still picked up without restarting the process. Resolved key paths are memoized per file, which
+    makes repeated lookups a dictionary hit.
+    """
+    def __init__(self):
+        """
+        Initializes an instance of configRegistry class.
+        """
+        self._lock = threading.RLock()
+        self._files = {}
+
+    def __stamp__(self, file_path: str):
+        """
+        Returns the (mtime, size) stamp used to detect changes of a config file.
+        """
+        stat_res = os.stat(file_path)
+        return stat_res.st_mtime_ns, stat_res.st_size
+
+    def __entry__(self, file_path: str) -> dict:
+        """
+        Returns the cached entry of a config file, parsing it if it is new or has changed on disk.
+
+        Args:
+            file_path (str): Path of the YAML file.
+
+        Returns:
+            dict: Entry containing the parsed data, its stamp and the memoized lookups.
+        """
+        stamp = self.__stamp__(file_path)
+        entry = self._files.get(file_path)
+
+        if entry is not None and entry['stamp'] == stamp:
+            return entry
+
+        with self._lock:
+            # Another thread may have refreshed the entry while we waited for the lock
+            entry = self._files.get(file_path)
+            if entry is not None and entry['stamp'] == stamp:
+                return entry
+
+            with open(file_path, 'r') as conf_file:
+                data = yaml.load(conf_file, yaml.FullLoader)
+
+            entry = {'stamp': stamp, 'data': data, 'lookups': {}}
+            self._files[file_path] = entry
+
+        return entry
+
+    def get(self, file_path: str):
+        """
+        Returns the parsed content of a YAML file.
+
+        Args:
+            file_path (str): Path of the YAML file.
+
+        Returns:
+            The parsed YAML content. It is shared across callers and must not be mutated.
+        """
+        return self.__entry__(file_path)['data']
+
+    def lookup(self, file_path: str, key_list: list):
+        """
+        Resolves a list of keys inside a YAML file.
+
+        Args:
+            file_path (str): Path of the YAML file.
+            key_list (list): Keys to navigate through the configuration.
+
+        Returns:
+            The resolved value. It is shared across callers and must not be mutated.
+
+        Raises:
+            KeyError: If one of the keys can not be resolved.
+        """
+        entry = self.__entry__(file_path)
+        lookup_key = tuple(key_list)
+
+        try:
+            return entry['lookups'][lookup_key]
+        except KeyError:
+            pass
+
+        config_val = entry['data']
+        for key_val in key_list:
+            try:
+                config_val = config_val[key_val]
+            except:
+                raise KeyError(f"Key Value incorrect {key_val}")
+
+        entry['lookups'][lookup_key] = config_val
+        return config_val
+
+    def reload(self, file_path: str = None):
+        """
+        Drops parsed configs so that they are read again from disk on next access.
+
+        Args:
+            file_path (str, optional): Only drop this file. Defaults to dropping every file.
+        """
+        with self._lock:
+            if file_path is None:
+                self._files.clear()
+            else:
+                self._files.pop(file_path, None)
+
+
+config_registry = configRegistry()
+
+# --------------------------------------------------------------------
+def get_config_val(config_type: str, key_list: list, get_all=False, shared=False) -> str:
     """
     Retrieve a configuration value from a YAML configuration file based on the provided configuration type and keys.
 
+    Parsed files are served from the process-wide config_registry and only re-read when they change on disk.
+    Use config_registry.reload() to force a fresh read.
+
     args:
         - config_type (str): The type of configuration to retrieve.
         - *args (str): Variable length argument list of keys to navigate through the configuration.
+        - shared (bool, optional): Return the shared parsed value instead of a copy. It must not be mutated, and
+          stays the same object until its file changes, so callers can cache what they derive from it.
 
     returns:
         - str: The value corresponding to the specified configuration type and keys.
@@ -27,88 +162,435 @@ def get_config_val(config_type: str, key_list: list, get_all=False) -> str:
         - AttributeError: If unable to resolve the configuration value from the list of keys provided.
 
     """
-    with open(
-            r"C:\Users\mehul\Documents\Projects - GIT\Agents\Decompose KG from Code\pythonProject\CoderAssistants\Code\Utilities\Configs\config_paths.yaml",
-            "r") as conf_pths:
-        config_map = yaml.load(conf_pths, yaml.FullLoader)
+    config_map = config_registry.get(config_paths_file)
 
     if config_type not in config_map.keys():
         raise KeyError(f"{config_type} : Config Type not Correct")
 
-    with open(config_map[config_type], 'r') as conf_file:
-        config_val = yaml.load(conf_file, yaml.FullLoader)
-
-        for key_val in key_list:
-            try:
-                config_val = config_val[key_val]
-            except:
-                raise KeyError(f"Key Value incorrect {key_val}")
+    config_val = config_registry.lookup(config_map[config_type], key_list)
 
     if isinstance(config_val, dict) and get_all == False:
         raise AttributeError("Incomplete Key List : Unable to resolve config value from list of keys provided")
 
+    # Hand out copies of containers so callers can not corrupt the shared parsed config
+    if isinstance(config_val, (dict, list)) and not shared:
+        return copy.deepcopy(config_val)
+
     return config_val
 
 # --------------------------------------------------------------------
 
-def log_function(func):
+class metricsRegistry:
+    """
+    In-process registry of function call metrics and named counters.
+
+    For every tracked function it keeps call and error counts, a cumulative latency histogram (for
+    Prometheus) and bounded reservoirs of recent latencies (all calls, and successful calls only) used to
+    compute p50 / p95 / p99.
+    """
+    latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+    def __init__(self, reservoir_size: int = 2048, namespace: str = "coderassistants"):
+        """
+        Initializes an instance of metricsRegistry class.
+
+        Args:
+            reservoir_size (int): Number of most recent latencies kept per function for percentiles.
+            namespace (str): Prefix of the exported Prometheus metric names.
+        """
+        self.reservoir_size = reservoir_size
+        self.namespace = namespace
+        self._functions = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, error: bool = False):
+        """
+        Records one call of a function.
+
+        Args:
+            name (str): Function name.
+            seconds (float): Duration of the call.
+            error (bool): True if the call raised.
+        """
+        with self._lock:
+            fmetrics = self._functions.get(name)
+            if fmetrics is None:
+                fmetrics = self._functions[name] = {
+                    "calls": 0,
+                    "errors": 0,
+                    "total_seconds": 0.0,
+                    "max_seconds": 0.0,
+                    "buckets": [0] * len(self.latency_buckets),
+                    "samples": collections.deque(maxlen=self.reservoir_size),
+                    "ok_samples": collections.deque(maxlen=self.reservoir_size)
+                }
+
+            fmetrics["calls"] += 1
+            fmetrics["errors"] += int(error)
+            fmetrics["total_seconds"] += seconds
+            fmetrics["max_seconds"] = max(fmetrics["max_seconds"], seconds)
+            fmetrics["samples"].append(seconds)
+            if not error:
+                fmetrics["ok_samples"].append(seconds)
+
+            for ind, bound in enumerate(self.latency_buckets):
+                if seconds <= bound:
+                    fmetrics["buckets"][ind] += 1
+                    break
+
+    def increment(self, name: str, value: float = 1):
+        """
+        Increments a named counter.
+
+        Args:
+            name (str): Counter name.
+            value (float): Increment.
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    @staticmethod
+    def __percentile__(sorted_samples: list, percentile: float) -> float:
+        """
+        Returns the nearest-rank percentile of sorted samples.
+        """
+        if not sorted_samples:
+            return 0.0
+        rank = max(int(math.ceil(percentile / 100 * len(sorted_samples))) - 1, 0)
+        return sorted_samples[rank]
+
+    def snapshot(self) -> dict:
+        """
+        Returns the current metrics.
+
+        Returns:
+            dict: {'functions': {name: {calls, errors, total/mean/max seconds, p50, p95, p99}}, 'counters': {...}}
+        """
+        with self._lock:
+            functions = {name: {**fmetrics, "samples": sorted(fmetrics["samples"]), "buckets": list(fmetrics["buckets"])}
+                         for name, fmetrics in self._functions.items()}
+            for fmetrics in functions.values():
+                del fmetrics["ok_samples"]
+            counters = dict(self._counters)
+
+        snapshot = {"functions": {}, "counters": counters}
+        for name, fmetrics in functions.items():
+            snapshot["functions"][name] = {
+                "calls": fmetrics["calls"],
+                "errors": fmetrics["errors"],
+                "total_seconds": fmetrics["total_seconds"],
+                "mean_seconds": fmetrics["total_seconds"] / fmetrics["calls"],
+                "max_seconds": fmetrics["max_seconds"],
+                "p50_seconds": self.__percentile__(fmetrics["samples"], 50),
+                "p95_seconds": self.__percentile__(fmetrics["samples"], 95),
+                "p99_seconds": self.__percentile__(fmetrics["samples"], 99),
+                "buckets": fmetrics["buckets"]
+            }
+
+        return snapshot
+
+    def percentile(self, name: str, percentile: float, include_errors: bool = True):
+        """
+        Returns a latency percentile of a function, or None if the function was never observed.
+
+        Args:
+            name (str): Function name.
+            percentile (float): Percentile, e.g. 95.
+            include_errors (bool): Also count the latencies of failed calls. Defaults to True.
+        """
+        with self._lock:
+            fmetrics = self._functions.get(name)
+            samples = sorted(fmetrics["samples" if include_errors else "ok_samples"]) if fmetrics else []
+
+        return self.__percentile__(samples, percentile) if samples else None
+
+    def count(self, name: str, include_errors: bool = True) -> int:
+        """
+        Returns the number of observed calls of a function, only the successful ones with include_errors=False.
+        """
+        with self._lock:
+            fmetrics = self._functions.get(name)
+            if fmetrics is None:
+                return 0
+            return fmetrics["calls"] if include_errors else fmetrics["calls"] - fmetrics["errors"]
+
+    def to_json(self, indent: int = 2) -> str:
+        """
+        Returns the metrics as a JSON document.
+        """
+        snapshot = self.snapshot()
+        for fmetrics in snapshot["functions"].values():
+            del fmetrics["buckets"]
+
+        return json.dumps(snapshot, indent=indent)
+
+    def to_prometheus(self) -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        prefix = self.namespace
+        lines = []
+
+        def label(name):
+            return name.replace("\\", "\\\\").replace('"', '\\"')
+
+        lines.append(f"# HELP {prefix}_function_calls_total Calls of tracked functions.")
+        lines.append(f"# TYPE {prefix}_function_calls_total counter")
+        for name, fmetrics in snapshot["functions"].items():
+            lines.append(f'{prefix}_function_calls_total{{function="{label(name)}"}} {fmetrics["calls"]}')
+
+        lines.append(f"# HELP {prefix}_function_errors_total Calls of tracked functions that raised.")
+        lines.append(f"# TYPE {prefix}_function_errors_total counter")
+        for name, fmetrics in snapshot["functions"].items():
+            lines.append(f'{prefix}_function_errors_total{{function="{label(name)}"}} {fmetrics["errors"]}')
+
+        lines.append(f"# HELP {prefix}_function_latency_seconds Latency of tracked functions.")
+        lines.append(f"# TYPE {prefix}_function_latency_seconds histogram")
+        for name, fmetrics in snapshot["functions"].items():
+            cumulative = 0
+            for bound, count in zip(self.latency_buckets, fmetrics["buckets"]):
+                cumulative += count
+                lines.append(f'{prefix}_function_latency_seconds_bucket{{function="{label(name)}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_function_latency_seconds_bucket{{function="{label(name)}",le="+Inf"}} {fmetrics["calls"]}')
+            lines.append(f'{prefix}_function_latency_seconds_sum{{function="{label(name)}"}} {fmetrics["total_seconds"]}')
+            lines.append(f'{prefix}_function_latency_seconds_count{{function="{label(name)}"}} {fmetrics["calls"]}')
+
+        lines.append(f"# HELP {prefix}_function_latency_quantile_seconds Latency percentiles over recent calls.")
+        lines.append(f"# TYPE {prefix}_function_latency_quantile_seconds summary")
+        for name, fmetrics in snapshot["functions"].items():
+            for quantile in (50, 95, 99):
+                lines.append(f'{prefix}_function_latency_quantile_seconds{{function="{label(name)}",quantile="{quantile / 100}"}} {fmetrics[f"p{quantile}_seconds"]}')
+            lines.append(f'{prefix}_function_latency_quantile_seconds_sum{{function="{label(name)}"}} {fmetrics["total_seconds"]}')
+            lines.append(f'{prefix}_function_latency_quantile_seconds_count{{function="{label(name)}"}} {fmetrics["calls"]}')
+
+        for name, value in snapshot["counters"].items():
+            metric_name = re.sub(r"[^a-zA-Z0-9_]", "_", f"{prefix}_{name}_total")
+            lines.append(f"# TYPE {metric_name} counter")
+            lines.append(f"{metric_name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def dump(self, file_path: str, fmt: str = "json"):
+        """
+        Writes the metrics to a file.
+
+        Args:
+            file_path (str): Output file path.
+            fmt (str): 'json' or 'prometheus'.
+        """
+        if fmt not in ("json", "prometheus"):
+            raise ValueError("Invalid parameter value : fmt. Acceptable values : {'json', 'prometheus'}")
+
+        with open(file_path, "w") as metrics_fobj:
+            metrics_fobj.write(self.to_json() if fmt == "json" else self.to_prometheus())
+
+    def reset(self):
+        """
+        Clears every metric.
+        """
+        with self._lock:
+            self._functions.clear()
+            self._counters.clear()
+
+
+metrics_registry = metricsRegistry()
+
+# --------------------------------------------------------------------
+
+def log_function(func=None, *, reraise: bool = False):
     """
     Decorator function to log the inputs, outputs, and exceptions of a function.
 
+    Every call is timed with time.perf_counter and recorded in metrics_registry (call count, error
+    count and latency histogram) under the function's qualified name.
+
+    Can be used as @log_function or @log_function(reraise=True).
+
     Input:
     - func (callable): The function to be decorated.
+    - reraise (bool): Re-raise exceptions after logging them instead of returning None.
 
     Output:
     - callable: The decorated function.
     """
+    if func is None:
+        return functools.partial(log_function, reraise=reraise)
+
+    metric_name = f"{func.__module__}.{func.__qualname__}"
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         # Log function inputs
         logging.info(f"'{func.__name__}'|{time.time()}|Start||")
+        start = time.perf_counter()
 
         try:
             # Execute the function
             result = func(*args, **kwargs)
 
+            duration = time.perf_counter() - start
+            metrics_registry.observe(metric_name, duration)
+
             # Log function output
-            logging.info(f"'{func.__name__}'|{time.time()}|Sucess||")
+            logging.info(f"'{func.__name__}'|{time.time()}|Sucess|Duration:{duration:.6f}|")
             return result
 
         except Exception as e:
+            metrics_registry.observe(metric_name, time.perf_counter() - start, error=True)
+
             # Log exceptions
             logging.error(f"'{func.__name__}'|{time.time()}|Error|ErrorMessage{str(e)}|Args:{args} , Kwargs:{kwargs}")
 
+            if reraise:
+                raise
+
     return wrapper
 
 # --------------------------------------------------------------------
+db_base_path = "C:/Users/mehul/Documents/Projects - GIT/Agents/Decompose KG from Code/pythonProject/CoderAssistants/DBinst/"
+
+class connectionManager:
+    """
+    Pool of SQLite connections shared by every accessDB instance.
+
+    Each thread gets its own connection (and cursor) per database file, so instances pointing at the
+    same info_type / db_name reuse one connection per thread instead of reconnecting, and concurrent
+    threads never share a cursor. Connections are opened in WAL journal mode with a busy timeout so
+    readers do not block on writers and short write contention waits instead of failing with
+    "database is locked".
+    """
+    def __init__(self, busy_timeout: float = 30.0, journal_mode: str = "WAL", synchronous: str = "NORMAL"):
+        """
+        Initializes an instance of connectionManager class.
+
+        Args:
+            busy_timeout (float): Seconds to wait on a locked database before raising.
+            journal_mode (str): SQLite journal mode used for every connection.
+            synchronous (str): SQLite synchronous level used for every connection.
+        """
+        self.busy_timeout = busy_timeout
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self._local = threading.local()
+
+    def __thread_pool__(self) -> dict:
+        """
+        Returns the {db_path: (connection, cursor)} map of the calling thread.
+        """
+        pool = getattr(self._local, 'pool', None)
+        if pool is None:
+            pool = self._local.pool = {}
+        return pool
+
+    def __connect__(self, db_path: str):
+        """
+        Opens and configures a new connection to a database file.
+
+        Args:
+            db_path (str): Path of the SQLite database file.
+
+        Returns:
+            sqlite3.Connection: The configured connection.
+        """
+        connection = sqlite3.connect(db_path,
+                                     timeout=self.busy_timeout,
+                                     check_same_thread=False,
+                                     cached_statements=256)
+        connection.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        connection.execute(f"PRAGMA synchronous={self.synchronous}")
+        connection.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+
+        return connection
+
+    def get(self, db_path: str):
+        """
+        Returns the connection and cursor of the calling thread for a database file, opening them if needed.
+
+        Args:
+            db_path (str): Path of the SQLite database file.
+
+        Returns:
+            tuple: (sqlite3.Connection, sqlite3.Cursor)
+        """
+        pool = self.__thread_pool__()
+        conn_cursor = pool.get(db_path)
+
+        if conn_cursor is None:
+            connection = self.__connect__(db_path)
+            conn_cursor = (connection, connection.cursor())
+            pool[db_path] = conn_cursor
+
+        return conn_cursor
+
+    def close(self, db_path: str = None):
+        """
+        Closes connections of the calling thread.
+
+        Args:
+            db_path (str, optional): Only close the connection to this database. Defaults to all of them.
+        """
+        pool = self.__thread_pool__()
+        db_paths = list(pool.keys()) if db_path is None else [db_path]
+
+        for path in db_paths:
+            conn_cursor = pool.pop(path, None)
+            if conn_cursor is not None:
+                conn_cursor[0].close()
+
+
+connection_manager = connectionManager()
+
 class accessDB:
     def __init__(self, info_type: str, db_name: str):
         """
         Initializes an instance of AccessDB class.
 
+        Connections are not owned by the instance. They are taken from the shared connection_manager,
+        so the instance can be used from any thread.
+
         Args:
             info_type (str): Type of information (e.g., 'cache', 'table metadata').
             db_name (str): Name of the SQLite database.
         """
         # Construct database file path
-        base_path = "C:/Users/mehul/Documents/Projects - GIT/Agents/Decompose KG from Code/pythonProject/CoderAssistants/DBinst/"
-        directory = os.path.join(base_path,info_type)
+        directory = os.path.join(db_base_path,info_type)
         if not os.path.exists(directory):
-            os.makedirs(directory)
+            os.makedirs(directory, exist_ok=True)
+
+        self.db_path = os.path.join(directory,f"{db_name}.db")
+
+    @property
+    def connection(self):
+        """
+        sqlite3.Connection: Connection of the calling thread to this database.
+        """
+        return connection_manager.get(self.db_path)[0]
 
-        dbconnection = os.path.join(directory,f"{db_name}.db")
+    @property
+    def cursor(self):
+        """
+        sqlite3.Cursor: Cursor of the calling thread on this database.
+        """
+        return connection_manager.get(self.db_path)[1]
 
-        # Connect to the SQLite database
-        self.connection = sqlite3.connect(dbconnection)
-        self.cursor = self.connection.cursor()
+    def close(self):
+        """
+        Closes the connection of the calling thread to this database.
+        """
+        connection_manager.close(self.db_path)
 
     def create_table(self, tableSchema: dict):
         """
         Create a table in the SQLite database.
 
         Args:
-            table_schema (dict): Dictionary containing table schema information.
+            table_schema (dict): Dictionary containing table schema information. An optional 'indexes'
+                entry maps index names to the list of columns / expressions to index, e.g.
+                {'idx_tableCol_name': ['lower(TableName)', 'lower(ColumnName)']}.
+
+        Columns missing from an existing table are added with ALTER TABLE, so schemas can grow new columns.
         """
         tableName = tableSchema['tableName']
 
@@ -127,18 +609,36 @@ class accessDB:
 
         # Execute the table creation query
         self.cursor.execute(tableCreateQuery)
+
+        # Add columns introduced after the table was first created
+        existingCols = {row[1].lower() for row in self.cursor.execute(f'PRAGMA table_info({tableName})').fetchall()}
+        for col, md in tableSchema['columns'].items():
+            if col.lower() not in existingCols:
+                colDef = " ".join(token for token in md if token.upper() not in ('PRIMARY KEY', 'UNIQUE'))
+                self.cursor.execute(f'ALTER TABLE {tableName} ADD COLUMN {col} {colDef}')
+
+        # Create the lookup indexes
+        for indexName, indexCols in tableSchema.get('indexes', {}).items():
+            self.cursor.execute(f'CREATE INDEX IF NOT EXISTS {indexName} ON {tableName} ({", ".join(indexCols)})')
+
         self.connection.commit()
 
 
-    def get_data(self, tableName: str, lookupDict: dict, lookupVal: list, fetchtype = "one"):
+    def get_data(self, tableName: str, lookupDict: dict, lookupVal: list, fetchtype = "one", casefold = True):
         """
         Retrieve data from the SQLite database.
 
+        Lookup values are passed as bound parameters, so the statement text only depends on the table and
+        columns and is reused from the connection statement cache. Case-insensitive lookups filter on
+        lower(column), which is served by the lower(...) expression indexes declared in the table schemas.
+
         Args:
             table_name (str): Name of the table.
             lookup_dict (dict): Dictionary containing lookup column-value pairs for filtering data (default: None).
             lookup_val (list): List of column names to retrieve (default: None).
             fetch_type (str): Type of fetch operation, 'one' or 'all' (default: 'one').
+            casefold (bool): Match lookup values case-insensitively (default: True). Use False for exact keys
+                so the plain column / primary key index is used.
 
         Returns:
             tuple or list: Retrieved data.
@@ -151,34 +651,115 @@ class accessDB:
 
         else:
             lookupkeyslist = []
+            lookupparams = []
             for colname, colval in lookupDict.items():
-                lookupkeyslist.append(f"lower({colname}) = '{str(colval).lower()}'")
+                if casefold:
+                    lookupkeyslist.append(f"lower({colname}) = ?")
+                    lookupparams.append(str(colval).lower())
+                else:
+                    lookupkeyslist.append(f"{colname} = ?")
+                    lookupparams.append(str(colval))
 
             lookupQuery = f'''SELECT { ", ".join(lookupVal) } FROM { tableName } WHERE { " AND ".join(lookupkeyslist) }'''
 
-            self.cursor.execute(lookupQuery)
+            self.cursor.execute(lookupQuery, lookupparams)
 
         if fetchtype == "one":
             return self.cursor.fetchone()
         else:
             return self.cursor.fetchall()
 
-    def post_data(self, tableName: str, insertlist: list[dict[str,str]]) -> None:
+    @staticmethod
+    def __group_records__(insertlist: list[dict[str,str]]) -> dict:
+        """
+        Groups records by their column set, keeping the insertion order.
+
+        Values are stored as text, except bytes which are stored as BLOBs.
+
+        Args:
+            insertlist (list): List of dictionaries containing data to insert.
+
+        Returns:
+            dict: {tuple of column names: list of value tuples}
+        """
+        grouped = {}
+        for records_dict in insertlist:
+            colList = tuple(records_dict.keys())
+            grouped.setdefault(colList, []).append(
+                tuple(val if isinstance(val, bytes) else str(val) for val in records_dict.values())
+            )
+
+        return grouped
+
+    def __insert__(self, tableName: str, insertlist: list[dict[str,str]], upsert_keys: list = None) -> None:
+        """
+        Writes records with one executemany per column set. Does not commit.
+
+        Args:
+            tableName (str): Name of the table.
+            insertlist (list): List of dictionaries containing data to insert.
+            upsert_keys (list, optional): Conflict target columns. When given, conflicting rows are updated.
+        """
+        cursor = self.cursor
+
+        for colList, colvals in self.__group_records__(insertlist).items():
+            placehldr = ",".join(["?"]*len(colList))
+            insertQuery = f'Insert into {tableName}(`{"`, `".join(colList)}`) values ({placehldr})'
+
+            if upsert_keys:
+                updateCols = [col for col in colList if col.lower() not in {key.lower() for key in upsert_keys}]
+                conflictTarget = f'ON CONFLICT(`{"`, `".join(upsert_keys)}`)'
+
+                if updateCols:
+                    insertQuery = f'{insertQuery} {conflictTarget} DO UPDATE SET {", ".join(f"`{col}` = excluded.`{col}`" for col in updateCols)}'
+                else:
+                    insertQuery = f'{insertQuery} {conflictTarget} DO NOTHING'
+
+            cursor.executemany(insertQuery, colvals)
+
+    def post_data(self, tableName: str, insertlist: list[dict[str,str]], upsert_keys: list = None) -> None:
         """
         Insert data into the SQLite database.
 
+        Records are grouped by column set and written with executemany inside a single transaction.
+
         Args:
             table_name (str): Name of the table.
             insert_list (list): List of dictionaries containing data to insert.
+            upsert_keys (list, optional): Columns of a unique/primary key. When provided, records that
+                conflict on these columns update the existing row (INSERT ... ON CONFLICT DO UPDATE).
         """
-        for records_dict in insertlist:
-            colList = records_dict.keys()
-            placehldr = ",".join(["?"]*len(records_dict.keys()))
-            colval = tuple(map(str,records_dict.values()))
-            self.cursor.execute(f'Insert into {tableName}(`{"`, `".join(colList)}`) values ({placehldr})', colval)
+        if not len(insertlist):
+            return
 
-        self.connection.commit()
+        with self.connection:
+            self.__insert__(tableName, insertlist, upsert_keys)
+
+    def replace_data(self, tableName: str, lookupCol: str, insertlist: list[dict[str,str]]) -> None:
+        """
+        Replace every row that shares a lookup value with the records provided, in a single transaction.
+
+        All existing rows whose lookupCol value is present in insertlist (compared case-insensitively, like
+        get_data lookups) are deleted and the records are bulk inserted. Readers never observe the
+        intermediate (deleted) state.
+
+        Args:
+            tableName (str): Name of the table.
+            lookupCol (str): Column identifying the groups of rows to replace (e.g., 'TableName').
+            insertlist (list): List of dictionaries containing data to insert.
+        """
+        if not len(insertlist):
+            return
+
+        # Column names are case-insensitive in SQLite, so match the record keys the same way
+        lookupVals = []
+        for records_dict in insertlist:
+            lookupVals.extend(str(val) for col, val in records_dict.items() if col.lower() == lookupCol.lower())
+        lookupVals = list(dict.fromkeys(val.lower() for val in lookupVals))
 
+        with self.connection:
+            self.cursor.executemany(f'DELETE FROM {tableName} WHERE lower({lookupCol}) = ?', [(val,) for val in lookupVals])
+            self.__insert__(tableName, insertlist)
 
     def update_data(self, tableName: str, matchVal: dict[str,str], updateVal: dict[str,str]) -> None:
         """
@@ -227,27 +808,316 @@ class accessDB:
         FROM {tableName}
         '''
 
+        lookupParams = []
         if len(lookupDict):
             lookupList = []
             for col, vals in lookupDict.items():
-                lookupList.append(f"{col} = '{vals}'")
+                lookupList.append(f"{col} = ?")
+                lookupParams.append(str(vals))
 
             deleteQuery = f'''
             {deleteQuery}
             WHERE {" AND ".join(lookupList)}
             '''
 
-        self.cursor.execute(deleteQuery)
+        self.cursor.execute(deleteQuery, lookupParams)
         self.connection.commit()
 
 
 # --------------------------------------------------------------------
 
+class jsonSerializer:
+    """
+    Serializes values as compact UTF-8 JSON.
+    """
+    name = "json"
+
+    def dumps(self, value) -> bytes:
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data: bytes):
+        return json.loads(data)
+
+
+class schemaUnpickler(pickle.Unpickler):
+    """
+    Unpickler that only resolves the classes of a declared schema and standard library data types, so a
+    stored value can not reference arbitrary callables (os.system, ...).
+    """
+    safe_globals = {
+        ("builtins", name) for name in ("set", "frozenset", "bytearray", "complex", "slice", "range")
+    } | {
+        ("collections", name) for name in ("OrderedDict", "defaultdict", "deque", "Counter")
+    } | {
+        ("datetime", name) for name in ("date", "datetime", "time", "timedelta", "timezone")
+    } | {("decimal", "Decimal")}
+
+    def __init__(self, file, schema):
+        super().__init__(file)
+        schema = schema if isinstance(schema, tuple) else (schema,)
+        self.allowed_globals = self.safe_globals | {(cls.__module__, cls.__qualname__) for cls in schema}
+
+    def find_class(self, module: str, name: str):
+        if (module, name) not in self.allowed_globals:
+            raise pickle.UnpicklingError(f"Global '{module}.{name}' is not part of the declared schema")
+        return super().find_class(module, name)
+
+
+class pickleSerializer:
+    """
+    Serializes values with pickle. Only used by functions that opt in with serializer="pickle" and a schema;
+    loading resolves nothing but the schema classes and standard library data types (schemaUnpickler).
+    """
+    name = "pickle"
+
+    def dumps(self, value) -> bytes:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data: bytes, schema=None):
+        if schema is None:
+            raise ValueError("Pickled values are only loaded for a declared schema")
+        return schemaUnpickler(io.BytesIO(data), schema).load()
+
+
+class msgpackSerializer:
+    """
+    Serializes values with msgpack. Requires the optional msgpack package.
+    """
+    name = "msgpack"
+
+    def dumps(self, value) -> bytes:
+        import msgpack
+        return msgpack.packb(value, use_bin_type=True)
+
+    def loads(self, data: bytes):
+        import msgpack
+        return msgpack.unpackb(data, raw=False)
+
+
+cache_serializers = {
+    serializer.name: serializer
+    for serializer in (jsonSerializer(), pickleSerializer(), msgpackSerializer())
+}
+
+# --------------------------------------------------------------------
+
+def __qualified_name__(value) -> str:
+    """
+    Importable "module.qualname" of a function, class or method.
+
+    Raises:
+        TypeError: If the name does not identify the value (lambdas, functions and classes defined in a function).
+    """
+    qualname = getattr(value, "__qualname__", None)
+    if not qualname or "<" in qualname:
+        raise TypeError(f"{value!r} has no importable name and can not be encoded faithfully")
+
+    return f"{getattr(value, '__module__', None)}.{qualname}"
+
+
+def canonical_encode(value):
+    """
+    Converts a value into a JSON-compatible structure that is identical for semantically equal values.
+
+    Dictionaries and sets are ordered, tuples are treated as lists, functions, classes and modules are
+    encoded from their importable name and objects from their module, class name and attributes instead
+    of their repr (which usually embeds a memory address).
+
+    Args:
+        value: Value to encode.
+
+    Returns:
+        A JSON-compatible representation of the value.
+
+    Raises:
+        TypeError: If the value can not be told apart from a different one by its encoding (lambdas, local
+            functions, objects known only by their address).
+    """
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+
+    if isinstance(value, float):
+        return {"__float__": repr(value)}
+
+    if isinstance(value, bytes):
+        return {"__bytes__": value.hex()}
+
+    if isinstance(value, dict):
+        items = [(canonical_encode(key), canonical_encode(val)) for key, val in value.items()]
+        items.sort(key=lambda item: json.dumps(item[0], sort_keys=True))
+        return {"__dict__": items}
+
+    if isinstance(value, (list, tuple)):
+        return [canonical_encode(val) for val in value]
+
+    if isinstance(value, (set, frozenset)):
+        return {"__set__": sorted((canonical_encode(val) for val in value), key=lambda val: json.dumps(val, sort_keys=True))}
+
+    if isinstance(value, types.ModuleType):
+        return {"__module__": value.__name__}
+
+    if isinstance(value, functools.partial):
+        return {"__partial__": [canonical_encode(value.func), canonical_encode(value.args), canonical_encode(value.keywords)]}
+
+    if isinstance(value, types.MethodType):
+        return {"__method__": [canonical_encode(value.__self__), __qualified_name__(value.__func__)]}
+
+    if isinstance(value, types.BuiltinFunctionType) and not isinstance(value.__self__, (types.ModuleType, type(None))):
+        # Bound method of a builtin object, e.g. [].append
+        return {"__method__": [canonical_encode(value.__self__), f"{type(value.__self__).__module__}.{value.__qualname__}"]}
+
+    if isinstance(value, (type, types.FunctionType, types.BuiltinFunctionType)):
+        return {"__callable__": __qualified_name__(value)}
+
+    if hasattr(value, "__dict__"):
+        return {"__object__": __qualified_name__(type(value)), "attributes": canonical_encode(vars(value))}
+
+    representation = repr(value)
+    if " at 0x" in representation:
+        raise TypeError(f"{type(value).__name__} is only known by its address and can not be encoded faithfully")
+
+    return {"__repr__": representation}
+
+# --------------------------------------------------------------------
+
+class lruCache:
+    """
+    Thread-safe in-process LRU cache bounded by entry count and total bytes.
+
+    Entries carry an optional expiry timestamp and are dropped lazily when read after expiry.
+    """
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initializes an instance of lruCache class.
+
+        Args:
+            max_entries (int): Maximum number of entries kept in memory.
+            max_bytes (int): Maximum total size (in bytes) of the entries kept in memory.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str):
+        """
+        Returns the cached value of a key, or None if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                self.total_bytes -= size
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value, size: int, expires_at: float = None):
+        """
+        Stores a value and evicts the least recently used entries until the caps are respected.
+
+        Args:
+            key (str): Cache key.
+            value: Value to store.
+            size (int): Size of the value in bytes.
+            expires_at (float, optional): Epoch time after which the entry is stale.
+        """
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[1]
+
+            self._entries[key] = (value, size, expires_at)
+            self.total_bytes += size
+
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+
+    def pop(self, key: str):
+        """
+        Removes a key from the cache if present.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.total_bytes -= entry[1]
+
+    def clear(self):
+        """
+        Removes every entry from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+# --------------------------------------------------------------------
+
+# Live cachefunc instances, held weakly so registering for the exit flush does not keep them alive
+_cache_instances = weakref.WeakSet()
+
+
+def __flush_caches__():
+    """
+    Writes the pending counters of every live cachefunc at interpreter exit.
+    """
+    for cache in list(_cache_instances):
+        cache.flush_stats()
+
+
+atexit.register(__flush_caches__)
+
+
 class cachefunc:
-    def __init__(self):
+    valid_eviction_policies = {"LRU", "LFU"} # Set of valid on-disk eviction policies
+    access_flush_entries = 256 # Buffered disk hits written in one batch
+    access_flush_interval = 5.0 # Seconds after which buffered disk hits are written anyway
+
+    def __init__(self,
+                 max_entries: int = 1024,
+                 max_bytes: int = 64 * 1024 * 1024,
+                 max_disk_bytes: int = None,
+                 eviction_policy: str = "LRU",
+                 default_ttl: float = None,
+                 default_serializer: str = "auto",
+                 lease_timeout: float = 600.0,
+                 lease_poll_interval: float = 0.25):
         """
         Initializes an instance of cachefunc class.
+
+        Results are kept in two levels: a bounded in-process LRU (memory) in front of the SQLite
+        store (disk). Hot keys are served from memory without touching the database.
+
+        Args:
+            max_entries (int): Maximum number of entries in the in-memory tier.
+            max_bytes (int): Maximum total size (in bytes) of the in-memory tier.
+            max_disk_bytes (int, optional): Maximum total size (in bytes) of stored values on disk. Unbounded if None.
+            eviction_policy (str): On-disk eviction policy, 'LRU' (least recently used) or 'LFU' (least frequently used).
+            default_ttl (float, optional): Time to live in seconds for entries of functions without their own ttl.
+            default_serializer (str): Serializer of functions without their own, 'auto', 'json' or 'msgpack'.
+                'auto' uses JSON when the value round-trips unchanged, else msgpack when installed and the value
+                round-trips; values neither can encode are not cached. Pickle is never a default, a function
+                opts in with memoize(serializer="pickle", schema=...).
+            lease_timeout (float): Seconds after which a single-flight lease of a crashed process is taken over.
+            lease_poll_interval (float): Seconds between cache checks while waiting on another process's lease.
         """
+        if eviction_policy not in self.valid_eviction_policies:
+            raise ValueError(f"Invalid parameter value : eviction_policy. Acceptable values : {self.valid_eviction_policies}")
+
         # Establish connection to the SQLite database
         self.info_type = "cache"
         self.dbName = "memoize"
@@ -256,64 +1126,769 @@ class cachefunc:
             'tableName' : 'cache',
             'columns' : {
                 'key': ['TEXT', 'PRIMARY KEY'],
-                'value': ['TEXT', '']
+                'value': ['BLOB', ''],
+                'serializer': ['TEXT', ''],
+                'func_name': ['TEXT', ''],
+                'created_at': ['REAL', ''],
+                'last_access': ['REAL', ''],
+                'expires_at': ['REAL', ''],
+                'hits': ['INTEGER', 'DEFAULT 0'],
+                'size': ['INTEGER', 'DEFAULT 0']
+            },
+            'indexes' : {
+                'idx_cache_last_access': ['last_access'],
+                'idx_cache_func_name': ['func_name']
+            }
+        }
+        self.stats_schema = {
+            'tableName' : 'cache_stats',
+            'columns' : {
+                'func_name': ['TEXT', 'PRIMARY KEY'],
+                'hits': ['INTEGER', 'DEFAULT 0'],
+                'misses': ['INTEGER', 'DEFAULT 0']
+            }
+        }
+        self.lease_schema = {
+            'tableName' : 'cache_lease',
+            'columns' : {
+                'key': ['TEXT', 'PRIMARY KEY'],
+                'owner': ['TEXT', ''],
+                'expires_at': ['REAL', '']
             }
         }
 
+        self.memory_cache = lruCache(max_entries, max_bytes)
+        self.max_disk_bytes = max_disk_bytes
+        self.eviction_policy = eviction_policy
+        self.default_ttl = default_ttl
+        self.default_serializer = default_serializer
+        self.lease_timeout = lease_timeout
+        self.lease_poll_interval = lease_poll_interval
+
+        # Per-function hit / miss counts not yet written to cache_stats, {func_name: {'hits': n, 'misses': n}}
+        self._func_stats = {}
+        # Flushed at exit through a weak reference, so the instance (and its DB handle) can be collected
+        _cache_instances.add(self)
+
+        # In-flight single-flight computations of this process, {key: flight dict}
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+        # Disk hits not yet written to the cache table, {key: [hits, last_access]}
+        self._pending_access = {}
+        self._access_lock = threading.Lock()
+        self._access_flushed_at = time.monotonic()
+
+        self._table_ready = False
+        # Total size of the stored values, only read / written under _disk_lock
+        self._disk_bytes = 0
+        self._disk_lock = threading.RLock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "disk_evictions": 0,
+            "coalesced_threads": 0,
+            "coalesced_processes": 0
+        }
+
     def create_cache_table(self):
         """
         Creates the cache table if it doesn't already exist.
         """
+        if self._table_ready:
+            return
+
         self.DBObj.create_table(self.table_schema)
+        self.DBObj.create_table(self.lease_schema)
+        self.DBObj.create_table(self.stats_schema)
+        with self._disk_lock:
+            self._disk_bytes = self.DBObj.get_data(self.table_schema["tableName"], {}, ["COALESCE(SUM(size), 0)"])[0]
+        self._table_ready = True
+
+    def refresh_disk_usage(self) -> int:
+        """
+        Recomputes the total size of the stored values from the SQLite store, e.g. after it was changed
+        outside this cachefunc (maintenance, imports, other processes).
+
+        Returns:
+            int: Total size (in bytes) of the stored values.
+        """
+        self.create_cache_table()
+        with self._disk_lock:
+            self._disk_bytes = self.DBObj.get_data(self.table_schema["tableName"], {}, ["COALESCE(SUM(size), 0)"])[0]
+            return self._disk_bytes
+
+    def __count__(self, stat_name: str, increment: int = 1):
+        """
+        Increments one of the cache counters.
+        """
+        with self._stats_lock:
+            self._stats[stat_name] += increment
+
+    def __count_func__(self, func_name: str, stat_name: str):
+        """
+        Increments the pending hit / miss count of a memoized function. Written to disk by flush_stats.
+        """
+        with self._stats_lock:
+            func_stats = self._func_stats.setdefault(func_name, {"hits": 0, "misses": 0})
+            func_stats[stat_name] += 1
+
+    def flush_stats(self):
+        """
+        Adds the pending per-function hit / miss counts to the cache_stats table.
+
+        Counts are buffered in memory so hits served from the in-memory tier never touch the database.
+        They are flushed on every cache write and at interpreter exit, together with the buffered disk hits
+        (see flush_access).
+        """
+        self.flush_access()
+
+        with self._stats_lock:
+            pending = self._func_stats
+            self._func_stats = {}
+
+        if not pending:
+            return
+
+        try:
+            self.create_cache_table()
+            tableName = self.stats_schema["tableName"]
+
+            with self.DBObj.connection:
+                self.DBObj.cursor.executemany(f'''
+                    INSERT INTO {tableName} (func_name, hits, misses) VALUES (?, ?, ?)
+                    ON CONFLICT(func_name) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses
+                ''', [(func_name, counts["hits"], counts["misses"]) for func_name, counts in pending.items()])
+        except sqlite3.Error as e:
+            logging.warning(f"'flush_stats'|{time.time()}|Error|ErrorMessage{str(e)}|")
+
+    def flush_access(self):
+        """
+        Writes the buffered disk hits (hit counts and last access times used by the LRU / LFU eviction) to
+        the cache table in one batch, so reads do not each cost an UPDATE and a commit.
+        """
+        with self._access_lock:
+            pending = self._pending_access
+            self._pending_access = {}
+            self._access_flushed_at = time.monotonic()
+
+        if not pending:
+            return
+
+        try:
+            self.create_cache_table()
+            tableName = self.table_schema["tableName"]
+
+            with self.DBObj.connection:
+                self.DBObj.cursor.executemany(f'''
+                    UPDATE {tableName} SET hits = hits + ?, last_access = MAX(COALESCE(last_access, 0), ?) WHERE key = ?
+                ''', [(hits, last_access, key) for key, (hits, last_access) in pending.items()])
+        except sqlite3.Error as e:
+            logging.warning(f"'flush_access'|{time.time()}|Error|ErrorMessage{str(e)}|")
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: Hit, miss and eviction counters along with the size of the in-memory tier.
+        """
+        with self._stats_lock:
+            cache_stats = dict(self._stats)
+
+        cache_stats["memory_evictions"] = self.memory_cache.evictions
+        cache_stats["memory_entries"] = len(self.memory_cache)
+        cache_stats["memory_bytes"] = self.memory_cache.total_bytes
+        with self._disk_lock:
+            cache_stats["disk_bytes"] = self._disk_bytes
+
+        return cache_stats
+
+    @staticmethod
+    def __encode__(value, serializer: str, schema=None) -> tuple:
+        """
+        Serializes a result for storage.
+
+        Args:
+            value: Result to store.
+            serializer (str): Serializer name ('auto', 'json', 'msgpack' or 'pickle').
+            schema (type or tuple, optional): Declared type(s) of the result.
+
+        Returns:
+            tuple: (serializer name, serialized bytes)
+
+        Raises:
+            TypeError: If the result does not match the declared schema.
+        """
+        if schema is not None and not isinstance(value, schema):
+            raise TypeError(f"Memoized result of type {type(value).__name__} does not match declared schema {schema}")
+
+        if serializer == "auto":
+            for candidate in ("json", "msgpack"):
+                try:
+                    data = cache_serializers[candidate].dumps(value)
+                    if cache_serializers[candidate].loads(data) == value:
+                        return candidate, data
+                except Exception:
+                    # Unsupported type, msgpack not installed, or msgpack's own errors
+                    pass
+            raise TypeError(f"Result of type {type(value).__name__} does not round-trip through json or msgpack")
+
+        if serializer not in cache_serializers:
+            raise ValueError(f"Invalid parameter value : serializer. Acceptable values : {set(cache_serializers) | {'auto'}}")
+
+        if serializer == "pickle":
+            if schema is None:
+                raise ValueError("serializer='pickle' requires a declared schema")
+            data = cache_serializers["pickle"].dumps(value)
+            # Values the restricted loader can not read back would only ever be misses
+            try:
+                cache_serializers["pickle"].loads(data, schema)
+            except pickle.UnpicklingError as e:
+                raise TypeError(str(e))
+            return serializer, data
+
+        return serializer, cache_serializers[serializer].dumps(value)
+
+    @staticmethod
+    def __decode__(serializer: str, data, schema=None):
+        """
+        Rebuilds a cached result from its stored representation.
+
+        Args:
+            serializer (str): Serializer name stored with the entry. None for entries written as str(result).
+            data (bytes or str): Stored value.
+            schema (type or tuple, optional): Declared type(s) of the result.
+
+        Returns:
+            The cached result.
+
+        Raises:
+            ValueError: If the entry can not be decoded or does not match the declared schema.
+        """
+        if serializer is None:
+            # Entries written before serializers were introduced hold str(result)
+            try:
+                value = ast.literal_eval(data)
+            except (ValueError, SyntaxError):
+                value = data
+        else:
+            try:
+                if serializer == "pickle":
+                    # Restricted to the schema classes, checked while loading rather than after
+                    value = cache_serializers[serializer].loads(data, schema)
+                else:
+                    value = cache_serializers[serializer].loads(data)
+            except Exception as e:
+                raise ValueError(f"Unable to decode cached value : {e}")
+
+        if schema is not None and not isinstance(value, schema):
+            raise ValueError(f"Cached value of type {type(value).__name__} does not match declared schema {schema}")
+
+        return value
+
+    @staticmethod
+    def __make_key__(func_name: str, signature, args: tuple, kwargs: dict) -> str:
+        """
+        Builds the cache key of a call from a canonical, order-independent encoding of its arguments.
+
+        Arguments are bound to the function signature with defaults applied, so f(1, b=2), f(b=2, a=1)
+        and f(1) (when b defaults to 2) share a key. The bound instance (self / cls) is not part of the key.
+
+        Args:
+            func_name (str): Qualified name of the memoized function.
+            signature (inspect.Signature): Signature of the memoized function.
+            args (tuple): Positional arguments of the call.
+            kwargs (dict): Keyword arguments of the call.
+
+        Returns:
+            str: SHA-256 hex digest identifying the call.
+
+        Raises:
+            TypeError: If the arguments do not match the signature or can not be encoded (see canonical_encode).
+                The call is then not cached.
+        """
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+
+        arguments = dict(bound.arguments)
+        parameters = list(signature.parameters)
+        if parameters and parameters[0] in ("self", "cls"):
+            arguments.pop(parameters[0], None)
+
+        key = json.dumps([func_name, canonical_encode(arguments)], sort_keys=True, separators=(',', ':'))
+
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def __get_disk__(self, key: str):
+        """
+        Reads a key from the SQLite store, dropping it if it has expired.
+
+        Returns:
+            tuple: (stored value, expires_at, size, serializer) or None if the key is missing or expired.
+        """
+        tableName = self.table_schema["tableName"]
+        result = self.DBObj.get_data(tableName, {"key": key}, ["value", "expires_at", "size", "serializer"], casefold=False)
+
+        if result is None:
+            return None
+
+        if result[1] is not None and result[1] <= time.time():
+            with self._disk_lock:
+                with self.DBObj.connection:
+                    # Only the thread that actually deletes the entry (not a concurrent reader) uncounts it
+                    self.DBObj.cursor.execute(f"DELETE FROM {tableName} WHERE key = ? AND expires_at <= ?", (key, time.time()))
+                    deleted = self.DBObj.cursor.rowcount
+                if deleted:
+                    self._disk_bytes -= result[2] or 0
+            self.__count__("expired")
+            return None
+
+        # Buffered, a read must not turn into a write
+        with self._access_lock:
+            access = self._pending_access.setdefault(key, [0, 0.0])
+            access[0] += 1
+            access[1] = time.time()
+            flush = (len(self._pending_access) >= self.access_flush_entries or
+                     time.monotonic() - self._access_flushed_at >= self.access_flush_interval)
+
+        if flush:
+            self.flush_access()
+
+        return result
+
+    def __put_disk__(self, key: str, func_name: str, serializer: str, value: bytes, expires_at: float):
+        """
+        Writes a key to the SQLite store and enforces the on-disk size cap.
+        """
+        now = time.time()
+        size = len(value)
+
+        vals_list = [
+            {
+                "key": key,
+                "value": value,
+                "serializer": serializer,
+                "func_name": func_name,
+                "created_at": now,
+                "last_access": now,
+                "expires_at": expires_at,
+                "hits": 0,
+                "size": size
+            }
+        ]
+        # Expiry is optional, stored as NULL rather than the string 'None'
+        if expires_at is None:
+            del vals_list[0]["expires_at"]
+
+        tableName = self.table_schema["tableName"]
+        with self._disk_lock:
+            # The upsert replaces an existing entry, whose size must not be counted twice. The size is read in
+            # the write transaction (BEGIN IMMEDIATE), so no other writer can replace the entry in between.
+            with self.DBObj.connection:
+                cursor = self.DBObj.cursor
+                cursor.execute("BEGIN IMMEDIATE")
+                previous = cursor.execute(f"SELECT size FROM {tableName} WHERE key = ?", (key,)).fetchone()
+                self.DBObj.__insert__(tableName, vals_list, upsert_keys=["key"])
+
+            self._disk_bytes += size - ((previous[0] or 0) if previous is not None else 0)
+            over_cap = self.max_disk_bytes is not None and self._disk_bytes > self.max_disk_bytes
+
+        if over_cap:
+            self.evict_disk()
+
+    def evict_disk(self, target_bytes: int = None):
+        """
+        Evicts entries from the SQLite store according to the eviction policy.
+
+        Expired entries are removed first, then entries in LRU / LFU order until the stored values fit
+        in target_bytes (defaults to 90% of max_disk_bytes, leaving head room between evictions).
+
+        Args:
+            target_bytes (int, optional): Size (in bytes) to shrink the store to.
+        """
+        if target_bytes is None:
+            if self.max_disk_bytes is None:
+                return
+            target_bytes = int(self.max_disk_bytes * 0.9)
+
+        self.create_cache_table()
+        # Eviction order depends on the buffered hits
+        self.flush_access()
+
+        tableName = self.table_schema["tableName"]
+        order_by = "last_access ASC" if self.eviction_policy == "LRU" else "hits ASC, last_access ASC"
+
+        # Stores of other threads wait, so the recomputed total does not miss their size
+        with self._disk_lock, self.DBObj.connection:
+            cursor = self.DBObj.cursor
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(f"DELETE FROM {tableName} WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+            disk_bytes = cursor.execute(f"SELECT COALESCE(SUM(size), 0) FROM {tableName}").fetchone()[0]
+
+            evicted_keys = []
+            if disk_bytes > target_bytes:
+                for key, size in cursor.execute(f"SELECT key, size FROM {tableName} ORDER BY {order_by}").fetchall():
+                    if disk_bytes <= target_bytes:
+                        break
+                    evicted_keys.append((key,))
+                    disk_bytes -= size
+
+                cursor.executemany(f"DELETE FROM {tableName} WHERE key = ?", evicted_keys)
+
+            self._disk_bytes = disk_bytes
+
+        self.__count__("disk_evictions", len(evicted_keys))
+
+    def clear_memory(self):
+        """
+        Empties the in-memory tier. The SQLite store is left untouched.
+        """
+        self.memory_cache.clear()
+
+    def __lookup_memory__(self, key: str, schema=None) -> tuple:
+        """
+        Looks a key up in the in-memory tier only. Never touches the database.
+
+        Returns:
+            tuple: (True, cached result) on a hit, (False, None) on a miss.
+        """
+        result = self.memory_cache.get(key)
+        if result is not None:
+            try:
+                value = self.__decode__(result[0], result[1], schema)
+                self.__count__("memory_hits")
+                return True, value
+            except ValueError:
+                self.memory_cache.pop(key)
+
+        return False, None
+
+    def __lookup_disk__(self, key: str, schema=None) -> tuple:
+        """
+        Looks a key up in the SQLite store and promotes hits to the in-memory tier.
+
+        Returns:
+            tuple: (True, cached result) on a hit, (False, None) on a miss.
+        """
+        # Create cache table of not exists
+        self.create_cache_table()
+
+        result = self.__get_disk__(key)
+        if result is not None:
+            try:
+                value = self.__decode__(result[3], result[0], schema)
+                # Promote the cached result to the in-memory tier
+                self.__count__("disk_hits")
+                self.memory_cache.put(key, (result[3], result[0]), len(result[0]), result[1])
+                return True, value
+            except ValueError:
+                pass
+
+        return False, None
+
+    def __lookup__(self, key: str, schema=None) -> tuple:
+        """
+        Looks a key up in the in-memory tier, then in the SQLite store.
+
+        Args:
+            key (str): Cache key.
+            schema (type or tuple, optional): Declared type(s) of the result.
+
+        Returns:
+            tuple: (True, cached result) on a hit, (False, None) on a miss.
+        """
+        found, value = self.__lookup_memory__(key, schema)
+        if found:
+            return found, value
+
+        return self.__lookup_disk__(key, schema)
+
+    def __store__(self, key: str, func_name: str, result, serializer: str, schema, ttl: float):
+        """
+        Serializes a result and writes it to both cache tiers. Results that can not be serialized are not cached.
+        """
+        try:
+            stored_serializer, value = self.__encode__(result, serializer, schema)
+        except (TypeError, ValueError, ImportError) as e:
+            logging.warning(f"'{func_name}'|{time.time()}|CacheSkip|{str(e)}|")
+            return
+
+        expires_at = time.time() + ttl if ttl is not None else None
+
+        self.__put_disk__(key, func_name, stored_serializer, value, expires_at)
+        self.memory_cache.put(key, (stored_serializer, value), len(value), expires_at)
+
+        # The store already touches the database, piggyback the pending per-function counters
+        self.flush_stats()
+
+    def __acquire_lease__(self, key: str, owner: str) -> bool:
+        """
+        Tries to take the cross-process lease of a key. Expired leases (crashed owners) are taken over.
+
+        Returns:
+            bool: True if the lease is now held by owner.
+        """
+        now = time.time()
+        tableName = self.lease_schema["tableName"]
+
+        with self.DBObj.connection:
+            cursor = self.DBObj.cursor
+            cursor.execute(f'''
+                INSERT INTO {tableName} (key, owner, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                WHERE {tableName}.expires_at <= ?
+            ''', (key, owner, now + self.lease_timeout, now))
+            holder = cursor.execute(f"SELECT owner FROM {tableName} WHERE key = ?", (key,)).fetchone()
+
+        return holder is not None and holder[0] == owner
+
+    def __lease_active__(self, key: str) -> bool:
+        """
+        Returns True if another process currently holds an unexpired lease on a key.
+        """
+        lease = self.DBObj.get_data(self.lease_schema["tableName"], {"key": key}, ["expires_at"], casefold=False)
+        return lease is not None and lease[0] > time.time()
+
+    def __release_lease__(self, key: str, owner: str):
+        """
+        Releases the cross-process lease of a key if it is still held by owner.
+        """
+        self.DBObj.delete_data(self.lease_schema["tableName"], {"key": key, "owner": owner})
+
+    def __leased_compute__(self, key: str, schema, compute):
+        """
+        Computes a missing key under a cross-process lease.
+
+        The first process to take the lease computes the result. Others poll the SQLite store until the
+        result appears, or take the lease over if it is released or expires without a result.
+        """
+        owner = f"{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex}"
+
+        while True:
+            if self.__acquire_lease__(key, owner):
+                try:
+                    # The previous lease holder may have stored the result just before releasing
+                    found, value = self.__lookup__(key, schema)
+                    if found:
+                        self.__count__("coalesced_processes")
+                        return value
+
+                    return compute()
+                finally:
+                    self.__release_lease__(key, owner)
+
+            while self.__lease_active__(key):
+                time.sleep(self.lease_poll_interval)
+
+                found, value = self.__lookup__(key, schema)
+                if found:
+                    self.__count__("coalesced_processes")
+                    return value
+
+    def __single_flight__(self, key: str, schema, compute):
+        """
+        Runs compute once for concurrent callers of the same key.
+
+        Threads of this process wait on the first caller (the leader). The leader runs the computation
+        under a cross-process lease (see __leased_compute__), so other processes wait as well.
+        """
+        with self._inflight_lock:
+            flight = self._inflight.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = self._inflight[key] = {"event": threading.Event(), "result": None, "error": None}
+
+        if not is_leader:
+            flight["event"].wait()
+            self.__count__("coalesced_threads")
+
+            if flight["error"] is not None:
+                raise flight["error"]
+
+            # Prefer a decoded copy so callers do not share one mutable result
+            found, value = self.__lookup__(key, schema)
+            return value if found else flight["result"]
+
+        try:
+            flight["result"] = self.__leased_compute__(key, schema, compute)
+            return flight["result"]
+        except BaseException as e:
+            flight["error"] = e
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            flight["event"].set()
+
+    async def __async_leased_compute__(self, key: str, schema, compute):
+        """
+        Coroutine counterpart of __leased_compute__. Database access runs in worker threads.
+        """
+        owner = f"{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex}"
+
+        while True:
+            if await asyncio.to_thread(self.__acquire_lease__, key, owner):
+                try:
+                    found, value = await asyncio.to_thread(self.__lookup__, key, schema)
+                    if found:
+                        self.__count__("coalesced_processes")
+                        return value
+
+                    return await compute()
+                finally:
+                    await asyncio.to_thread(self.__release_lease__, key, owner)
 
-    def memoize(self, func):
+            while await asyncio.to_thread(self.__lease_active__, key):
+                await asyncio.sleep(self.lease_poll_interval)
+
+                found, value = await asyncio.to_thread(self.__lookup__, key, schema)
+                if found:
+                    self.__count__("coalesced_processes")
+                    return value
+
+    async def __async_single_flight__(self, key: str, schema, compute):
+        """
+        Coroutine counterpart of __single_flight__.
+
+        Tasks of the same event loop await the leader's future. The leader computes under the
+        cross-process lease, which also coalesces callers running on other threads or loops.
+        """
+        flight_key = (id(asyncio.get_running_loop()), key)
+
+        flight = self._inflight.get(flight_key)
+        if flight is not None:
+            self.__count__("coalesced_threads")
+            await asyncio.shield(flight)
+
+            found, value = self.__lookup_memory__(key, schema)
+            return value if found else flight.result()
+
+        flight = self._inflight[flight_key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await self.__async_leased_compute__(key, schema, compute)
+            flight.set_result(result)
+            return result
+        except BaseException as e:
+            flight.set_exception(e)
+            # Mark the exception as retrieved when no other task awaits it
+            flight.exception()
+            raise
+        finally:
+            self._inflight.pop(flight_key, None)
+
+    def __async_wrapper__(self, func, func_name: str, signature, ttl: float, serializer: str, schema, single_flight: bool):
+        """
+        Builds the memoization wrapper of a coroutine function.
+
+        The in-memory tier is checked inline. SQLite reads and writes run in worker threads through
+        asyncio.to_thread, so the event loop is never blocked on disk I/O.
+        """
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            # Create a unique key based on function name and canonical arguments
+            try:
+                key = self.__make_key__(func_name, signature, args, kwargs)
+            except TypeError:
+                # Arguments do not match the signature (let the function raise) or can not be keyed faithfully
+                return await func(*args, **kwargs)
+
+            # Check both cache tiers, the in-memory tier without leaving the event loop
+            found, value = self.__lookup_memory__(key, schema)
+            if found:
+                self.__count_func__(func_name, "hits")
+                return value
+
+            found, value = await asyncio.to_thread(self.__lookup_disk__, key, schema)
+            if found:
+                self.__count_func__(func_name, "hits")
+                return value
+
+            self.__count__("misses")
+            self.__count_func__(func_name, "misses")
+
+            async def compute():
+                # Await the original coroutine and insert the result into both cache tiers
+                result = await func(*args, **kwargs)
+                await asyncio.to_thread(self.__store__, key, func_name, result, serializer, schema, ttl)
+                return result
+
+            if single_flight:
+                return await self.__async_single_flight__(key, schema, compute)
+
+            return await compute()
+
+        return wrapper
+
+    def memoize(self, func=None, *, ttl: float = None, serializer: str = None, schema=None, single_flight: bool = False):
         """
         Memoization decorator function.
 
+        Can be used as @memoizer.memoize or @memoizer.memoize(ttl=3600, serializer="json").
+        Coroutine functions (async def) are detected and get a wrapper that returns an awaitable and
+        keeps cache I/O off the event loop.
+
         Args:
             func (function): The function to be memoized.
+            ttl (float, optional): Time to live in seconds of the cached results. Defaults to default_ttl.
+            serializer (str, optional): 'auto', 'json', 'msgpack' or 'pickle'. Defaults to default_serializer.
+                'pickle' requires a schema.
+            schema (type or tuple, optional): Declared type(s) of the results. Results of another type are
+                not cached and stored entries of another type are treated as misses.
+            single_flight (bool): Coalesce concurrent misses on the same key, across threads and processes,
+                into a single call of the function. Meant for expensive (LLM backed) functions.
 
         Returns:
             function: The wrapper function for memoization.
+
+        Raises:
+            ValueError: If serializer is 'pickle' and no schema is declared.
         """
+        if func is None:
+            return functools.partial(self.memoize, ttl=ttl, serializer=serializer, schema=schema, single_flight=single_flight)
+
+        ttl = self.default_ttl if ttl is None else ttl
+        serializer = self.default_serializer if serializer is None else serializer
+        if serializer == "pickle" and schema is None:
+            raise ValueError("serializer='pickle' requires a declared schema : memoize(serializer='pickle', schema=...)")
 
+        func_name = f"{func.__module__}.{func.__qualname__}"
+        signature = inspect.signature(func)
+
+        if inspect.iscoroutinefunction(func):
+            return self.__async_wrapper__(func, func_name, signature, ttl, serializer, schema, single_flight)
+
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            # Create cache table of not exists
-            self.create_cache_table()
-            # Get module and file path of the function
-            module = inspect.getmodule(func)
-            file_path = module.__file__ if module else ''
-            # Create a unique key based on file path, function name, arguments, and keyword arguments
-            key = (file_path, func.__qualname__, args[1:], str(kwargs))
-            key = str(key).encode('utf-8')
-
-            hasher = hashlib.sha256()
-            hasher.update(key)
-            key = hasher.hexdigest()
-
-            # Check if the key exists in the cache table
-            result = self.DBObj.get_data(self.table_schema["tableName"], {"key": str(key)}, ["value"])
-
-            if result is not None:
-                # Return the cached result if found
-                try:
-                    return eval(result[0])
-                except:
-                    return result[0]
-            else:
-                # Call the original function if the result is not in the cache
+            # Create a unique key based on function name and canonical arguments
+            try:
+                key = self.__make_key__(func_name, signature, args, kwargs)
+            except TypeError:
+                # Arguments do not match the signature (let the function raise) or can not be keyed faithfully
+                return func(*args, **kwargs)
+
+            # Check both cache tiers
+            found, value = self.__lookup__(key, schema)
+            if found:
+                self.__count_func__(func_name, "hits")
+                return value
+
+            self.__count__("misses")
+            self.__count_func__(func_name, "misses")
+
+            def compute():
+                # Call the original function and insert the result into both cache tiers
                 result = func(*args, **kwargs)
-                # Insert the result into the cache table
+                self.__store__(key, func_name, result, serializer, schema, ttl)
+                return result
 
-                vals_list = [
-                    {
-                        "key": str(key),
-                        "value": str(result)
-                    }
-                ]
-                self.DBObj.post_data(self.table_schema["tableName"], vals_list)
+            if single_flight:
+                return self.__single_flight__(key, schema, compute)
 
-                return result
+            return compute()
 
         return wrapper
 
@@ -321,6 +1896,6 @@ class cachefunc:
         """
         Closes the database connection.
         """
-        self.connection.close()
+        self.DBObj.close()
 
 # --------------------------------------------------------------------
\ No newline at end of file
@@ -0,0 +1,331 @@
+"""
+Module: manageCache.py
+
+Description:
+    This module defines the cacheMaintenance class and a command line interface to inspect and maintain
+    the memoize store (DBinst/cache/memoize.db) shared by every function decorated with cachefunc.memoize.
+
+Classes:
+    - cacheMaintenance: Class to report on, prune, compact, export and import the memoize store.
+
+Methods:
+    - __init__(self, cacheObj=None): Initializes an instance of cacheMaintenance class.
+    - stats(self, func_name=None) -> list[dict]: Entry count, bytes, hits and hit ratio per memoized function.
+    - prune(self, func_name=None, older_than=None, max_bytes=None, expired=True) -> int: Deletes entries.
+    - compact(self) -> dict: Checkpoints the WAL and VACUUMs the database.
+    - export_cache(self, file_path, func_name=None) -> int: Copies live entries into a standalone SQLite file.
+    - import_cache(self, file_path, overwrite=False, allow_pickle=False) -> int: Loads entries exported by export_cache.
+      Pickled entries are skipped unless allow_pickle is set, as loading them trusts the exporting node.
+
+Usage Example:
+    python -m Code.Utilities.cacheSupport.manageCache stats
+    python -m Code.Utilities.cacheSupport.manageCache prune --function Code.Utilities.SQLSupportBuilder.buildNew.lm_based.SQLCodeParse.CodeParse.__invoke_LM__
+    python -m Code.Utilities.cacheSupport.manageCache prune --older-than-days 30 --max-mb 512
+    python -m Code.Utilities.cacheSupport.manageCache compact
+    python -m Code.Utilities.cacheSupport.manageCache export warm_cache.db
+    python -m Code.Utilities.cacheSupport.manageCache import warm_cache.db
+    python -m Code.Utilities.cacheSupport.manageCache import trusted_node_cache.db --allow-pickle
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+from Code.Utilities.base_utils import cachefunc
+
+
+class cacheMaintenance:
+    """
+    Class to inspect and maintain the memoize store.
+
+    Attributes:
+        cacheObj (cachefunc): The cache whose SQLite store is maintained.
+        tableName (str): Name of the cache table.
+        statsTableName (str): Name of the per-function hit / miss table.
+    """
+    def __init__(self, cacheObj: cachefunc = None):
+        """
+        Initializes an instance of cacheMaintenance class.
+
+        Args:
+            cacheObj (cachefunc, optional): Cache to maintain. Defaults to a new cachefunc on the default store.
+        """
+        self.cacheObj = cacheObj if cacheObj is not None else cachefunc()
+        self.cacheObj.create_cache_table()
+        self.cacheObj.flush_stats()
+
+        self.DBObj = self.cacheObj.DBObj
+        self.tableName = self.cacheObj.table_schema["tableName"]
+        self.statsTableName = self.cacheObj.stats_schema["tableName"]
+
+    def stats(self, func_name: str = None) -> list[dict]:
+        """
+        Reports the content of the store per memoized function.
+
+        Args:
+            func_name (str, optional): Only report this function.
+
+        Returns:
+            list: One dictionary per function with entries, bytes, stored hits, lookups (hits / misses
+                recorded by the decorators), hit_ratio, oldest / newest entry and last access (epoch seconds).
+        """
+        statsQuery = f'''
+            SELECT c.func_name,
+                   COUNT(*),
+                   COALESCE(SUM(c.size), 0),
+                   COALESCE(SUM(c.hits), 0),
+                   MIN(c.created_at),
+                   MAX(c.created_at),
+                   MAX(c.last_access),
+                   s.hits,
+                   s.misses
+            FROM {self.tableName} c
+            LEFT JOIN {self.statsTableName} s ON s.func_name = c.func_name
+            {"WHERE c.func_name = ?" if func_name else ""}
+            GROUP BY c.func_name
+            ORDER BY COALESCE(SUM(c.size), 0) DESC
+        '''
+        rows = self.DBObj.cursor.execute(statsQuery, (func_name,) if func_name else ()).fetchall()
+
+        report = []
+        for row in rows:
+            lookup_hits, lookup_misses = row[7] or 0, row[8] or 0
+            lookups = lookup_hits + lookup_misses
+
+            report.append({
+                "func_name": row[0],
+                "entries": row[1],
+                "bytes": row[2],
+                "stored_hits": row[3],
+                "oldest": row[4],
+                "newest": row[5],
+                "last_access": row[6],
+                "hits": lookup_hits,
+                "misses": lookup_misses,
+                "hit_ratio": lookup_hits / lookups if lookups else None
+            })
+
+        return report
+
+    def prune(self, func_name: str = None, older_than: float = None, max_bytes: int = None, expired: bool = True) -> int:
+        """
+        Deletes entries from the store.
+
+        Args:
+            func_name (str, optional): Delete the entries of this function (combined with older_than if given).
+            older_than (float, optional): Delete entries created more than this many seconds ago.
+            max_bytes (int, optional): Then shrink the store to this size using the cache eviction policy.
+            expired (bool): Delete entries whose TTL has passed.
+
+        Returns:
+            int: Number of deleted entries.
+        """
+        count_before = self.DBObj.get_data(self.tableName, {}, ["COUNT(*)"])[0]
+
+        conditions = []
+        params = []
+        if func_name is not None:
+            conditions.append("func_name = ?")
+            params.append(func_name)
+        if older_than is not None:
+            conditions.append("created_at < ?")
+            params.append(time.time() - older_than)
+
+        with self.DBObj.connection:
+            if conditions:
+                self.DBObj.cursor.execute(f"DELETE FROM {self.tableName} WHERE {' AND '.join(conditions)}", params)
+            if expired:
+                self.DBObj.cursor.execute(f"DELETE FROM {self.tableName} WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+
+        if max_bytes is not None:
+            self.cacheObj.evict_disk(target_bytes=max_bytes)
+
+        # Pruned entries may still sit in the in-memory tier of this process
+        self.cacheObj.clear_memory()
+        self.cacheObj.refresh_disk_usage()
+
+        return count_before - self.DBObj.get_data(self.tableName, {}, ["COUNT(*)"])[0]
+
+    def compact(self) -> dict:
+        """
+        Compacts the store online: checkpoints the WAL into the database file and VACUUMs it.
+
+        Readers in other processes keep working. VACUUM waits (busy timeout) for concurrent writers.
+
+        Returns:
+            dict: Database file size (bytes) before and after compaction.
+        """
+        size_before = self.__db_size__()
+
+        connection = self.DBObj.connection
+        connection.commit()
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        connection.execute("VACUUM")
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        return {"bytes_before": size_before, "bytes_after": self.__db_size__()}
+
+    def __db_size__(self) -> int:
+        """
+        Returns the size of the database file and its WAL.
+        """
+        return sum(os.path.getsize(path) for path in (self.DBObj.db_path, self.DBObj.db_path + "-wal") if os.path.exists(path))
+
+    def __columns__(self, schema: str = "main") -> list:
+        """
+        Returns the column names of the cache table in an attached schema.
+        """
+        return [row[1] for row in self.DBObj.cursor.execute(f"PRAGMA {schema}.table_info({self.tableName})").fetchall()]
+
+    def export_cache(self, file_path: str, func_name: str = None) -> int:
+        """
+        Copies live (unexpired) entries into a standalone SQLite file, e.g. to prime the store of a new node.
+
+        Args:
+            file_path (str): Path of the exported database. Must not exist.
+            func_name (str, optional): Only export the entries of this function.
+
+        Returns:
+            int: Number of exported entries.
+        """
+        if os.path.exists(file_path):
+            raise ValueError(f"Export file already exists : {file_path}")
+
+        # Create the export database with the same cache table
+        exportConnection = sqlite3.connect(file_path)
+        collist = [col + " " + " ".join(md) for col, md in self.cacheObj.table_schema['columns'].items()]
+        exportConnection.execute(f"CREATE TABLE {self.tableName} ({', '.join(collist)})")
+        exportConnection.commit()
+        exportConnection.close()
+
+        conditions = ["(expires_at IS NULL OR expires_at > ?)"]
+        params = [time.time()]
+        if func_name is not None:
+            conditions.append("func_name = ?")
+            params.append(func_name)
+
+        connection = self.DBObj.connection
+        connection.commit()
+        connection.execute("ATTACH DATABASE ? AS export_db", (file_path,))
+        try:
+            columns = ", ".join(self.__columns__("export_db"))
+            with connection:
+                exported = connection.execute(f'''
+                    INSERT INTO export_db.{self.tableName} ({columns})
+                    SELECT {columns} FROM main.{self.tableName} WHERE {" AND ".join(conditions)}
+                ''', params).rowcount
+        finally:
+            connection.execute("DETACH DATABASE export_db")
+
+        return exported
+
+    def import_cache(self, file_path: str, overwrite: bool = False, allow_pickle: bool = False) -> int:
+        """
+        Loads entries from a file created by export_cache.
+
+        Args:
+            file_path (str): Path of the exported database.
+            overwrite (bool): Replace entries whose key already exists. Existing entries are kept otherwise.
+            allow_pickle (bool): Also import pickled entries. Only for files from a trusted node: they are
+                unpickled (restricted to the declared schema classes) when read.
+
+        Returns:
+            int: Number of imported entries.
+        """
+        if not os.path.exists(file_path):
+            raise ValueError(f"Import file not found : {file_path}")
+
+        connection = self.DBObj.connection
+        connection.commit()
+        connection.execute("ATTACH DATABASE ? AS import_db", (file_path,))
+        try:
+            # Only copy the columns both stores know about
+            import_columns = self.__columns__("import_db")
+            columns = ", ".join(col for col in import_columns if col in set(self.__columns__("main")))
+
+            condition = ""
+            if "serializer" in import_columns and not allow_pickle:
+                condition = "WHERE serializer IS NOT 'pickle'"
+                skipped = connection.execute(f"SELECT COUNT(*) FROM import_db.{self.tableName} "
+                                             f"WHERE serializer = 'pickle'").fetchone()[0]
+                if skipped:
+                    print(f"Skipped {skipped} pickled entries, pass allow_pickle (--allow-pickle) for a trusted file")
+
+            with connection:
+                imported = connection.execute(f'''
+                    INSERT OR {"REPLACE" if overwrite else "IGNORE"} INTO main.{self.tableName} ({columns})
+                    SELECT {columns} FROM import_db.{self.tableName} {condition}
+                ''').rowcount
+        finally:
+            connection.execute("DETACH DATABASE import_db")
+
+        self.cacheObj.clear_memory()
+        self.cacheObj.refresh_disk_usage()
+
+        return imported
+
+
+def main():
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description="Inspect and maintain the memoize cache store.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    stats_parser = subparsers.add_parser("stats", help="Entries, bytes and hit ratio per memoized function.")
+    stats_parser.add_argument("--function", default=None, help="Only report this function.")
+    stats_parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+
+    prune_parser = subparsers.add_parser("prune", help="Delete entries by function, age or total size.")
+    prune_parser.add_argument("--function", default=None, help="Delete the entries of this function.")
+    prune_parser.add_argument("--older-than-days", type=float, default=None, help="Delete entries older than this.")
+    prune_parser.add_argument("--max-mb", type=float, default=None, help="Shrink the store to this size.")
+    prune_parser.add_argument("--keep-expired", action="store_true", help="Do not delete expired entries.")
+
+    subparsers.add_parser("compact", help="Checkpoint the WAL and VACUUM the store.")
+
+    export_parser = subparsers.add_parser("export", help="Export live entries to a standalone SQLite file.")
+    export_parser.add_argument("file_path")
+    export_parser.add_argument("--function", default=None, help="Only export this function.")
+
+    import_parser = subparsers.add_parser("import", help="Import entries from an exported SQLite file.")
+    import_parser.add_argument("file_path")
+    import_parser.add_argument("--overwrite", action="store_true", help="Replace entries that already exist.")
+    import_parser.add_argument("--allow-pickle", action="store_true",
+                               help="Also import pickled entries. Only for files from a trusted node.")
+
+    args = parser.parse_args()
+    maintenanceObj = cacheMaintenance()
+
+    if args.command == "stats":
+        report = maintenanceObj.stats(args.function)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print(f"{'function':<90} {'entries':>8} {'MB':>9} {'hits':>8} {'misses':>8} {'hit ratio':>9}")
+            for row in report:
+                hit_ratio = f"{row['hit_ratio']:.2%}" if row['hit_ratio'] is not None else "-"
+                print(f"{str(row['func_name']):<90} {row['entries']:>8} {row['bytes'] / 1024 ** 2:>9.2f} {row['hits']:>8} {row['misses']:>8} {hit_ratio:>9}")
+
+    elif args.command == "prune":
+        deleted = maintenanceObj.prune(func_name=args.function,
+                                       older_than=args.older_than_days * 86400 if args.older_than_days is not None else None,
+                                       max_bytes=int(args.max_mb * 1024 ** 2) if args.max_mb is not None else None,
+                                       expired=not args.keep_expired)
+        print(f"Deleted entries : {deleted}")
+
+    elif args.command == "compact":
+        sizes = maintenanceObj.compact()
+        print(f"Store size : {sizes['bytes_before'] / 1024 ** 2:.2f} MB -> {sizes['bytes_after'] / 1024 ** 2:.2f} MB")
+
+    elif args.command == "export":
+        print(f"Exported entries : {maintenanceObj.export_cache(args.file_path, args.function)}")
+
+    elif args.command == "import":
+        print(f"Imported entries : {maintenanceObj.import_cache(args.file_path, args.overwrite, args.allow_pickle)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Module: semanticCache.py
+
+Description:
+    This module defines the semanticCache class, a cache of answers keyed by the meaning of a question rather
+    than its exact bytes. Questions are normalized (case, whitespace, trailing punctuation) and embedded with
+    the retrieval SentenceTransformer model; a stored answer is served when the cosine similarity of the new
+    question to a stored one reaches the threshold and both were answered against the same schema version.
+
+    Entries live in SQLite (DBinst/cache/semanticCache.db) and are searched through an in-memory matrix of
+    unit embeddings per namespace, so a lookup is one encode plus one matrix-vector product.
+
+    Eviction: entries of an outdated schema version (schemaVersion.get_schema_version, bumped only when the schema
+    context is written) are dropped when an answer for the current version is stored, and each namespace keeps at
+    most max_entries entries, evicting the least recently used.
+
+Classes:
+    - semanticCache: Similarity-based answer cache.
+
+Configuration (retrieval_config.semantic_cache, optional):
+    - threshold: Minimum cosine similarity of a hit. Defaults to 0.92.
+    - max_entries: Maximum entries per namespace. Defaults to 5000.
+
+Usage Example:
+    >> cache = semanticCache("generateQuery")
+    >> answer = cache.lookup(question, schema_version)
+    >> if answer is None:
+    >>     answer = build_answer(question)
+    >>     cache.store(question, answer, schema_version)
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+
+from Code.Utilities.base_utils import accessDB, get_config_val, metrics_registry
+
+
+default_threshold = 0.92
+default_max_entries = 5000
+
+
+class semanticCache:
+    """
+    Similarity-based answer cache.
+
+    Attributes:
+        namespace (str): Name separating the entries of different callers (e.g. "generateQuery").
+        threshold (float): Minimum cosine similarity of a hit.
+        max_entries (int): Maximum entries kept for the namespace.
+    """
+    def __init__(self, namespace: str = "default", threshold: float = None, max_entries: int = None, embedder=None):
+        """
+        Initializes an instance of semanticCache class.
+
+        Args:
+            namespace (str, optional): Name separating the entries of different callers. Defaults to "default".
+            threshold (float, optional): Minimum cosine similarity of a hit. Defaults to the config or 0.92.
+            max_entries (int, optional): Maximum entries of the namespace. Defaults to the config or 5000.
+            embedder (callable, optional): Function mapping a text to its embedding. Defaults to the retrieval
+                                           SentenceTransformer model (RAGPipeline.get_model).
+        """
+        try:
+            cache_configs = get_config_val("retrieval_config", ["semantic_cache"], True)
+        except KeyError:
+            cache_configs = {}
+
+        self.namespace = namespace
+        self.threshold = threshold if threshold is not None else cache_configs.get("threshold", default_threshold)
+        self.max_entries = max_entries if max_entries is not None else cache_configs.get("max_entries", default_max_entries)
+        self.embedder = embedder
+
+        self.info_type = "cache"
+        self.dbName = "semanticCache"
+        self.DBObj = accessDB(self.info_type, self.dbName)
+        self.table_schema = {
+            'tableName' : 'semantic_cache',
+            'columns' : {
+                'key': ['TEXT', 'PRIMARY KEY'],
+                'namespace': ['TEXT', ''],
+                'question': ['TEXT', ''],
+                'embedding': ['BLOB', ''],
+                'answer': ['TEXT', ''],
+                'schema_version': ['TEXT', ''],
+                'created_at': ['REAL', ''],
+                'last_access': ['REAL', ''],
+                'hits': ['INTEGER', 'DEFAULT 0']
+            },
+            'indexes' : {
+                'idx_semantic_cache_namespace': ['namespace', 'schema_version'],
+                'idx_semantic_cache_last_access': ['last_access']
+            }
+        }
+        self.DBObj.create_table(self.table_schema)
+
+        # In-memory index of the current schema version, {'version': str, 'keys': list, 'matrix': ndarray}
+        self._index = None
+        self._lock = threading.RLock()
+        self._stats = {"hits": 0, "exact_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    # ------------------------------------------------------------------------------------------
+    # Embedding
+    # ------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """
+        Normalizes a question: lower case, single spaces, no trailing punctuation.
+        """
+        return re.sub(r"\s+", " ", str(text)).strip().lower().rstrip("?.!; ")
+
+    def __embed__(self, text: str):
+        """
+        Returns the unit-length float32 embedding of a normalized text.
+        """
+        import numpy as np
+
+        if self.embedder is None:
+            from Code.Utilities.Retrieval_Pipeline import RAGPipeline
+
+            models_repo = get_config_val("retrieval_config", ["models_repo"], True)
+            indexing_configs = get_config_val("retrieval_config", ["indexing"], True)
+            self.embedder = RAGPipeline.get_model("embedding", models_repo['path'] + "/" + indexing_configs["model"]).encode
+
+        embedding = np.asarray(self.embedder(text), dtype=np.float32).ravel()
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def __make_key__(self, normalized: str, schema_version: str) -> str:
+        return hashlib.sha256(json.dumps([self.namespace, schema_version, normalized]).encode()).hexdigest()
+
+    # ------------------------------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------------------------------
+
+    def __load_index__(self, schema_version: str):
+        """
+        Loads the embeddings of the namespace and schema version into the in-memory matrix.
+        """
+        import numpy as np
+
+        if self._index is not None and self._index["version"] == schema_version:
+            return self._index
+
+        self.DBObj.cursor.execute(f"SELECT key, embedding FROM {self.table_schema['tableName']} "
+                                  f"WHERE namespace = ? AND schema_version = ?", (self.namespace, schema_version))
+        rows = self.DBObj.cursor.fetchall()
+
+        self._index = {
+            "version": schema_version,
+            "keys": [row[0] for row in rows],
+            "matrix": np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows]) if rows else None
+        }
+        return self._index
+
+    def __drop_from_index__(self, keys: set):
+        import numpy as np
+
+        if self._index is None or not keys:
+            return
+
+        keep = [ind for ind, key in enumerate(self._index["keys"]) if key not in keys]
+        self._index["keys"] = [self._index["keys"][ind] for ind in keep]
+        self._index["matrix"] = self._index["matrix"][np.array(keep, dtype=int)] if keep else None
+
+    # ------------------------------------------------------------------------------------------
+    # Lookup / store
+    # ------------------------------------------------------------------------------------------
+
+    def lookup(self, question: str, schema_version: str = ""):
+        """
+        Returns the stored answer of the most similar question, if similar enough.
+
+        Args:
+            question (str): The question.
+            schema_version (str, optional): Version of the schema context the answer must have been built on.
+
+        Returns:
+            str: The stored answer, or None on a miss.
+        """
+        normalized = self.normalize(question)
+        key = self.__make_key__(normalized, schema_version)
+
+        with self._lock:
+            index = self.__load_index__(schema_version)
+
+            if key in index["keys"]:
+                self.__count__("exact_hits")
+                hit_key = key
+            elif index["matrix"] is not None:
+                similarities = index["matrix"] @ self.__embed__(normalized)
+                best = int(similarities.argmax())
+                hit_key = index["keys"][best] if similarities[best] >= self.threshold else None
+            else:
+                hit_key = None
+
+            if hit_key is None:
+                self.__count__("misses")
+                return None
+
+            self.__count__("hits")
+            with self.DBObj.connection:
+                self.DBObj.cursor.execute(f"UPDATE {self.table_schema['tableName']} SET hits = hits + 1, last_access = ? "
+                                          f"WHERE key = ?", (time.time(), hit_key))
+                self.DBObj.cursor.execute(f"SELECT answer FROM {self.table_schema['tableName']} WHERE key = ?", (hit_key,))
+                row = self.DBObj.cursor.fetchone()
+
+        return json.loads(row[0]) if row else None
+
+    def store(self, question: str, answer, schema_version: str = ""):
+        """
+        Stores the answer of a question, then applies the eviction policy of the namespace.
+
+        Args:
+            question (str): The question.
+            answer: JSON serializable answer.
+            schema_version (str, optional): Version of the schema context the answer was built on.
+        """
+        normalized = self.normalize(question)
+        key = self.__make_key__(normalized, schema_version)
+        embedding = self.__embed__(normalized)
+        now = time.time()
+
+        with self._lock:
+            index = self.__load_index__(schema_version)
+
+            self.DBObj.post_data(self.table_schema["tableName"],
+                                 [{"key": key,
+                                   "namespace": self.namespace,
+                                   "question": normalized,
+                                   "embedding": embedding.tobytes(),
+                                   "answer": json.dumps(answer),
+                                   "schema_version": schema_version,
+                                   "created_at": now,
+                                   "last_access": now,
+                                   "hits": 0}],
+                                 upsert_keys=["key"])
+
+            if key not in index["keys"]:
+                import numpy as np
+
+                index["keys"].append(key)
+                index["matrix"] = embedding[None, :] if index["matrix"] is None else np.vstack([index["matrix"], embedding])
+
+            self.__count__("stores")
+            self.__evict__(schema_version)
+
+    def __evict__(self, schema_version: str):
+        """
+        Drops entries of other schema versions and the least recently used entries above max_entries.
+        """
+        tableName = self.table_schema["tableName"]
+
+        with self.DBObj.connection:
+            self.DBObj.cursor.execute(f"DELETE FROM {tableName} WHERE namespace = ? AND schema_version != ?",
+                                      (self.namespace, schema_version))
+            evicted = self.DBObj.cursor.rowcount
+
+            self.DBObj.cursor.execute(f"SELECT key FROM {tableName} WHERE namespace = ? "
+                                      f"ORDER BY last_access DESC LIMIT -1 OFFSET ?", (self.namespace, self.max_entries))
+            lru_keys = {row[0] for row in self.DBObj.cursor.fetchall()}
+            self.DBObj.cursor.executemany(f"DELETE FROM {tableName} WHERE key = ?", [(key,) for key in lru_keys])
+
+        self.__drop_from_index__(lru_keys)
+        self.__count__("evictions", max(evicted, 0) + len(lru_keys))
+
+    def clear(self):
+        """
+        Deletes every entry of the namespace.
+        """
+        with self._lock, self.DBObj.connection:
+            self.DBObj.cursor.execute(f"DELETE FROM {self.table_schema['tableName']} WHERE namespace = ?", (self.namespace,))
+            self._index = None
+
+    # ------------------------------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------------------------------
+
+    def __count__(self, stat_name: str, increment: int = 1):
+        if not increment:
+            return
+
+        self._stats[stat_name] += increment
+        metrics_registry.increment(f"semantic_cache.{self.namespace}.{stat_name}", increment)
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of this process and the current size of the namespace.
+
+        Returns:
+            dict: hits (including exact_hits), exact_hits, misses, hit_rate, stores, evictions and entries.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = self.DBObj.get_data(self.table_schema["tableName"], {"namespace": self.namespace}, ["count(*)"],
+                                                  casefold=False)[0]
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
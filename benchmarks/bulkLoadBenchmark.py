@@ -0,0 +1,152 @@
+"""
+Module: bulkLoadBenchmark.py
+
+Description:
+    Benchmarks loading data dictionaries into the table metadata store row-by-row (the previous
+    accessDB.post_data behaviour: delete, one INSERT per record and a commit per table) against the
+    bulk path (accessDB.post_data with upsert_keys and accessDB.replace_data).
+
+    The NorthWinds DD JSON files are replicated synthetically with suffixed table names to reach
+    the requested number of tables. Each load is run twice to also measure a re-import.
+
+Usage Example:
+    python -m benchmarks.bulkLoadBenchmark --scale 200
+"""
+
+import argparse
+import copy
+import json
+import os
+import tempfile
+import time
+
+from Code.Utilities import base_utils
+
+
+sample_dd_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sampleFiles", "NorthWinds", "DD")
+
+tableDescSchema = {
+    'tableName' : 'tableDesc',
+    'columns' : {
+        'tableName': ['TEXT', 'PRIMARY KEY'],
+        'Desc': ['TEXT', '']
+    },
+    'indexes' : {
+        'idx_tableDesc_tableName': ['lower(tableName)']
+    }
+}
+
+tableColSchema = {
+    'tableName' : 'tableColMetadata',
+    'columns' : {
+        'TableName': ['TEXT', ''],
+        'ColumnName': ['TEXT', ''],
+        'DataType': ['TEXT', ''],
+        'Constraints': ['TEXT', ''],
+        'logic': ['TEXT', ''],
+        'type_of_logic': ['TEXT', ''],
+        'base_table': ['TEXT', ''],
+        'Desc': ['TEXT', '']
+    },
+    'indexes' : {
+        'idx_tableColMetadata_TableName': ['lower(TableName)', 'lower(ColumnName)']
+    }
+}
+
+
+def load_scaled_dd(scale: int) -> list:
+    """
+    Loads the NorthWinds DD files and replicates them `scale` times with suffixed table names.
+
+    Args:
+        scale (int): Number of copies of the NorthWinds data dictionary.
+
+    Returns:
+        list: List of DD dictionaries (tableName, tableDesc, records).
+    """
+    base_dd = []
+    for files in sorted(os.listdir(sample_dd_path)):
+        with open(os.path.join(sample_dd_path, files), "r") as tableJsonFObj:
+            base_dd.append(json.load(tableJsonFObj))
+
+    scaled_dd = []
+    for copy_ind in range(scale):
+        for table_dd in base_dd:
+            table_dd = copy.deepcopy(table_dd)
+            table_dd['tableName'] = f"{table_dd['tableName']}_{copy_ind}"
+            for records in table_dd['records']:
+                records['TableName'] = table_dd['tableName']
+            scaled_dd.append(table_dd)
+
+    return scaled_dd
+
+
+def load_row_by_row(DBObj: base_utils.accessDB, scaled_dd: list):
+    """
+    Loads the DD the way the metadata store used to: delete, then one INSERT per record and a commit per call.
+    """
+    for table_dd in scaled_dd:
+        for tableName, lookupDict, insertlist in (
+                ('tableDesc', {'tableName': table_dd['tableName']}, [{"tableName": table_dd['tableName'], "Desc": table_dd['tableDesc']}]),
+                ('tableColMetadata', {'TableName': table_dd['tableName']}, table_dd['records'])):
+
+            DBObj.cursor.execute(f"DELETE FROM {tableName} WHERE lower({list(lookupDict)[0]}) = ?", tuple(str(val).lower() for val in lookupDict.values()))
+            DBObj.connection.commit()
+
+            for records_dict in insertlist:
+                colList = records_dict.keys()
+                placehldr = ",".join(["?"]*len(records_dict.keys()))
+                colval = tuple(map(str,records_dict.values()))
+                DBObj.cursor.execute(f'Insert into {tableName}(`{"`, `".join(colList)}`) values ({placehldr})', colval)
+
+            DBObj.connection.commit()
+
+
+def load_bulk(DBObj: base_utils.accessDB, scaled_dd: list):
+    """
+    Loads the DD with the bulk upsert / replace path.
+    """
+    tableDesc = [{"tableName": table_dd['tableName'], "Desc": table_dd['tableDesc']} for table_dd in scaled_dd]
+    tableCol = [records for table_dd in scaled_dd for records in table_dd['records']]
+
+    DBObj.post_data('tableDesc', tableDesc, upsert_keys=['tableName'])
+    DBObj.replace_data('tableColMetadata', 'TableName', tableCol)
+
+
+def run(scale: int):
+    """
+    Runs both loaders on fresh databases and prints timings.
+
+    Args:
+        scale (int): Number of copies of the NorthWinds data dictionary.
+    """
+    scaled_dd = load_scaled_dd(scale)
+    n_rows = sum(len(table_dd['records']) for table_dd in scaled_dd)
+
+    print(f"Tables : {len(scaled_dd)} | Column rows : {n_rows}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base_utils.db_base_path = tmp_dir
+
+        for loader_name, loader in (("row-by-row", load_row_by_row), ("bulk", load_bulk)):
+            DBObj = base_utils.accessDB("table", f"bench_{loader_name}")
+            DBObj.create_table(tableDescSchema)
+            DBObj.create_table(tableColSchema)
+
+            for run_type in ("initial load", "re-import"):
+                start = time.perf_counter()
+                loader(DBObj, scaled_dd)
+                elapsed = time.perf_counter() - start
+
+                row_count = DBObj.get_data('tableColMetadata', {}, ['count(*)'])[0]
+                print(f"{loader_name:>12} | {run_type:<12} | {elapsed:8.3f} s | {n_rows / elapsed:10.0f} rows/s | rows stored : {row_count}")
+
+            DBObj.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Row-by-row vs bulk load of data dictionaries into the metadata store.")
+    parser.add_argument("--scale", type=int, default=200, help="Number of synthetic copies of the NorthWinds DD.")
+    args = parser.parse_args()
+
+    run(args.scale)
@@ -0,0 +1,135 @@
+"""
+Module: importTimeBenchmark.py
+
+Description:
+    Measures the cold-start (import) time of the modules every CLI invocation and worker loads,
+    such as Code.SystemBuilder.SQLReference and Code.Coder.QueryWriter.
+
+    Each import runs in a fresh interpreter so nothing is already loaded. When a baseline git ref is
+    given, the same modules are also imported from a pristine export of that ref, so the two trees can
+    be compared on the same machine.
+
+Usage Example:
+    python -m benchmarks.importTimeBenchmark
+    python -m benchmarks.importTimeBenchmark --baseline-ref HEAD~1 --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+default_modules = [
+    "Code.Utilities.Retrieval_Pipeline.RAGPipeline",
+    "Code.SystemBuilder.SQLReference",
+    "Code.Coder.QueryWriter",
+]
+
+import_snippet = """
+import sys, time
+start = time.perf_counter()
+try:
+    __import__({module!r})
+except BaseException as e:
+    print("ERROR", type(e).__name__, str(e).splitlines()[0] if str(e) else "")
+    sys.exit(1)
+print("OK", time.perf_counter() - start, len(sys.modules))
+"""
+
+
+def time_import(tree_root: str, module: str) -> tuple:
+    """
+    Imports a module in a fresh interpreter rooted at tree_root.
+
+    Args:
+        tree_root (str): Directory containing the 'Code' package.
+        module (str): Dotted module name.
+
+    Returns:
+        tuple: (seconds, number of loaded modules) or (None, error message) if the import failed.
+    """
+    completed = subprocess.run([sys.executable, "-c", import_snippet.format(module=module)],
+                               cwd=tree_root,
+                               capture_output=True,
+                               text=True,
+                               env={**os.environ, "PYTHONPATH": tree_root, "PYTHONDONTWRITEBYTECODE": "1"})
+
+    output = completed.stdout.strip().splitlines()
+    last_line = output[-1] if output else completed.stderr.strip()[-200:]
+
+    if completed.returncode == 0 and last_line.startswith("OK"):
+        _, seconds, n_modules = last_line.split()
+        return float(seconds), int(n_modules)
+
+    return None, last_line
+
+
+def export_ref(ref: str, target_dir: str):
+    """
+    Exports the tree of a git ref into target_dir.
+    """
+    archive_path = os.path.join(target_dir, "tree.tar")
+    subprocess.run(["git", "archive", "--format=tar", "-o", archive_path, ref], cwd=repo_root, check=True)
+
+    with tarfile.open(archive_path) as archive:
+        archive.extractall(target_dir)
+
+
+def report(label: str, tree_root: str, modules: list, repeat: int) -> dict:
+    """
+    Times every module import `repeat` times and prints the median.
+
+    Returns:
+        dict: {module: median seconds or None}
+    """
+    medians = {}
+    for module in modules:
+        timings = []
+        for _ in range(repeat):
+            seconds, detail = time_import(tree_root, module)
+            if seconds is None:
+                break
+            timings.append(seconds)
+
+        if timings:
+            medians[module] = statistics.median(timings)
+            print(f"{label:>9} | {module:<50} | {medians[module]:8.3f} s | modules loaded : {detail}")
+        else:
+            medians[module] = None
+            print(f"{label:>9} | {module:<50} |   failed | {detail}")
+
+    return medians
+
+
+def run(modules: list, repeat: int, baseline_ref: str = None):
+    """
+    Runs the benchmark on the working tree and, optionally, on a baseline git ref.
+    """
+    current = report("current", repo_root, modules, repeat)
+
+    if baseline_ref is None:
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        export_ref(baseline_ref, tmp_dir)
+        baseline = report(baseline_ref, tmp_dir, modules, repeat)
+
+    for module in modules:
+        if current[module] is not None and baseline[module] is not None:
+            print(f"{'speedup':>9} | {module:<50} | {baseline[module] / current[module]:7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start import time of the CoderAssistants entry modules.")
+    parser.add_argument("--modules", nargs="+", default=default_modules, help="Dotted module names to import.")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreter runs per module (median reported).")
+    parser.add_argument("--baseline-ref", default=None, help="Git ref to compare against, e.g. HEAD~1.")
+    args = parser.parse_args()
+
+    run(args.modules, args.repeat, args.baseline_ref)
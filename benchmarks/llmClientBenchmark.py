@@ -0,0 +1,98 @@
+"""
+Module: llmClientBenchmark.py
+
+Description:
+    Benchmarks the LLM client offline against the local mock providers (Code.Utilities.apiSupport.mockServer):
+    sequential CallService, CallServiceBatch in thread and async mode, then the same prompts replayed from
+    the recordings of the first run (LLM_API_MODE=replay) with no network and no synthetic latency.
+
+    Results do not depend on provider load or cost anything, so the runs are comparable across changes.
+
+Usage Example:
+    python -m benchmarks.llmClientBenchmark --prompts 64 --latency 0.2 --provider OPEN_AI
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import yaml
+
+from Code.Utilities import base_utils
+from Code.Utilities.apiSupport.mockServer import start_mock_server
+
+
+template_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Code", "Utilities", "Configs", "apiTemplates")
+
+
+def write_configs(tmp_dir: str, endpoints: dict, overrides: dict = None) -> str:
+    """
+    Writes a model config pointing every provider at the mock server. Returns the config paths file.
+
+    overrides maps a provider to extra model_config keys, e.g. {"OPEN_AI": {"max_concurrency": 2}}.
+    """
+    model_config = {provider: {"model_name": "mock-model",
+                               "api_key": "mock-key",
+                               "api_template": os.path.join(template_dir, f"{provider}.json"),
+                               "endpoint": endpoint,
+                               "max_concurrency": 16,
+                               **(overrides or {}).get(provider, {})}
+                    for provider, endpoint in endpoints.items()}
+
+    model_config_path = os.path.join(tmp_dir, "model_config.yaml")
+    with open(model_config_path, "w") as fobj:
+        yaml.safe_dump(model_config, fobj)
+
+    config_paths_file = os.path.join(tmp_dir, "config_paths.yaml")
+    with open(config_paths_file, "w") as fobj:
+        yaml.safe_dump({"model_config": model_config_path}, fobj)
+
+    return config_paths_file
+
+
+def run(n_prompts: int, latency: float, provider: str, max_workers: int):
+    """
+    Runs the client modes against the mock server and prints timings.
+    """
+    prompts = [f"Benchmark prompt number {ind}" for ind in range(n_prompts)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir, start_mock_server(latency=latency) as server:
+        base_utils.db_base_path = tmp_dir + os.sep
+        base_utils.config_paths_file = write_configs(tmp_dir, server.endpoints())
+
+        from Code.Utilities.apiSupport.allApi import CallLLMApi
+
+        client = CallLLMApi(provider, caller="benchmark")
+
+        def sequential():
+            return [client.CallService(prompt) for prompt in prompts]
+
+        runs = [("sequential", "record", sequential),
+                ("batch thread", "live", lambda: client.CallServiceBatch(prompts, max_workers, mode="thread")),
+                ("batch async", "live", lambda: client.CallServiceBatch(prompts, max_workers, mode="async")),
+                ("replay", "replay", sequential)]
+
+        print(f"Provider : {provider} | Prompts : {n_prompts} | Mock latency : {latency} s")
+        for run_name, api_mode, fn in runs:
+            os.environ["LLM_API_MODE"] = api_mode
+            os.environ["LLM_REPLAY_LATENCY"] = "0"
+
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            print(f"{run_name:>14} | {api_mode:<7} | {elapsed:8.3f} s | {n_prompts / elapsed:8.1f} calls/s")
+
+        os.environ.pop("LLM_API_MODE")
+        os.environ.pop("LLM_REPLAY_LATENCY")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM client throughput against the local mock providers.")
+    parser.add_argument("--prompts", type=int, default=64, help="Number of prompts per run.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds the mock server takes per request.")
+    parser.add_argument("--provider", default="OPEN_AI", choices=["OPEN_AI", "GROQ", "ANTHROPIC", "GOOGLE"])
+    parser.add_argument("--max-workers", type=int, default=8, help="Concurrency of the batch runs.")
+    args = parser.parse_args()
+
+    run(args.prompts, args.latency, args.provider, args.max_workers)
@@ -0,0 +1,63 @@
+"""
+Shared fixtures of the test suite.
+
+Every test gets its own database directory (base_utils.db_base_path), so SQLite stores never leak between
+tests. Client tests run against the offline mock providers (Code.Utilities.apiSupport.mockServer).
+
+Usage Example:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Code.Utilities import base_utils
+
+
+@pytest.fixture
+def db_base_path(tmp_path, monkeypatch):
+    """
+    Points accessDB at a fresh directory for the duration of the test.
+    """
+    path = str(tmp_path / "DBinst") + os.sep
+    monkeypatch.setattr(base_utils, "db_base_path", path)
+    yield path
+    base_utils.connection_manager.close()
+
+
+@pytest.fixture
+def mock_server(tmp_path, db_base_path, monkeypatch):
+    """
+    Mock LLM server counting the prompts it answers, with every provider of model_config pointed at it.
+    """
+    from benchmarks.llmClientBenchmark import write_configs
+    from Code.Utilities.apiSupport.mockServer import echo_responder, start_mock_server
+
+    prompts = []
+
+    def responder(prompt):
+        prompts.append(prompt)
+        return echo_responder(prompt)
+
+    with start_mock_server(responder=responder) as server:
+        server.prompts = prompts
+        monkeypatch.setattr(base_utils, "config_paths_file", write_configs(str(tmp_path), server.endpoints()))
+        monkeypatch.setenv("LLM_API_MODE", "live")
+        yield server
+
+
+@pytest.fixture
+def model_config(mock_server, tmp_path):
+    """
+    Rewrites the model config of a provider, e.g. model_config("OPEN_AI", max_concurrency=2).
+    """
+    from benchmarks.llmClientBenchmark import write_configs
+
+    def set_model_config(provider, **settings):
+        write_configs(str(tmp_path), mock_server.endpoints(), {provider: settings})
+
+    return set_model_config
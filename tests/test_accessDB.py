@@ -0,0 +1,112 @@
+"""
+Tests of accessDB bulk writes: post_data (plain and upsert) and replace_data.
+"""
+
+import sqlite3
+
+import pytest
+
+from Code.Utilities.base_utils import accessDB
+
+
+table_desc_schema = {
+    'tableName' : 'table_desc',
+    'columns' : {
+        'tableName': ['TEXT', 'PRIMARY KEY'],
+        'Description': ['TEXT', ''],
+        'Payload': ['BLOB', '']
+    }
+}
+column_desc_schema = {
+    'tableName' : 'column_desc',
+    'columns' : {
+        'TableName': ['TEXT', ''],
+        'ColumnName': ['TEXT', ''],
+        'Description': ['TEXT', '']
+    },
+    'indexes' : {
+        'idx_column_desc_table': ['lower(TableName)']
+    }
+}
+
+
+@pytest.fixture
+def db(db_base_path):
+    db = accessDB("tests", "accessDB")
+    db.create_table(table_desc_schema)
+    db.create_table(column_desc_schema)
+    return db
+
+
+def table_rows(db):
+    return sorted(db.get_data("table_desc", {}, ["tableName", "Description"], fetchtype="all"))
+
+
+def test_post_data_inserts_records_with_different_column_sets(db):
+    db.post_data("table_desc", [{"tableName": "orders", "Description": "Orders"},
+                                {"tableName": "items"},
+                                {"tableName": "users", "Description": "Users"}])
+
+    assert table_rows(db) == [("items", None), ("orders", "Orders"), ("users", "Users")]
+
+
+def test_post_data_without_upsert_keys_rejects_duplicates(db):
+    db.post_data("table_desc", [{"tableName": "orders", "Description": "Orders"}])
+
+    with pytest.raises(sqlite3.IntegrityError):
+        db.post_data("table_desc", [{"tableName": "users", "Description": "Users"},
+                                    {"tableName": "orders", "Description": "Other"}])
+
+    # The failed batch is rolled back as a whole
+    assert table_rows(db) == [("orders", "Orders")]
+
+
+def test_post_data_upsert_updates_existing_rows_and_inserts_new_ones(db):
+    db.post_data("table_desc", [{"tableName": "orders", "Description": "Old"},
+                                {"tableName": "items", "Description": "Items"}])
+
+    db.post_data("table_desc", [{"tableName": "orders", "Description": "New"},
+                                {"tableName": "users", "Description": "Users"}], upsert_keys=["tableName"])
+
+    assert table_rows(db) == [("items", "Items"), ("orders", "New"), ("users", "Users")]
+
+
+def test_post_data_upsert_only_overwrites_columns_provided(db):
+    db.post_data("table_desc", [{"tableName": "orders", "Description": "Orders"}])
+
+    db.post_data("table_desc", [{"tableName": "orders", "Payload": b"\x00\x01"}], upsert_keys=["tableName"])
+
+    assert db.get_data("table_desc", {"tableName": "orders"}, ["Description", "Payload"]) == ("Orders", b"\x00\x01")
+
+
+def test_post_data_upsert_with_key_columns_only_keeps_existing_row(db):
+    db.post_data("table_desc", [{"tableName": "orders", "Description": "Orders"}])
+
+    db.post_data("table_desc", [{"tableName": "orders"}, {"tableName": "users"}], upsert_keys=["tableName"])
+
+    assert table_rows(db) == [("orders", "Orders"), ("users", None)]
+
+
+def test_post_data_upsert_keeps_the_last_duplicate_of_a_batch(db):
+    db.post_data("table_desc", [{"tableName": "orders", "Description": "First"},
+                                {"tableName": "orders", "Description": "Last"}], upsert_keys=["tableName"])
+
+    assert table_rows(db) == [("orders", "Last")]
+
+
+def test_replace_data_replaces_groups_case_insensitively(db):
+    db.post_data("column_desc", [{"TableName": "Orders", "ColumnName": "id"},
+                                 {"TableName": "Orders", "ColumnName": "stale"},
+                                 {"TableName": "users", "ColumnName": "id"}])
+
+    db.replace_data("column_desc", "tablename", [{"TableName": "orders", "ColumnName": "id", "Description": "Order id"}])
+
+    assert sorted(db.get_data("column_desc", {}, ["TableName", "ColumnName", "Description"], fetchtype="all")) == \
+        [("orders", "id", "Order id"), ("users", "id", None)]
+
+
+def test_get_data_casefold(db):
+    db.post_data("column_desc", [{"TableName": "Orders", "ColumnName": "id"}])
+
+    assert db.get_data("column_desc", {"TableName": "ORDERS"}, ["ColumnName"]) == ("id",)
+    assert db.get_data("column_desc", {"TableName": "ORDERS"}, ["ColumnName"], casefold=False) is None
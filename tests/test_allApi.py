@@ -0,0 +1,62 @@
+"""
+Tests of the LLM client request building: cached request builders and provider payloads.
+"""
+
+import copy
+import os
+import shutil
+
+from Code.Utilities.apiSupport import allApi
+from Code.Utilities.apiSupport.allApi import get_request_builder
+from Code.Utilities.apiSupport.promptLayout import promptLayout
+
+
+def test_cached_builder_is_served_without_copying_or_stat(mock_server, monkeypatch):
+    builder = get_request_builder("OPEN_AI")
+    calls = []
+
+    def counting(func):
+        def wrapper(*args, **kwargs):
+            calls.append(func.__name__)
+            return func(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(copy, "deepcopy", counting(copy.deepcopy))
+    monkeypatch.setattr(os.path, "getmtime", counting(os.path.getmtime))
+
+    assert all(get_request_builder("OPEN_AI") is builder for _ in range(50))
+    assert calls == []
+
+
+def test_builder_is_rebuilt_when_the_config_or_template_changes(mock_server, model_config, tmp_path, monkeypatch):
+    template_path = str(tmp_path / "OPEN_AI.json")
+    shutil.copy(get_request_builder("OPEN_AI").template_path, template_path)
+
+    model_config("OPEN_AI", api_template=template_path)
+    builder = get_request_builder("OPEN_AI")
+    assert builder.template_path == template_path
+
+    # Template edits are seen after template_check_interval
+    monkeypatch.setattr(allApi, "template_check_interval", 0)
+    assert get_request_builder("OPEN_AI") is builder
+    os.utime(template_path, (0, 0))
+
+    assert get_request_builder("OPEN_AI") is not builder
+
+
+def test_anthropic_prompt_layout_is_split_at_the_cache_breakpoint(mock_server):
+    layout = promptLayout().add_static("instructions", "Describe the column.").add_variable("column", "CustomerID")
+
+    content = get_request_builder("ANTHROPIC").build(layout)["messages"][0]["content"]
+
+    assert content == [{"type": "text", "text": "Describe the column.\n\n", "cache_control": {"type": "ephemeral"}},
+                       {"type": "text", "text": "CustomerID"}]
+
+
+def test_anthropic_prompt_without_variable_part_has_no_empty_block(mock_server):
+    layout = promptLayout().add_static("instructions", "Describe the column.").add_variable("column", "")
+
+    content = get_request_builder("ANTHROPIC").build(layout)["messages"][0]["content"]
+
+    assert content == [{"type": "text", "text": "Describe the column.\n\n", "cache_control": {"type": "ephemeral"}}]
+    assert all(block["text"].strip() for block in content)
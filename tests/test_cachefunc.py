@@ -0,0 +1,235 @@
+"""
+Tests of the cachefunc memoize store: memory / disk tiers, TTL, disk eviction and size accounting,
+buffered access statistics and single-flight.
+"""
+
+import gc
+import threading
+import time
+import weakref
+
+import pytest
+
+from Code.Utilities.base_utils import cachefunc, canonical_encode
+
+
+@pytest.fixture
+def cache(db_base_path):
+    cache = cachefunc()
+    yield cache
+    cache.flush_stats()
+
+
+def stored_bytes(cache) -> int:
+    return cache.DBObj.get_data("cache", {}, ["COALESCE(SUM(size), 0)"])[0]
+
+
+def stored_keys(cache) -> set:
+    return {row[0] for row in cache.DBObj.get_data("cache", {}, ["key"], fetchtype="all")}
+
+
+def test_memory_then_disk_hits(cache):
+    calls = []
+
+    @cache.memoize
+    def square(x):
+        calls.append(x)
+        return {"value": x * x}
+
+    assert square(3) == {"value": 9}
+    assert square(3) == {"value": 9}
+    cache.clear_memory()
+    assert square(x=3) == {"value": 9}
+
+    assert calls == [3]
+    stats = cache.stats()
+    assert (stats["misses"], stats["memory_hits"], stats["disk_hits"]) == (1, 1, 1)
+
+
+def test_ttl_expires_memory_and_disk_entries(cache):
+    calls = []
+
+    @cache.memoize(ttl=0.05)
+    def echo(x):
+        calls.append(x)
+        return x
+
+    echo("a")
+    time.sleep(0.1)
+    cache.clear_memory()
+    echo("a")
+
+    assert calls == ["a", "a"]
+    assert cache.stats()["expired"] == 1
+    assert cache._disk_bytes == stored_bytes(cache)
+
+
+def test_unserializable_results_are_not_cached(cache):
+    calls = []
+
+    @cache.memoize
+    def make(x):
+        calls.append(x)
+        return object()
+
+    make(1)
+    make(1)
+
+    assert calls == [1, 1]
+    assert stored_keys(cache) == set()
+
+
+def test_distinct_callable_arguments_never_share_a_result(cache):
+    calls = []
+
+    @cache.memoize
+    def apply(func, x):
+        calls.append(x)
+        return func(x)
+
+    assert apply(lambda x: x + 1, 1) == 2
+    assert apply(lambda y: y * 10, 1) == 10
+    assert apply(max, [1, 3]) == 3
+    assert apply(min, [1, 3]) == 1
+    assert apply(max, [1, 3]) == 3
+
+    # Named functions are keyed by their import path, lambdas are never cached
+    assert len(calls) == 4
+
+
+def test_canonical_encode_names_callables_and_classes_by_module():
+    first = type("Row", (), {"__module__": "first"})()
+    second = type("Row", (), {"__module__": "second"})()
+
+    assert canonical_encode(first) != canonical_encode(second)
+    assert canonical_encode(max) != canonical_encode(min)
+    assert canonical_encode(time.time) == {"__callable__": "time.time"}
+    with pytest.raises(TypeError):
+        canonical_encode(lambda x: x)
+    with pytest.raises(TypeError):
+        canonical_encode(object())
+
+
+def test_pickle_requires_schema(cache):
+    with pytest.raises(ValueError):
+        cache.memoize(lambda x: x, serializer="pickle")
+
+
+def test_disk_bytes_counts_replaced_entries_once(cache):
+    cache.create_cache_table()
+    for value in (b"x" * 100, b"y" * 40, b"z" * 70):
+        cache.__put_disk__("key", "func", "json", value, None)
+    cache.__put_disk__("other", "func", "json", b"o" * 10, None)
+
+    assert cache._disk_bytes == stored_bytes(cache) == 80
+    assert cache.refresh_disk_usage() == 80
+
+
+def test_disk_bytes_stays_exact_under_concurrent_stores(db_base_path):
+    cache = cachefunc(max_disk_bytes=20000)
+    cache.create_cache_table()
+
+    def store(worker):
+        for ind in range(40):
+            # Workers overwrite each other's keys with values of different sizes
+            cache.__put_disk__(f"key {ind % 10}", "func", "json", b"v" * (10 * worker + ind), None)
+            cache.__put_disk__(f"own {worker} {ind}", "func", "json", b"o" * 50, None)
+
+    threads = [threading.Thread(target=store, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    assert cache._disk_bytes == stored_bytes(cache) <= 20000
+
+
+def test_exit_flush_does_not_keep_instances_alive(db_base_path):
+    cache = cachefunc()
+    reference = weakref.ref(cache)
+
+    del cache
+    gc.collect()
+
+    assert reference() is None
+
+
+def test_lru_eviction_keeps_recently_read_entries(db_base_path):
+    cache = cachefunc(max_disk_bytes=350)
+    cache.create_cache_table()
+
+    for key in ("a", "b", "c"):
+        cache.__put_disk__(key, "func", "json", b"v" * 100, None)
+        time.sleep(0.01)
+
+    # The disk hit is only buffered, eviction must still see it
+    assert cache.__get_disk__("a") is not None
+    assert cache.DBObj.get_data("cache", {"key": "a"}, ["hits"], casefold=False) == (0,)
+    cache.__put_disk__("d", "func", "json", b"v" * 100, None)
+
+    assert stored_keys(cache) == {"a", "c", "d"}
+    assert cache._disk_bytes == stored_bytes(cache) == 300
+    assert cache.stats()["disk_evictions"] == 1
+
+
+def test_lfu_eviction_keeps_frequently_read_entries(db_base_path):
+    cache = cachefunc(max_disk_bytes=350, eviction_policy="LFU")
+    cache.create_cache_table()
+
+    for key in ("a", "b", "c", "d"):
+        cache.__put_disk__(key, "func", "json", b"v" * 100, None)
+        time.sleep(0.01)
+        if key == "c":
+            # b is read least recently but more often than d
+            for read_key in ("b", "a", "a", "c", "c"):
+                cache.__get_disk__(read_key)
+
+    assert stored_keys(cache) == {"a", "b", "c"}
+    assert cache._disk_bytes == stored_bytes(cache) == 300
+
+
+def test_evict_disk_drops_expired_entries_first(cache):
+    cache.create_cache_table()
+    cache.__put_disk__("expired", "func", "json", b"v" * 100, time.time() - 1)
+    cache.__put_disk__("fresh", "func", "json", b"v" * 100, None)
+
+    cache.evict_disk(target_bytes=150)
+
+    assert stored_keys(cache) == {"fresh"}
+    assert cache._disk_bytes == 100
+
+
+def test_disk_hits_are_buffered_until_flush(cache):
+    cache.create_cache_table()
+    cache.__put_disk__("key", "func", "json", b"1", None)
+
+    for _ in range(3):
+        assert cache.__get_disk__("key") is not None
+
+    assert cache.DBObj.get_data("cache", {"key": "key"}, ["hits"], casefold=False) == (0,)
+    cache.flush_access()
+    assert cache.DBObj.get_data("cache", {"key": "key"}, ["hits"], casefold=False) == (3,)
+
+
+def test_single_flight_coalesces_concurrent_misses(cache):
+    calls = []
+    release = threading.Event()
+
+    @cache.memoize(single_flight=True)
+    def slow(x):
+        calls.append(x)
+        release.wait(5)
+        return x * 2
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(slow(21))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [21]
+    assert results == [42] * 8
+    assert cache.stats()["coalesced_threads"] == 7
@@ -0,0 +1,197 @@
+"""
+Tests of the persistent LLM job queue against the mock providers: idempotent enqueue, leases, retries,
+resume after a crash and key-scoped runs.
+"""
+
+import time
+
+import pytest
+
+from Code.Utilities.apiSupport import rateLimiter as rate_limiter_module
+from Code.Utilities.apiSupport.llmJobQueue import llmJobQueue
+from Code.Utilities.apiSupport.mockServer import echo_responder, mockHTTPError
+
+
+handled = []
+handler_failures = []
+
+
+def record_handler(response, context):
+    """
+    Result handler of the tests, fails while handler_failures is not empty.
+    """
+    if handler_failures:
+        raise ValueError(handler_failures.pop())
+    handled.append((response, context))
+
+
+@pytest.fixture(autouse=True)
+def reset_handler():
+    handled.clear()
+    handler_failures.clear()
+
+
+@pytest.fixture
+def no_client_retries(monkeypatch, model_config):
+    """
+    The client fails at once, so retries are left to the queue.
+    """
+    monkeypatch.setattr(rate_limiter_module, "_rate_limiters", {})
+    model_config("OPEN_AI", max_retries=0)
+
+
+@pytest.fixture
+def queue(mock_server):
+    return llmJobQueue("tests", provider="OPEN_AI", max_attempts=2)
+
+
+def status(queue, key) -> tuple:
+    return queue.DBObj.get_data(queue.tableName, {"job_key": key}, ["status", "attempts"], casefold=False)
+
+
+def make_available(queue, key):
+    queue.__update__(key, available_at=0)
+
+
+def test_enqueue_is_idempotent(queue, mock_server):
+    keys = queue.enqueue_many([{"prompt": "one"}, {"prompt": "two"}, {"prompt": "one"}])
+
+    assert keys[0] == keys[2] != keys[1]
+    assert queue.progress()["pending"] == 2
+
+    queue.run(workers=2, progress_interval=0)
+    queue.enqueue("one")
+
+    assert sorted(mock_server.prompts) == ["one", "two"]
+    assert queue.results(keys) == {keys[0]: "mock: one", keys[1]: "mock: two"}
+    assert queue.progress()["pending"] == 0
+
+
+def test_run_passes_responses_to_the_handler(queue):
+    key = queue.enqueue("question", handler="test_llmJobQueue:record_handler", context={"column": "id"})
+
+    progress = queue.run(workers=1, progress_interval=0)
+
+    assert handled == [("mock: question", {"column": "id"})]
+    assert (progress["done"], progress["failed"]) == (1, 0)
+    assert status(queue, key) == ("done", 1)
+
+
+def test_handler_failure_is_retried_without_calling_the_provider_again(queue, mock_server):
+    key = queue.enqueue("question", handler="test_llmJobQueue:record_handler", context=None)
+    handler_failures.append("metadata DB locked")
+
+    queue.process(queue.claim("worker")[0])
+    assert status(queue, key) == ("pending", 1)
+
+    make_available(queue, key)
+    queue.process(queue.claim("worker")[0])
+
+    assert status(queue, key) == ("done", 2)
+    assert mock_server.prompts == ["question"]
+    assert handled == [("mock: question", None)]
+
+
+def test_retryable_errors_back_off_then_fail(queue, mock_server, no_client_retries):
+    def responder(prompt):
+        raise mockHTTPError(503)
+
+    mock_server.responder = responder
+    key = queue.enqueue("question")
+
+    queue.process(queue.claim("worker")[0])
+    row = queue.DBObj.get_data(queue.tableName, {"job_key": key}, ["status", "available_at"], casefold=False)
+    assert row[0] == "pending" and row[1] > time.time()
+    assert queue.claim("worker") == []
+
+    make_available(queue, key)
+    queue.process(queue.claim("worker")[0])
+
+    assert status(queue, key) == ("failed", 2)
+    assert "503" in queue.errors([key])[key]
+
+    assert queue.retry_failed() == 1
+    mock_server.responder = echo_responder
+    queue.run(workers=1, progress_interval=0)
+    assert queue.results([key]) == {key: "mock: question"}
+
+
+def test_non_retryable_errors_fail_at_once(queue, mock_server):
+    def responder(prompt):
+        raise mockHTTPError(400)
+
+    mock_server.responder = responder
+    key = queue.enqueue("question")
+
+    queue.run(workers=1, progress_interval=0)
+
+    assert status(queue, key) == ("failed", 1)
+
+
+def test_expired_leases_are_reclaimed(mock_server):
+    queue = llmJobQueue("tests", provider="OPEN_AI", lease_seconds=0.2)
+    key = queue.enqueue("question")
+
+    assert [job["job_key"] for job in queue.claim("crashed worker")] == [key]
+    assert queue.claim("other worker") == []
+
+    time.sleep(0.3)
+    jobs = queue.claim("other worker")
+
+    assert [(job["job_key"], job["attempts"]) for job in jobs] == [(key, 2)]
+
+
+def test_resume_reuses_stored_responses(queue, mock_server):
+    keys = queue.enqueue_many([{"prompt": "answered", "handler": "test_llmJobQueue:record_handler"},
+                               {"prompt": "in flight", "handler": "test_llmJobQueue:record_handler"}])
+
+    # A run that died after storing the first response but before its handler ran
+    queue.claim("crashed worker", n=2)
+    queue.__update__(keys[0], response="stored answer")
+
+    progress = queue.run(workers=2, reset_leases=True, progress_interval=0)
+
+    assert progress["done"] == 2
+    assert mock_server.prompts == ["in flight"]
+    assert sorted(response for response, _ in handled) == ["mock: in flight", "stored answer"]
+
+
+def test_key_scoped_run_only_processes_its_own_jobs(queue, mock_server):
+    own_keys = queue.enqueue_many([{"prompt": "mine 1"}, {"prompt": "mine 2"}])
+    other_key = queue.enqueue("someone else's")
+
+    progress = queue.run(workers=2, progress_interval=0, keys=own_keys)
+
+    assert (progress["done"], progress["total"]) == (2, 2)
+    assert sorted(mock_server.prompts) == ["mine 1", "mine 2"]
+    assert status(queue, other_key) == ("pending", 0)
+
+
+def test_key_scoped_run_waits_for_jobs_leased_elsewhere(mock_server):
+    queue = llmJobQueue("tests", provider="OPEN_AI", lease_seconds=0.5)
+    keys = queue.enqueue_many([{"prompt": "free"}, {"prompt": "leased"}])
+
+    # Another process holds the lease of the second job and dies
+    queue.claim("other process", keys=[keys[1]])
+
+    progress = queue.run(workers=1, progress_interval=0, keys=keys)
+
+    assert progress["done"] == 2
+    assert sorted(mock_server.prompts) == ["free", "leased"]
+
+
+def test_purge_deletes_consumed_and_stale_done_jobs(mock_server):
+    queue = llmJobQueue("tests", provider="OPEN_AI", done_ttl=60)
+    keys = queue.enqueue_many([{"prompt": "one"}, {"prompt": "two"}, {"prompt": "three"}])
+    queue.run(workers=1, progress_interval=0)
+
+    assert queue.purge(keys[:1]) == 1
+    assert queue.results(keys) == {keys[1]: "mock: two", keys[2]: "mock: three"}
+
+    # Done jobs older than done_ttl are requested again when re-enqueued
+    queue.__update__(keys[1], finished_at=time.time() - 120)
+    queue.enqueue_many([{"prompt": "two"}])
+
+    assert status(queue, keys[1]) == ("pending", 0)
+    assert status(queue, keys[2]) == ("done", 1)
+    assert queue.progress()["done"] == 1
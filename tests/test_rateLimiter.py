@@ -0,0 +1,379 @@
+"""
+Tests of the client-side rate limiter: token buckets, concurrency slots, AIMD feedback and the retry policy,
+then the limiter in CallLLMApi against the mock providers.
+"""
+
+import asyncio
+import contextlib
+import email.utils
+import threading
+import time
+
+import pytest
+
+from Code.Utilities.apiSupport import rateLimiter as rate_limiter_module
+from Code.Utilities.apiSupport.mockServer import echo_responder, mockHTTPError
+from Code.Utilities.apiSupport.rateLimiter import (LLMApiError, get_max_concurrency, get_rate_limiter, parse_retry_after,
+                                                   rateLimiter, tokenBucket)
+
+
+@pytest.fixture
+def limiters(monkeypatch):
+    """
+    Fresh process-wide limiter registry, so limits changed by a test do not leak into the others.
+    """
+    registry = {}
+    monkeypatch.setattr(rate_limiter_module, "_rate_limiters", registry)
+    return registry
+
+
+# ------------------------------------------------------------------------------------------
+# tokenBucket
+# ------------------------------------------------------------------------------------------
+
+def test_token_bucket_waits_for_refill_once_empty():
+    bucket = tokenBucket(60)
+
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(30) == pytest.approx(30, abs=0.1)
+
+
+def test_token_bucket_caps_reservations_at_capacity():
+    bucket = tokenBucket(60)
+
+    # A call larger than a minute of tokens waits for a full bucket, not forever
+    assert bucket.reserve(600) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1, abs=0.1)
+
+
+def test_token_bucket_adjust_returns_overestimated_tokens():
+    bucket = tokenBucket(60)
+    bucket.reserve(60)
+
+    bucket.adjust(-30)
+
+    assert bucket.reserve(30) == pytest.approx(0, abs=0.1)
+
+
+# ------------------------------------------------------------------------------------------
+# Slots and feedback
+# ------------------------------------------------------------------------------------------
+
+def test_slot_blocks_beyond_the_concurrency_limit():
+    limiter = rateLimiter("test", max_concurrency=2)
+    acquired = threading.Event()
+
+    def third_call():
+        with limiter.slot():
+            acquired.set()
+
+    thread = threading.Thread(target=third_call)
+    with contextlib.ExitStack() as held:
+        held.enter_context(limiter.slot())
+        held.enter_context(limiter.slot())
+
+        thread.start()
+        assert not acquired.wait(0.2)
+        assert limiter.in_flight == 2
+
+    assert acquired.wait(2)
+    thread.join(2)
+    assert limiter.in_flight == 0
+
+
+def test_slot_is_released_when_the_call_raises():
+    limiter = rateLimiter("test", max_concurrency=1)
+
+    with pytest.raises(LLMApiError):
+        with limiter.slot():
+            raise LLMApiError("boom", 500)
+
+    assert limiter.in_flight == 0
+
+
+def test_slot_async_respects_the_concurrency_limit():
+    limiter = rateLimiter("test", max_concurrency=3)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter.slot_async():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.02)
+
+    async def main():
+        await asyncio.gather(*[call() for _ in range(12)])
+
+    asyncio.run(main())
+
+    assert peak == 3
+    assert limiter.in_flight == 0
+
+
+def test_slot_async_waiters_are_woken_by_releases_from_other_threads(monkeypatch):
+    limiter = rateLimiter("test", max_concurrency=1)
+    real_sleep = asyncio.sleep
+    sleeps = []
+
+    async def counting_sleep(delay, *args):
+        sleeps.append(delay)
+        return await real_sleep(delay, *args)
+
+    async def call():
+        async with limiter.slot_async():
+            pass
+
+    async def main():
+        waiter = asyncio.ensure_future(call())
+        await real_sleep(0.05)
+        assert not waiter.done() and len(limiter._async_waiters) == 1
+
+        threading.Timer(0.05, limiter.__release_slot__).start()
+        await asyncio.wait_for(waiter, 2)
+
+    monkeypatch.setattr(asyncio, "sleep", counting_sleep)
+    limiter.in_flight = 1
+    asyncio.run(main())
+
+    # The waiter never polled
+
+    assert sleeps == []
+    assert limiter.in_flight == 0
+
+
+def test_cancelled_slot_async_waiter_passes_its_wake_up_on():
+    limiter = rateLimiter("test", max_concurrency=1)
+
+    async def call(started):
+        async with limiter.slot_async():
+            started.set()
+
+    async def main():
+        first_started, second_started = asyncio.Event(), asyncio.Event()
+        async with limiter.slot_async():
+            first = asyncio.ensure_future(call(first_started))
+            second = asyncio.ensure_future(call(second_started))
+            await asyncio.sleep(0.01)
+        # The release woke the first waiter, which is cancelled before it runs
+        first.cancel()
+
+        await asyncio.wait_for(second_started.wait(), 2)
+        await asyncio.gather(first, second, return_exceptions=True)
+        assert first.cancelled() and not first_started.is_set()
+
+    asyncio.run(main())
+
+    assert limiter.in_flight == 0 and not limiter._async_waiters
+
+
+def test_slot_waits_for_the_request_bucket():
+    limiter = rateLimiter("test", rpm=600)
+    limiter.request_bucket.tokens = 0
+
+    start = time.monotonic()
+    with limiter.slot():
+        pass
+
+    assert time.monotonic() - start >= 0.09
+
+
+def test_throttle_halves_the_limit_once_per_burst():
+    limiter = rateLimiter("test", max_concurrency=8)
+
+    for _ in range(5):
+        limiter.on_throttle()
+
+    assert limiter.limit == 4
+
+
+def test_throttle_never_goes_below_one():
+    limiter = rateLimiter("test", max_concurrency=2)
+
+    for _ in range(3):
+        limiter.on_throttle()
+        limiter.last_decrease = 0.0
+
+    assert limiter.limit == 1
+
+
+def test_throttle_retry_after_pauses_every_caller():
+    limiter = rateLimiter("test")
+
+    limiter.on_throttle(retry_after=5)
+
+    assert limiter.__reserve__(0) == pytest.approx(5, abs=0.1)
+
+
+def test_success_grows_the_limit_after_a_full_window():
+    limiter = rateLimiter("test", max_concurrency=8)
+    limiter.on_throttle()
+
+    for _ in range(3):
+        limiter.on_success()
+    assert limiter.limit == 4
+
+    limiter.on_success()
+    assert limiter.limit == 5
+
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.limit == 8
+
+
+def test_success_corrects_the_token_estimate():
+    limiter = rateLimiter("test", tpm=600)
+    limiter.token_bucket.reserve(600)
+
+    limiter.on_success(estimated_tokens=600, used_tokens=100)
+
+    assert limiter.token_bucket.tokens == pytest.approx(500, abs=1)
+
+
+# ------------------------------------------------------------------------------------------
+# Retry policy
+# ------------------------------------------------------------------------------------------
+
+def test_retry_delay_refuses_non_retryable_errors():
+    limiter = rateLimiter("test")
+
+    assert limiter.retry_delay(LLMApiError("bad request", 400), 0) is None
+    assert limiter.retry_delay(LLMApiError("unauthorized", 401), 0) is None
+
+
+def test_retry_delay_stops_after_max_retries():
+    limiter = rateLimiter("test", max_retries=2)
+    error = LLMApiError("unavailable", 503)
+
+    assert limiter.retry_delay(error, 1) is not None
+    assert limiter.retry_delay(error, 2) is None
+    assert limiter.retry_delay(error, 0, max_retries=0) is None
+
+
+def test_retry_delay_is_bounded_full_jitter():
+    limiter = rateLimiter("test", backoff_base=1, backoff_max=4, max_retries=10)
+    error = LLMApiError("connection reset")
+
+    delays = [limiter.retry_delay(error, attempt) for attempt in range(8) for _ in range(20)]
+
+    assert all(0 <= delay <= 4 for delay in delays)
+
+
+def test_retry_delay_honours_retry_after_and_throttles():
+    limiter = rateLimiter("test", max_concurrency=8, backoff_base=0.01)
+
+    delay = limiter.retry_delay(LLMApiError("throttled", 429, retry_after=3), 0)
+
+    assert delay >= 3
+    assert limiter.limit == 4
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(email.utils.formatdate(time.time() + 30, usegmt=True)) == pytest.approx(30, abs=2)
+
+
+def test_get_rate_limiter_is_shared_per_provider(limiters):
+    limiter = get_rate_limiter("OPEN_AI", {"rpm": 60, "max_concurrency": 3})
+
+    assert get_rate_limiter("open_ai", {"rpm": 60, "max_concurrency": 3}) is limiter
+    assert limiter.limit == 3 and limiter.request_bucket is not None and limiter.token_bucket is None
+    assert get_max_concurrency({"parallel_slots": 2}) == 2
+
+
+def test_get_rate_limiter_applies_config_changes_in_place(limiters):
+    limiter = get_rate_limiter("OPEN_AI", {"rpm": 60, "max_concurrency": 8})
+    limiter.in_flight = 2
+    limiter.on_throttle()
+
+    assert get_rate_limiter("OPEN_AI", {"tpm": 1000, "max_concurrency": 2, "max_retries": 1}) is limiter
+    assert (limiter.limit, limiter.max_concurrency, limiter.max_retries, limiter.in_flight) == (2, 2, 1, 2)
+    assert limiter.request_bucket is None and limiter.token_bucket.capacity == 1000
+
+    # A limit at its maximum follows a raised maximum
+    get_rate_limiter("OPEN_AI", {"max_concurrency": 6})
+    assert limiter.limit == 6
+
+
+# ------------------------------------------------------------------------------------------
+# CallLLMApi against the mock providers
+# ------------------------------------------------------------------------------------------
+
+def test_client_never_exceeds_the_concurrency_limit(mock_server, model_config, limiters):
+    from Code.Utilities.apiSupport.allApi import CallLLMApi
+
+    lock = threading.Lock()
+    active, peak = 0, 0
+
+    def responder(prompt):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        return echo_responder(prompt)
+
+    mock_server.responder = responder
+    model_config("OPEN_AI", max_concurrency=2)
+
+    results = CallLLMApi("OPEN_AI", caller="tests").CallServiceBatch([f"prompt {ind}" for ind in range(8)], max_workers=8)
+
+    assert [result["status"] for result in results] == ["ok"] * 8
+    assert peak == 2
+
+
+def test_client_retries_throttled_calls_after_retry_after(mock_server, model_config, limiters):
+    from Code.Utilities.apiSupport.allApi import CallLLMApi
+
+    attempts = []
+
+    def responder(prompt):
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise mockHTTPError(429, retry_after=0.3)
+        return echo_responder(prompt)
+
+    mock_server.responder = responder
+    model_config("OPEN_AI", max_concurrency=8)
+
+    assert CallLLMApi("OPEN_AI", caller="tests").CallService("hello") == "mock: hello"
+    assert len(attempts) == 2
+    assert attempts[1] - attempts[0] >= 0.3
+    assert limiters["open_ai"].limit == 4
+
+
+def test_client_picks_up_edited_rate_limits(mock_server, model_config, limiters):
+    from Code.Utilities.apiSupport.allApi import CallLLMApi
+
+    client = CallLLMApi("OPEN_AI", caller="tests")
+    client.CallService("hello")
+    limiter = limiters["open_ai"]
+    assert limiter.max_concurrency == 16
+
+    model_config("OPEN_AI", max_concurrency=3, rpm=120)
+    client.CallService("hello again")
+
+    assert limiters["open_ai"] is limiter
+    assert limiter.max_concurrency == 3 and limiter.request_bucket.capacity == 120
+
+
+def test_client_raises_non_retryable_errors_at_once(mock_server, limiters):
+    from Code.Utilities.apiSupport.allApi import CallLLMApi
+
+    attempts = []
+
+    def responder(prompt):
+        attempts.append(prompt)
+        raise mockHTTPError(400)
+
+    mock_server.responder = responder
+
+    with pytest.raises(LLMApiError) as error:
+        CallLLMApi("OPEN_AI", caller="tests").CallService("hello")
+
+    assert error.value.status_code == 400
+    assert len(attempts) == 1
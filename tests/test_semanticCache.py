@@ -0,0 +1,86 @@
+"""
+Tests of the semantic answer cache and the schema version it is keyed on.
+"""
+
+import os
+import zlib
+
+import numpy as np
+import pytest
+import yaml
+
+from Code.Utilities import base_utils
+from Code.Utilities.Retrieval_Pipeline import schemaVersion
+from Code.Utilities.Retrieval_Pipeline.schemaVersion import bump_schema_version, get_schema_version
+from Code.Utilities.base_utils import accessDB
+from Code.Utilities.cacheSupport.semanticCache import semanticCache
+
+
+def embed(text: str):
+    """
+    Bag of words hashed into 64 dimensions, normalized.
+    """
+    vector = np.zeros(64, dtype=np.float32)
+    for word in text.split():
+        vector[zlib.crc32(word.encode()) % 64] += 1
+    return vector / max(np.linalg.norm(vector), 1e-9)
+
+
+@pytest.fixture
+def retrieval_config(tmp_path, db_base_path, monkeypatch):
+    """
+    retrieval_config pointing the table metadata DB at the test directory, with a fresh version cache.
+    """
+    retrieval_config_path = os.path.join(tmp_path, "retrieval_config.yaml")
+    with open(retrieval_config_path, "w") as fobj:
+        yaml.safe_dump({"tableMDdb": {"info_type": "table", "dbName": "tableMetadata"}}, fobj)
+
+    config_paths_file = os.path.join(tmp_path, "config_paths.yaml")
+    with open(config_paths_file, "w") as fobj:
+        yaml.safe_dump({"retrieval_config": retrieval_config_path}, fobj)
+
+    monkeypatch.setattr(base_utils, "config_paths_file", config_paths_file)
+    monkeypatch.setattr(schemaVersion, "_versions", {})
+    monkeypatch.setattr(schemaVersion, "_tables_ready", set())
+    monkeypatch.setattr(schemaVersion, "version_cache_seconds", 0)
+
+
+@pytest.fixture
+def cache(retrieval_config):
+    return semanticCache("tests", embedder=embed)
+
+
+def test_wal_checkpoint_does_not_invalidate_cached_answers(cache):
+    version = get_schema_version()
+    cache.store("orders per customer", "SELECT 1", version)
+
+    # Unrelated metadata DB writes and a WAL checkpoint are not schema changes
+    metadata_db = accessDB("table", "tableMetadata")
+    metadata_db.create_table({'tableName': 'scratch', 'columns': {'note': ['TEXT', '']}})
+    metadata_db.post_data("scratch", [{"note": str(ind)} for ind in range(100)])
+    metadata_db.cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    assert get_schema_version() == version
+    cache.store("revenue per region", "SELECT 2", get_schema_version())
+    assert cache.lookup("Orders per customer?", get_schema_version()) == "SELECT 1"
+
+
+def test_schema_writes_invalidate_cached_answers(cache):
+    cache.store("orders per customer", "SELECT 1", get_schema_version())
+
+    assert bump_schema_version("tableMDdb") == 1
+    assert get_schema_version() == "1"
+    assert cache.lookup("orders per customer", get_schema_version()) is None
+
+
+def test_schema_version_reads_are_cached_briefly(retrieval_config, monkeypatch):
+    monkeypatch.setattr(schemaVersion, "version_cache_seconds", 60)
+    assert get_schema_version() == "0"
+
+    # A bump made by another process is picked up once the cached read expires
+    accessDB("table", "tableMetadata").post_data("schema_version", [{"name": "schema", "version": 7}],
+                                                 upsert_keys=["name"])
+    assert get_schema_version() == "0"
+
+    monkeypatch.setattr(schemaVersion, "version_cache_seconds", 0)
+    assert get_schema_version() == "7"
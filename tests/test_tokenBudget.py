@@ -0,0 +1,42 @@
+"""
+Tests of the budgeted SQL context assembler.
+"""
+
+from Code.Utilities.apiSupport.tokenBudget import contextAssembler, count_tokens
+
+
+components = {
+    "user_query": "total spend per buyer",
+    "table_list": {
+        "direct": {
+            "orders": {"description": "Customer orders",
+                       "columns": [("Notes", "TEXT", "", ""),
+                                   ("CustomerID", "INT", "", ""),
+                                   ("ShippingInstructions", "TEXT", "", "delivery instructions given at checkout")]}
+        }
+    },
+    "join_keys": [{"source": "orders", "target": "customers",
+                   "edge_attributes": {"JoinKeys": "orders.CustomerID = customers.CustomerID"}}]
+}
+
+
+def line_cost(line: str) -> int:
+    return count_tokens(line) + 1
+
+
+def test_join_keys_are_parsed_into_column_names():
+    assert contextAssembler.__join_columns__("o.CustomerID = c.CustomerID AND o.`Region` = c.region, a.b_id=b.b_id") == \
+        {"customerid", "region", "b_id"}
+
+
+def test_join_columns_survive_a_budget_that_drops_plain_columns():
+    budget = (count_tokens("Tables:\nJoins:") + line_cost(f"Question: {components['user_query']}") +
+              line_cost("- orders -> customers : orders.CustomerID = customers.CustomerID") +
+              line_cost("Table orders (direct) : Customer orders") + line_cost("    CustomerID INT"))
+    assembler = contextAssembler(budget)
+
+    context = assembler.assemble(components)
+
+    assert "    CustomerID INT" in context
+    assert "Notes" not in context and "ShippingInstructions" not in context
+    assert assembler.report["columns_dropped"] == 2